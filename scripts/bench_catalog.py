@@ -0,0 +1,176 @@
+"""
+Catalog-scale benchmark for product retrieval.
+
+Measures catalog build time, memory per product and query latency (p50/p99)
+for `search_products`, `get_all_products` and the image_manager lookups at
+several catalog sizes.
+
+Usage:
+    python scripts/bench_catalog.py
+    python scripts/bench_catalog.py --sizes 10 1000 --save bench_catalog.json
+    python scripts/bench_catalog.py --compare bench_catalog.json
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.products import ProductCatalog, get_catalog, set_catalog, search_products, get_all_products
+from src.utils import image_manager
+from src.utils.stats import percentile
+from scripts.synthetic_catalog import generate_catalog_records
+
+DEFAULT_SIZES = [10, 1000, 10000, 50000]
+
+SEARCH_QUERIES = [
+    "סרום", "קרם לילה", "אקנה", "ויטמין C", "פיגמנטציה", "טיפולי פנים",
+    "serum", "retinol", "wrinkles", "Velvet", "מסקרה", "no-such-product",
+]
+
+
+def time_calls(func: Callable, args_list: List[tuple]) -> Dict[str, float]:
+    """Run `func` once per args tuple and return p50/p99 latency in milliseconds."""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": percentile(samples, 50), "p99_ms": percentile(samples, 99)}
+
+
+@contextmanager
+def use_catalog(catalog: ProductCatalog):
+    """Temporarily swap the global product catalog used by search and image lookups."""
+    original = get_catalog()
+    set_catalog(catalog)
+    try:
+        yield
+    finally:
+        set_catalog(original)
+
+
+def build_catalog(records: List[dict]) -> ProductCatalog:
+    return ProductCatalog.from_records(records)
+
+
+def bench_size(size: int, num_queries: int, seed: int = 42) -> Dict[str, object]:
+    records = generate_catalog_records(size, seed)
+    # Catalogs are built from freshly decoded data (an import), so no string is shared with `records`
+    payload = json.dumps(records)
+
+    # Index build time and memory per product: what the catalog keeps once the decoded data is gone
+    gc.collect()
+    tracemalloc.start()
+    decoded = json.loads(payload)
+    start = time.perf_counter()
+    catalog = build_catalog(decoded)
+    build_seconds = time.perf_counter() - start
+    del decoded
+    gc.collect()
+    current_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(seed)
+    queries = [(rng.choice(SEARCH_QUERIES),) for _ in range(num_queries)]
+    names = [(records[rng.randrange(size)]["name"],) for _ in range(num_queries)]
+    ids = [(records[rng.randrange(size)]["id"],) for _ in range(num_queries)]
+    categories = [(records[rng.randrange(size)]["category"],) for _ in range(max(1, num_queries // 10))]
+
+    with use_catalog(catalog):
+        result = {
+            "size": size,
+            "build_ms": build_seconds * 1000,
+            "bytes_per_product": current_bytes / size,
+            "search_products": time_calls(search_products, queries),
+            "get_all_products": time_calls(get_all_products, [()] * num_queries),
+            "get_product_image": time_calls(image_manager.get_product_image, names),
+            "get_product_image_by_id": time_calls(image_manager.get_product_image_by_id, ids),
+            "get_category_images": time_calls(image_manager.get_category_images, categories),
+        }
+
+    del catalog
+    gc.collect()
+    return result
+
+
+def print_report(results: List[Dict[str, object]]):
+    lookups = ["search_products", "get_all_products", "get_product_image",
+               "get_product_image_by_id", "get_category_images"]
+
+    print(f"{'size':>8} {'build ms':>10} {'bytes/product':>14}")
+    for r in results:
+        print(f"{r['size']:>8} {r['build_ms']:>10.1f} {r['bytes_per_product']:>14.0f}")
+
+    for lookup in lookups:
+        print(f"\n{lookup}")
+        print(f"{'size':>8} {'p50 ms':>10} {'p99 ms':>10}")
+        for r in results:
+            stats = r[lookup]
+            print(f"{r['size']:>8} {stats['p50_ms']:>10.3f} {stats['p99_ms']:>10.3f}")
+
+
+def compare(results: List[Dict[str, object]], baseline_path: str, tolerance: float) -> List[str]:
+    """Return a list of regressions relative to a saved baseline run."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {r["size"]: r for r in json.load(f)}
+
+    regressions = []
+    for r in results:
+        base = baseline.get(r["size"])
+        if not base:
+            continue
+        checks = [("build_ms", r["build_ms"], base["build_ms"]),
+                  ("bytes_per_product", r["bytes_per_product"], base["bytes_per_product"])]
+        for key, value in r.items():
+            if isinstance(value, dict) and key in base:
+                checks.append((f"{key} p50_ms", value["p50_ms"], base[key]["p50_ms"]))
+        for name, value, base_value in checks:
+            if base_value > 0 and value > base_value * (1 + tolerance):
+                regressions.append(f"size={r['size']} {name}: {base_value:.3f} -> {value:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark product retrieval at catalog scale.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--queries", type=int, default=200, help="Queries per lookup and size")
+    parser.add_argument("--save", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown vs. baseline before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        print(f"Benchmarking catalog of {size} products...")
+        results.append(bench_size(size, args.queries))
+
+    print()
+    print_report(results)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Date-parsing benchmark on a labeled corpus.
+
+Runs the labeled phrase corpus (data/benchmarks/date_phrases.json, built by
+generate_date_corpus.py) through the parser and reports:
+  - batch throughput of `parse_many`, cold and warm (on a set that fits in the cache)
+  - per-phrase latency percentiles, overall and per resolution tier
+  - accuracy against the labels, so a speedup can't silently break correctness
+  - the first dateparser call in a fresh process, with and without warm-up
+
+Usage:
+    python scripts/bench_date_parser.py
+    python scripts/bench_date_parser.py --min-accuracy 0.9 --show-errors 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import date_parser
+from src.utils.date_parser import parse_datetime_with_tier, parse_many, clear_cache
+from src.utils.stats import percentile
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'data', 'benchmarks', 'date_phrases.json')
+
+TIERS = ["cache", "fast", "dateparser", "fallback", "none"]
+
+
+def load_corpus(path: str) -> Tuple[datetime, List[list]]:
+    """Load (reference time, [[text, date, time], ...]) from a corpus file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return datetime.fromisoformat(data["reference"]), data["phrases"]
+
+
+def bench_throughput(texts: List[str], reference: datetime) -> Dict[str, float]:
+    """
+    Phrases per second for one `parse_many` call with an empty cache, and for a
+    second pass over the same phrases. The set is cut to CACHE_SIZE phrases so the
+    second pass is served from the cache rather than evicting as it goes.
+    """
+    texts = texts[:date_parser.CACHE_SIZE]
+    clear_cache()
+    start = time.perf_counter()
+    parse_many(texts, reference)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parse_many(texts, reference)
+    warm = time.perf_counter() - start
+    return {"phrases": len(texts), "cold": len(texts) / cold, "warm": len(texts) / warm}
+
+
+def bench_phrases(corpus: List[list], reference: datetime) -> List[dict]:
+    """Parse each phrase with an empty cache; record latency, tier and correctness."""
+    results = []
+    for text, expected_date, expected_time in corpus:
+        clear_cache()
+        start = time.perf_counter()
+        outcome = parse_datetime_with_tier(text, reference)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        results.append({
+            "text": text,
+            "tier": outcome.tier,
+            "ms": elapsed_ms,
+            "correct": (outcome.date, outcome.time) == (expected_date, expected_time),
+            "got": (outcome.date, outcome.time),
+            "expected": (expected_date, expected_time),
+        })
+    return results
+
+
+# Runs in a fresh interpreter: optionally warms up, then times the first dateparser-tier parse
+_FIRST_PARSE_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from src.utils.date_parser import parse_datetime_with_tier, warm_up_date_parser
+warm_up = warm_up_date_parser() if {warm!r} else 0.0
+start = time.perf_counter()
+outcome = parse_datetime_with_tier("בעוד שבוע בשעה 10")
+print(json.dumps({{"warm_up": warm_up, "first_parse": time.perf_counter() - start, "tier": outcome.tier}}))
+"""
+
+
+def bench_first_parse(warm: bool, runs: int) -> Dict[str, float]:
+    """Median warm-up and first-parse time (ms) over `runs` fresh processes."""
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    script = _FIRST_PARSE_SCRIPT.format(root=root, warm=warm)
+    warm_ups, first_parses = [], []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                check=True, cwd=root).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        warm_ups.append(result["warm_up"] * 1000)
+        first_parses.append(result["first_parse"] * 1000)
+    return {"warm_up_ms": percentile(warm_ups, 50), "first_parse_ms": percentile(first_parses, 50)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark date parsing on a labeled corpus.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--min-accuracy", type=float, default=0.0,
+                        help="Exit with an error if overall accuracy is below this (0-1)")
+    parser.add_argument("--show-errors", type=int, default=10, help="Mismatches to print")
+    parser.add_argument("--startup-runs", type=int, default=3,
+                        help="Fresh processes per cold/warm first-parse measurement (0 to skip)")
+    args = parser.parse_args()
+
+    reference, corpus = load_corpus(args.corpus)
+    texts = [entry[0] for entry in corpus]
+
+    # Warm dateparser's language data so the first phrase doesn't skew the numbers
+    date_parser.warm_up_date_parser()
+
+    throughput = bench_throughput(texts, reference)
+    results = bench_phrases(corpus, reference)
+    latencies = [r["ms"] for r in results]
+
+    print(f"Corpus: {len(corpus)} phrases, reference {reference.isoformat()}\n")
+    print(f"parse_many throughput on {throughput['phrases']} phrases: {throughput['cold']:,.0f} phrases/s cold, "
+          f"{throughput['warm']:,.0f} phrases/s warm (cache holds {date_parser.CACHE_SIZE} entries)\n")
+
+    print(f"{'tier':<12} {'phrases':>8} {'share':>7} {'accuracy':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    rows = [(tier, [r for r in results if r["tier"] == tier]) for tier in TIERS] + [("all", results)]
+    for tier, rows_for_tier in rows:
+        if not rows_for_tier:
+            continue
+        samples = [r["ms"] for r in rows_for_tier]
+        accuracy = sum(r["correct"] for r in rows_for_tier) / len(rows_for_tier)
+        print(f"{tier:<12} {len(rows_for_tier):>8} {len(rows_for_tier) / len(results):>7.0%} {accuracy:>9.1%} "
+              f"{percentile(samples, 50):>9.3f} {percentile(samples, 90):>9.3f} {percentile(samples, 99):>9.3f}")
+
+    errors = [r for r in results if not r["correct"]]
+    if errors and args.show_errors:
+        print(f"\nFirst {min(args.show_errors, len(errors))} of {len(errors)} mismatches:")
+        for r in errors[:args.show_errors]:
+            print(f"  [{r['tier']}] {r['text']!r}: got {r['got']}, expected {r['expected']}")
+
+    if args.startup_runs:
+        cold = bench_first_parse(warm=False, runs=args.startup_runs)
+        warm = bench_first_parse(warm=True, runs=args.startup_runs)
+        print(f"\nFirst dateparser parse in a fresh process (median of {args.startup_runs}):")
+        print(f"  cold: {cold['first_parse_ms']:.1f} ms")
+        print(f"  warm: {warm['first_parse_ms']:.1f} ms (after {warm['warm_up_ms']:.1f} ms warm-up at startup)")
+
+    accuracy = 1 - len(errors) / len(results)
+    if accuracy < args.min_accuracy:
+        print(f"\nAccuracy {accuracy:.1%} is below the required {args.min_accuracy:.1%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
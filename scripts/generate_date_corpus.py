@@ -0,0 +1,153 @@
+"""
+Generate the labeled date-phrase corpus used by bench_date_parser.py.
+
+Phrases are built from templates in the style of our chat logs ("ביום חמישי
+ב-14:00", "next Monday 4pm"). Each template knows the date and time it means
+relative to a fixed reference time, so labels never come from the parser
+under test.
+
+Usage:
+    python scripts/generate_date_corpus.py
+    python scripts/generate_date_corpus.py --count 5000 --output /tmp/corpus.json
+"""
+import os
+import sys
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+# Reference time for all labels: Sunday morning
+REFERENCE = datetime(2025, 11, 30, 9, 15)
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), '..', 'data', 'benchmarks', 'date_phrases.json')
+
+HEBREW_WEEKDAYS = {'שני': 0, 'שלישי': 1, 'רביעי': 2, 'חמישי': 3, 'שישי': 4, 'שבת': 5}
+ENGLISH_WEEKDAYS = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5}
+ENGLISH_MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+                  'August', 'September', 'October', 'November', 'December']
+HEBREW_MONTHS = ['בינואר', 'בפברואר', 'במרץ', 'באפריל', 'במאי', 'ביוני', 'ביולי',
+                 'באוגוסט', 'בספטמבר', 'באוקטובר', 'בנובמבר', 'בדצמבר']
+
+
+def _next_weekday(day_num: int) -> datetime:
+    days_ahead = day_num - REFERENCE.weekday()
+    if days_ahead <= 0:
+        days_ahead += 7
+    return REFERENCE + timedelta(days=days_ahead)
+
+
+def day_expressions() -> List[Tuple[str, datetime, str]]:
+    """(phrase, intended date, language) for every day expression."""
+    days = [
+        ("היום", REFERENCE, "he"), ("מחר", REFERENCE + timedelta(days=1), "he"),
+        ("מחרתיים", REFERENCE + timedelta(days=2), "he"),
+        ("בעוד יומיים", REFERENCE + timedelta(days=2), "he"),
+        ("בעוד שבוע", REFERENCE + timedelta(days=7), "he"),
+        ("today", REFERENCE, "en"), ("tomorrow", REFERENCE + timedelta(days=1), "en"),
+        ("the day after tomorrow", REFERENCE + timedelta(days=2), "en"),
+        ("in 3 days", REFERENCE + timedelta(days=3), "en"),
+        ("in a week", REFERENCE + timedelta(days=7), "en"),
+    ]
+    for name, num in HEBREW_WEEKDAYS.items():
+        date = _next_weekday(num)
+        days += [(f"ביום {name}", date, "he"), (f"יום {name}", date, "he"),
+                 (f"ביום {name} הבא", date, "he"), (f"יום {name} הקרוב", date, "he")]
+    for name, num in ENGLISH_WEEKDAYS.items():
+        date = _next_weekday(num)
+        days += [(name, date, "en"), (f"on {name.capitalize()}", date, "en"),
+                 (f"next {name.capitalize()}", date, "en"), (f"this {name}", date, "en")]
+    for offset in [3, 5, 10, 16, 24, 33, 45]:
+        date = REFERENCE + timedelta(days=offset)
+        days += [(date.strftime("%Y-%m-%d"), date, "en"),
+                 (f"ב-{date.strftime('%Y-%m-%d')}", date, "he"),
+                 (f"{date.day} {HEBREW_MONTHS[date.month - 1]}", date, "he"),
+                 (f"{ENGLISH_MONTHS[date.month - 1]} {date.day}", date, "en")]
+    return days
+
+
+def time_expressions() -> List[Tuple[str, str, str]]:
+    """(phrase, intended HH:MM, language) for every time expression."""
+    times = []
+    for hour in [10, 11, 12, 13, 14, 15, 16, 17, 18]:
+        times += [(f"ב-{hour}", f"{hour:02d}:00", "he"), (f"בשעה {hour}", f"{hour:02d}:00", "he"),
+                  (f"ב-{hour}:00", f"{hour:02d}:00", "he"), (f"בשעה {hour}:30", f"{hour:02d}:30", "he"),
+                  (f"at {hour}:00", f"{hour:02d}:00", "en"), (f"{hour}:30", f"{hour:02d}:30", "en")]
+    for hour in [1, 2, 3, 4, 5, 6]:
+        times += [(f"בשעה {hour} אחרי הצהריים", f"{hour + 12:02d}:00", "he"),
+                  (f'ב-{hour} אחה"צ', f"{hour + 12:02d}:00", "he"),
+                  (f"בשעה {hour}", f"{hour + 12:02d}:00", "he"),
+                  (f"at {hour}pm", f"{hour + 12:02d}:00", "en"), (f"{hour}pm", f"{hour + 12:02d}:00", "en"),
+                  (f"at {hour} pm", f"{hour + 12:02d}:00", "en")]
+    for hour in [10, 11]:
+        times += [(f"בשעה {hour} בבוקר", f"{hour:02d}:00", "he"), (f"at {hour}am", f"{hour:02d}:00", "en"),
+                  (f"{hour}am", f"{hour:02d}:00", "en")]
+    for hour in [7, 8]:
+        times += [(f"בשעה {hour} בערב", f"{hour + 12:02d}:00", "he")]
+    times += [("בשעה 12 בצהריים", "12:00", "he"), ("at noon", "12:00", "en")]
+    return times
+
+
+CHAT_PREFIXES = {
+    "he": ["אפשר ", "יש תור ", "אני רוצה לקבוע ל", "מתאים לי ", "יש מקום "],
+    "en": ["can I come ", "is there a slot ", "I'd like to book ", "how about "],
+}
+
+
+def _time_only_date(time_str: str) -> datetime:
+    hour, minute = map(int, time_str.split(":"))
+    if (hour, minute) > (REFERENCE.hour, REFERENCE.minute):
+        return REFERENCE
+    return REFERENCE + timedelta(days=1)
+
+
+def generate_corpus(count: int, seed: int = 7) -> List[List[Optional[str]]]:
+    """Return up to `count` unique [text, date, time] entries."""
+    rng = random.Random(seed)
+    days = day_expressions()
+    times = time_expressions()
+    entries = {}
+
+    def add(text: str, date: datetime, time_str: Optional[str]):
+        entries.setdefault(text, [text, date.strftime("%Y-%m-%d"), time_str])
+
+    for text, date, _ in days:
+        add(text, date, None)
+    for text, time_str, _ in times:
+        add(text, _time_only_date(time_str), time_str)
+
+    combos = [(d, t) for d in days for t in times if d[2] == t[2]]
+    rng.shuffle(combos)
+    for (day_text, date, lang), (time_text, time_str, _) in combos:
+        if len(entries) >= count:
+            break
+        style = rng.random()
+        if style < 0.6:
+            text = f"{day_text} {time_text}"
+        elif style < 0.8:
+            text = f"{time_text} {day_text}"
+        else:
+            text = f"{rng.choice(CHAT_PREFIXES[lang])}{day_text} {time_text}"
+        add(text, date, time_str)
+
+    return list(entries.values())[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the labeled date-phrase corpus.")
+    parser.add_argument("--count", type=int, default=3000)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.count)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write('{"reference": "%s", "phrases": [\n' % REFERENCE.isoformat())
+        f.write(",\n".join(json.dumps(entry, ensure_ascii=False) for entry in corpus))
+        f.write("\n]}\n")
+    print(f"Wrote {len(corpus)} phrases to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
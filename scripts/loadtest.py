@@ -0,0 +1,278 @@
+"""
+End-to-end load test of the Telegram handlers.
+
+Drives the real `start` and `handle_message` handlers of src/telegram/bot.py
+with hundreds of concurrent synthetic clients. Everything outside the process
+is faked:
+  - Telegram: a bot object that records every send/edit, with a small latency
+  - LLM: the local OpenAI-compatible stand-in (src/utils/fake_llm.py), so the
+    agent, router, HTTP client, tools and streaming all run for real
+  - Google Calendar: an in-memory calendar with per-call latency, so the
+    availability/booking code (and its check-then-insert race) runs unchanged
+
+Each client sends /start, then a short scripted conversation (greeting, price
+question, availability for a day and hour, booking with name and email) with
+random think time between messages. Reported:
+  - throughput (messages and agent runs per second)
+  - per-message latency percentiles: until the first Telegram send and until done
+  - event-loop lag (how late a 50ms timer fires)
+  - memory growth of the process and of the conversation store
+  - double bookings: overlapping events in the fake calendar
+
+Usage:
+    python scripts/loadtest.py --chats 300
+    python scripts/loadtest.py --chats 500 --ttft 1.2 --error-rate 0.02 --no-stream
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import threading
+import tracemalloc
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Make sure importing the agent never builds a client for a real provider; the run itself
+# overrides the model with the fake server started below
+os.environ.setdefault("FAKE_LLM_URL", "http://127.0.0.1:9/v1")
+
+from src.utils.fake_llm import FakeLLMServer, LatencyProfile
+from src.utils.metrics import record_calendar_call
+from src.utils.stats import percentile
+
+# How often the event-loop lag probe wakes up
+LAG_PROBE_INTERVAL = 0.05
+
+NAMES = ["דנה", "נועה", "מיכל", "שירה", "יעל", "רוני", "תמר", "הילה", "מאיה", "ליאת"]
+DAYS = ["מחר", "מחרתיים"]
+QUESTIONS = ["כמה עולה טיפול פנים?", "מה המחיר של פדיקור?", "יש לכם טיפול לאקנה?", "כמה עולה לק ג'ל?"]
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class InMemoryCalendar:
+    """Stands in for GoogleCalendarManager; calls block for `latency` seconds like the real API."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.events: List[Dict] = []
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def list_events(self, start_time, end_time, calendar_id='primary'):
+        time.sleep(self.latency)
+        record_calendar_call("list_events")
+        with self._lock:
+            self.calls += 1
+            return [e for e in self.events if e["start"] < end_time and start_time < e["end"]]
+
+    def create_event(self, summary, start_time, end_time, attendee_email=None, description="", calendar_id='primary'):
+        time.sleep(self.latency)
+        record_calendar_call("create_event")
+        with self._lock:
+            self.calls += 1
+            event = {"summary": summary, "start": start_time, "end": end_time, "htmlLink": "https://calendar.test"}
+            self.events.append(event)
+            return event
+
+    def double_bookings(self) -> List[tuple]:
+        """Pairs of events that overlap in time."""
+        ordered = sorted(self.events, key=lambda e: e["start"])
+        overlaps = []
+        for i, event in enumerate(ordered):
+            for other in ordered[i + 1:]:
+                if other["start"] >= event["end"]:
+                    break
+                overlaps.append((event["summary"], other["summary"], event["start"].isoformat()))
+        return overlaps
+
+
+class FakeTelegramBot:
+    """Records what the handlers send, per chat, with a small send latency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sends = 0
+        self.errors_shown = 0
+        # chat -> when the first send since `expect_reply` happened
+        self.first_send: Dict[int, float] = {}
+        self._message_ids = 0
+
+    async def _send(self, chat_id: int, text: str = ""):
+        await asyncio.sleep(self.latency)
+        self.sends += 1
+        self.first_send.setdefault(chat_id, time.perf_counter())
+        if text.startswith("אופס"):
+            self.errors_shown += 1
+        self._message_ids += 1
+        return SimpleNamespace(message_id=self._message_ids)
+
+    def expect_reply(self, chat_id: int):
+        self.first_send.pop(chat_id, None)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return await self._send(chat_id, text)
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        return await self._send(chat_id, text)
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        return await self._send(chat_id)
+
+    async def send_document(self, chat_id, document, **kwargs):
+        return await self._send(chat_id)
+
+
+def client_script(rng: random.Random, chat_id: int) -> List[str]:
+    """The messages one synthetic client sends after /start."""
+    name = rng.choice(NAMES)
+    messages = ["היי", rng.choice(QUESTIONS)]
+    if rng.random() < 0.8:
+        messages.append(f"יש משהו פנוי {rng.choice(DAYS)} ב-{rng.randint(10, 17)}:00?")
+        if rng.random() < 0.7:
+            messages.append(f"שמי {name}, client{chat_id}@example.com")
+    return messages
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.first_response: List[float] = []
+        self.completion: List[float] = []
+        self.loop_lag: List[float] = []
+        self.failures = 0
+        self.messages = 0
+
+    async def _probe_loop_lag(self, stop: asyncio.Event):
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            expected = loop.time() + LAG_PROBE_INTERVAL
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.loop_lag.append(max(0.0, loop.time() - expected))
+
+    async def _message(self, bot, context, telegram: FakeTelegramBot, chat_id: int, text: str):
+        update = SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), message=SimpleNamespace(text=text))
+        telegram.expect_reply(chat_id)
+        sent_at = time.perf_counter()
+        self.messages += 1
+        try:
+            await bot.handle_message(update, context)
+        except Exception:
+            self.failures += 1
+            return
+        done_at = time.perf_counter()
+        self.completion.append(done_at - sent_at)
+        first = telegram.first_send.get(chat_id)
+        if first is not None:
+            self.first_response.append(first - sent_at)
+
+    async def _client(self, bot, context, telegram: FakeTelegramBot, chat_id: int, start_delay: float):
+        rng = random.Random(self.rng.random())
+        await asyncio.sleep(start_delay)
+        update = SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), message=SimpleNamespace(text="/start"))
+        await bot.start(update, context)
+        for text in client_script(rng, chat_id):
+            await asyncio.sleep(rng.uniform(0.5, 3.0) * self.args.think_scale)
+            await self._message(bot, context, telegram, chat_id, text)
+
+    async def run(self) -> int:
+        args = self.args
+        os.environ["STREAM_REPLIES"] = "false" if args.no_stream else "true"
+
+        from src.core import appointments
+        from src.core.llm_client import close_http_client
+        from src.core.router import RoutedModel, _openai_compatible
+        from src.telegram import bot
+
+        fake_llm = FakeLLMServer(
+            LatencyProfile(args.ttft, args.ttft_sigma, args.chunk_delay), error_rate=args.error_rate, seed=args.seed
+        )
+        url = await fake_llm.start()
+        calendar = InMemoryCalendar(args.calendar_latency)
+        appointments.calendar_manager = calendar
+        telegram = FakeTelegramBot(args.telegram_latency)
+        context = SimpleNamespace(bot=telegram)
+
+        tracemalloc.start()
+        rss_start = _rss_bytes()
+        stop = asyncio.Event()
+        probe = asyncio.ensure_future(self._probe_loop_lag(stop))
+        started = time.perf_counter()
+        try:
+            with bot.beauty_advisor_agent.override(model=RoutedModel({"fake": _openai_compatible("fake-llm", url, "fake")})):
+                await asyncio.gather(*(
+                    self._client(bot, context, telegram, chat_id, self.rng.uniform(0, args.ramp))
+                    for chat_id in range(1, args.chats + 1)
+                ))
+        finally:
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await probe
+            await fake_llm.close()
+            await close_http_client()
+
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_end = _rss_bytes()
+        double_bookings = calendar.double_bookings()
+        runs = bot.dispatcher.stats()["jobs_done"]
+
+        print(f"\nLoad test: {args.chats} chats, {self.messages} messages in {elapsed:.1f}s")
+        print(f"  throughput: {self.messages / elapsed:.1f} messages/s, {runs / elapsed:.1f} jobs/s")
+        for label, samples in (("first response", self.first_response), ("message done", self.completion)):
+            if samples:
+                print(f"  {label:<15} p50 {percentile(samples, 50) * 1000:7.0f}ms  "
+                      f"p95 {percentile(samples, 95) * 1000:7.0f}ms  p99 {percentile(samples, 99) * 1000:7.0f}ms  "
+                      f"max {max(samples) * 1000:7.0f}ms")
+        if self.loop_lag:
+            print(f"  event-loop lag  p50 {percentile(self.loop_lag, 50) * 1000:7.1f}ms  "
+                  f"p95 {percentile(self.loop_lag, 95) * 1000:7.1f}ms  max {max(self.loop_lag) * 1000:7.1f}ms")
+        conversations = bot.get_conversation_stats()
+        rss_growth = f"{(rss_end - rss_start) / 1e6:.1f}MB" if rss_start and rss_end else "n/a"
+        print(f"  memory: RSS +{rss_growth}, traced peak {peak_traced / 1e6:.1f}MB, "
+              f"{conversations['active']} conversations holding {conversations['memory_bytes'] / 1e6:.2f}MB")
+        print(f"  LLM: {fake_llm.stats()}")
+        print(f"  dispatcher: max queue {bot.dispatcher.stats()['max_queue_depth']}, "
+              f"llm wait p95 {bot.dispatcher.stats()['llm_wait']['p95_ms']:.0f}ms; coalescer: {bot.coalescer.stats()}")
+        print(f"  calendar: {calendar.calls} API calls, {len(calendar.events)} bookings")
+        print(f"  errors: {self.failures} handler exceptions, {telegram.errors_shown} error replies shown")
+        print(f"  double bookings: {len(double_bookings)}")
+        for first, second, start in double_bookings[:10]:
+            print(f"    {start}: {first} / {second}")
+
+        return 1 if args.strict and (double_bookings or self.failures or telegram.errors_shown) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Telegram handlers with fake Telegram, LLM and calendar.")
+    parser.add_argument("--chats", type=int, default=200, help="Concurrent synthetic clients")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which the clients arrive")
+    parser.add_argument("--think-scale", type=float, default=1.0, help="Multiplier for the 0.5-3s think time")
+    parser.add_argument("--ttft", type=float, default=0.8, help="Median LLM time to first token (s)")
+    parser.add_argument("--ttft-sigma", type=float, default=0.4)
+    parser.add_argument("--chunk-delay", type=float, default=0.03, help="Median delay between streamed chunks (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of LLM requests failing with 503")
+    parser.add_argument("--calendar-latency", type=float, default=0.01, help="Seconds per calendar API call")
+    parser.add_argument("--telegram-latency", type=float, default=0.03, help="Seconds per Telegram API call")
+    parser.add_argument("--no-stream", action="store_true", help="Send whole replies instead of streaming")
+    parser.add_argument("--strict", action="store_true", help="Exit with an error on double bookings or errors")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(LoadTest(args).run()))
+
+
+if __name__ == "__main__":
+    main()
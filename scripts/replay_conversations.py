@@ -0,0 +1,165 @@
+"""
+Replay recorded conversations as a regression benchmark.
+
+Reads a recording made with RECORD_CONVERSATIONS=<path> (src/utils/recorder.py)
+and runs every session through the bot's real turn handler again: /start, then
+each recorded client message. The LLM answers with the responses recorded for
+that turn and the calendar is an in-memory stub, so runs are deterministic and
+only our own code is measured: history handling, local intents, tools and
+prompt size.
+
+Reported per run: our time per turn, prompt tokens sent per LLM request, history
+size at the end of the sessions, and divergences (turns that now need more LLM
+calls than were recorded, or left recorded responses unused).
+
+Usage:
+    RECORD_CONVERSATIONS=logs/conversations.jsonl python -m src.telegram.bot
+    python scripts/replay_conversations.py logs/conversations.jsonl --save replay.json
+    python scripts/replay_conversations.py logs/conversations.jsonl --compare replay.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from types import SimpleNamespace
+from typing import Dict, List
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Replayed responses come from the recording; no real provider is needed
+os.environ.setdefault("FAKE_LLM_URL", "http://127.0.0.1:9/v1")
+os.environ["STREAM_REPLIES"] = "false"
+
+from src.utils.recorder import ReplayScript, load_sessions
+from src.utils.stats import percentile
+
+
+class StubCalendar:
+    """Calendar with no latency that accepts every booking."""
+
+    def __init__(self):
+        self.events: List[Dict] = []
+
+    def list_events(self, start_time, end_time, calendar_id='primary'):
+        return [e for e in self.events if e["start"] < end_time and start_time < e["end"]]
+
+    def create_event(self, summary, start_time, end_time, attendee_email=None, description="", calendar_id='primary'):
+        event = {"summary": summary, "start": start_time, "end": end_time, "htmlLink": "https://calendar.test"}
+        self.events.append(event)
+        return event
+
+
+class SilentBot:
+    """Telegram bot that drops everything it's asked to send."""
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return SimpleNamespace(message_id=1)
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        return SimpleNamespace(message_id=message_id)
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        return SimpleNamespace(message_id=1)
+
+    async def send_document(self, chat_id, document, **kwargs):
+        return SimpleNamespace(message_id=1)
+
+
+async def replay(path: str, seed: int) -> Dict[str, float]:
+    from src.core import appointments
+    from src.telegram import bot
+
+    sessions = load_sessions(path)
+    script = ReplayScript()
+    context = SimpleNamespace(bot=SilentBot())
+    random.seed(seed)
+
+    turn_ms: List[float] = []
+    recorded_ms: List[float] = []
+    unused = 0
+    history_tokens: List[int] = []
+    with bot.beauty_advisor_agent.override(model=script.model()):
+        for chat_id, turns in enumerate(sessions.values(), 1):
+            appointments.calendar_manager = StubCalendar()
+            await bot.start_conversation(context, chat_id)
+            for turn in turns:
+                script.load(turn)
+                started = time.perf_counter()
+                await bot.reply_to_message(context, chat_id, turn.user_text)
+                turn_ms.append((time.perf_counter() - started) * 1000)
+                recorded_ms.append(turn.turn_ms)
+                unused += script.unused()
+            history_tokens.append(bot.get_history(chat_id).estimated_tokens())
+
+    if not turn_ms:
+        raise SystemExit(f"No turns recorded in {path}")
+    prompt_tokens = script.prompt_tokens or [0]
+    return {
+        "sessions": len(sessions),
+        "turns": len(turn_ms),
+        "llm_requests": script.requests,
+        "turn_p50_ms": percentile(turn_ms, 50),
+        "turn_p95_ms": percentile(turn_ms, 95),
+        "recorded_turn_p50_ms": percentile(recorded_ms, 50),
+        "prompt_tokens_mean": sum(prompt_tokens) / len(prompt_tokens),
+        "prompt_tokens_max": max(prompt_tokens),
+        "history_tokens_mean": sum(history_tokens) / len(history_tokens),
+        "divergences": script.divergences + unused,
+    }
+
+
+def compare(result: Dict[str, float], baseline_path: str, tolerance: float) -> List[str]:
+    """Return a list of regressions relative to a saved baseline run."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for key in ("turn_p50_ms", "turn_p95_ms", "prompt_tokens_mean", "prompt_tokens_max", "history_tokens_mean"):
+        base_value = baseline.get(key, 0)
+        if base_value > 0 and result[key] > base_value * (1 + tolerance):
+            regressions.append(f"{key}: {base_value:.1f} -> {result[key]:.1f}")
+    if result["divergences"] > baseline.get("divergences", 0):
+        regressions.append(f"divergences: {baseline.get('divergences', 0)} -> {result['divergences']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded conversations against stubbed LLM and calendar.")
+    parser.add_argument("recording", help="JSONL file written with RECORD_CONVERSATIONS")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the greeting rotation")
+    parser.add_argument("--save", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed growth vs. baseline before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    result = asyncio.run(replay(args.recording, args.seed))
+
+    print(f"Replayed {result['sessions']} sessions, {result['turns']} turns, {result['llm_requests']} LLM requests")
+    print(f"  turn time     p50 {result['turn_p50_ms']:8.1f}ms  p95 {result['turn_p95_ms']:8.1f}ms"
+          f"  (recorded p50 {result['recorded_turn_p50_ms']:.0f}ms)")
+    print(f"  prompt tokens mean {result['prompt_tokens_mean']:8.0f}    max {result['prompt_tokens_max']:8.0f}")
+    print(f"  history tokens at the end of a session: mean {result['history_tokens_mean']:.0f}")
+    print(f"  divergences: {result['divergences']}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults saved to {args.save}")
+
+    if args.compare:
+        regressions = compare(result, args.compare, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
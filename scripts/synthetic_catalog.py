@@ -0,0 +1,129 @@
+"""
+Synthetic Hebrew/English product catalog generator.
+
+Produces deterministic, realistic-looking catalogs of any size so we can
+benchmark retrieval before importing the distributor catalog.
+"""
+import os
+import sys
+import random
+from typing import List, Dict, Any
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.products import Product
+
+BRANDS = [
+    "רותי", "אורה", "נטורה", "דרמה", "ליאור", "Lumina", "Derma Pro",
+    "Aqua Skin", "Velvet", "Botanica", "Pure Glow", "Silk Touch",
+]
+
+PRODUCT_TYPES = [
+    ("סרום", "מוצרי טיפוח"),
+    ("קרם לחות", "מוצרי טיפוח"),
+    ("קרם לילה", "מוצרי טיפוח"),
+    ("ג'ל ניקוי", "מוצרי טיפוח"),
+    ("מסכה", "מוצרי טיפוח"),
+    ("טונר", "מוצרי טיפוח"),
+    ("Serum", "Skincare"),
+    ("Moisturizer", "Skincare"),
+    ("Cleanser", "Skincare"),
+    ("Eye Cream", "Skincare"),
+    ("טיפול פנים", "טיפולי פנים"),
+    ("פילינג", "טיפולי פנים"),
+    ("לק ג'ל", "מניקור"),
+    ("פדיקור", "פדיקור"),
+    ("עיצוב גבות", "עיצוב גבות"),
+    ("Facial", "Treatments"),
+]
+
+TREATMENT_CATEGORIES = {"טיפולי פנים", "מניקור", "פדיקור", "עיצוב גבות", "Treatments"}
+
+ATTRIBUTES = [
+    "היאלורון", "ויטמין C", "רטינול", "קולגן", "ניאצינאמיד", "חומצה סליצילית",
+    "Hyaluronic", "Vitamin C", "Retinol", "Peptide", "Niacinamide", "Ceramide",
+]
+
+SKIN_TYPES = ["יבש", "שמן", "מעורב", "נורמלי", "רגיש", "הכל"]
+
+CONCERNS = [
+    "אקנה", "פצעונים", "אנטי אייג'ינג", "קמטים", "פיגמנטציה", "כתמים",
+    "יובש", "אדמומיות", "Acne", "Wrinkles", "Dryness", "Dark Spots",
+]
+
+BENEFITS = [
+    "לחות עמוקה ומראה זוהר.",
+    "החלקת קמטים וקווי הבעה.",
+    "איחוד גוון העור והבהרת כתמים.",
+    "ניקוי עמוק של הנקבוביות.",
+    "Deep hydration and a radiant look.",
+    "Smoother texture and visibly firmer skin.",
+]
+
+DESCRIPTIONS = [
+    "פורמולה עשירה לשימוש יומיומי.",
+    "טיפול מקצועי בהתאמה אישית.",
+    "מרקם קל שנספג במהירות.",
+    "Lightweight formula for daily use.",
+    "Professional treatment tailored to your skin.",
+]
+
+IMAGE_DIR = "data/images/products"
+
+
+def _available_images() -> List[str]:
+    if not os.path.isdir(IMAGE_DIR):
+        return []
+    return sorted(
+        os.path.join(IMAGE_DIR, name)
+        for name in os.listdir(IMAGE_DIR)
+        if name.endswith(".png")
+    )
+
+
+def generate_catalog_records(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Generate `count` raw product records (plain dicts, as an importer would see them).
+
+    Args:
+        count: Number of products to generate.
+        seed: Random seed, so every run produces the same catalog.
+
+    Returns:
+        List of dicts with the same fields as `Product`.
+    """
+    rng = random.Random(seed)
+    images = _available_images()
+    records = []
+
+    for i in range(count):
+        product_type, category = rng.choice(PRODUCT_TYPES)
+        brand = rng.choice(BRANDS)
+        attribute = rng.choice(ATTRIBUTES)
+        is_treatment = category in TREATMENT_CATEGORIES
+
+        records.append({
+            "id": f"s{i}",
+            "name": f"{product_type} {attribute} {brand} {i}",
+            "category": category,
+            "description": rng.choice(DESCRIPTIONS),
+            "benefits": rng.choice(BENEFITS),
+            "price": float(rng.randrange(40, 900, 5)),
+            "target_skin_type": rng.sample(SKIN_TYPES, rng.randint(1, 3)),
+            "target_concern": rng.sample(CONCERNS, rng.randint(1, 3)),
+            "image_path": images[i % len(images)] if images else None,
+            "duration_hours": rng.choice([0.5, 1.0, 1.5, 2.0]) if is_treatment else None,
+        })
+
+    return records
+
+
+def generate_products(count: int, seed: int = 42) -> List[Product]:
+    """Generate `count` synthetic products as `Product` models."""
+    return [Product(**record) for record in generate_catalog_records(count, seed)]
+
+
+if __name__ == "__main__":
+    for record in generate_catalog_records(5):
+        print(record)
@@ -0,0 +1,107 @@
+"""
+Per-turn latency breakdown from a span file.
+
+Reads the JSONL written with TRACE_EXPORT=file (src/utils/tracing.py) and, for
+every span name, reports how often it ran, its latency percentiles and the
+share of total turn time spent in it. Spans are attributed to the turn whose
+trace they belong to; nested spans (e.g. calendar calls inside a tool) are
+listed under their own name too, so shares can add up to more than 100%.
+
+Usage:
+    python scripts/trace_report.py
+    python scripts/trace_report.py logs/traces.jsonl --slowest 5
+"""
+import os
+import sys
+import json
+import argparse
+from collections import defaultdict
+from typing import Dict, List
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.stats import percentile
+
+DEFAULT_TRACE_FILE = os.path.join('logs', 'traces.jsonl')
+
+
+def load_spans(path: str) -> List[Dict]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+def breakdown(spans: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """Span name -> count, p50/p95/max in ms and share of the total time of all turns."""
+    turns = [s for s in spans if s["name"] == "turn"]
+    turn_traces = {s["trace_id"] for s in turns}
+    total_turn_ms = sum(s["duration_ms"] for s in turns)
+
+    durations: Dict[str, List[float]] = defaultdict(list)
+    for s in spans:
+        if s["trace_id"] in turn_traces:
+            durations[s["name"]].append(s["duration_ms"])
+
+    report = {}
+    for name, samples in durations.items():
+        report[name] = {
+            "count": len(samples),
+            "p50_ms": percentile(samples, 50),
+            "p95_ms": percentile(samples, 95),
+            "max_ms": max(samples),
+            "share": sum(samples) / total_turn_ms if total_turn_ms else 0.0,
+        }
+    return report
+
+
+def print_turn(spans: List[Dict], turn: Dict):
+    """The span tree of one turn, indented by depth, in start order."""
+    children = defaultdict(list)
+    for s in spans:
+        if s["trace_id"] == turn["trace_id"] and s["parent_span_id"]:
+            children[s["parent_span_id"]].append(s)
+
+    def walk(node: Dict, depth: int):
+        offset = (node["start_time_unix_nano"] - turn["start_time_unix_nano"]) / 1e6
+        status = "" if node["status"] == "OK" else f"  [{node['status']}]"
+        print(f"  {'  ' * depth}{node['name']:<{40 - 2 * depth}} +{offset:7.0f}ms {node['duration_ms']:8.0f}ms{status}")
+        for child in sorted(children[node["span_id"]], key=lambda c: c["start_time_unix_nano"]):
+            walk(child, depth + 1)
+
+    print(f"\nturn {turn['trace_id'][:8]} (chat {turn['attributes'].get('chat_id')}, "
+          f"{turn['attributes'].get('turn.path', '?')}): {turn['duration_ms']:.0f}ms")
+    walk(turn, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency breakdown per turn from a tracing span file.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_TRACE_FILE)
+    parser.add_argument("--slowest", type=int, default=3, help="Print the span tree of the N slowest turns")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    turns = [s for s in spans if s["name"] == "turn"]
+    if not turns:
+        print(f"No turns in {args.path} (is TRACE_EXPORT=file set?)")
+        return
+
+    durations = [s["duration_ms"] for s in turns]
+    print(f"{len(turns)} turns: p50 {percentile(durations, 50):.0f}ms, p95 {percentile(durations, 95):.0f}ms, "
+          f"max {max(durations):.0f}ms\n")
+    print(f"{'span':<40} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'share':>7}")
+    report = breakdown(spans)
+    for name, row in sorted(report.items(), key=lambda item: -item[1]["share"]):
+        print(f"{name:<40} {row['count']:>6} {row['p50_ms']:>9.0f} {row['p95_ms']:>9.0f} "
+              f"{row['max_ms']:>9.0f} {row['share']:>7.0%}")
+
+    for turn in sorted(turns, key=lambda s: -s["duration_ms"])[:args.slowest]:
+        print_turn(spans, turn)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,42 @@
-import os
 from pydantic_ai import Agent, RunContext
-from pydantic_ai.models.openai import OpenAIModel
-from dataclasses import dataclass
-from typing import List
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 from src.core.products import Product, search_products, get_all_products
-from src.core.appointments import check_availability, book_appointment
-from src.utils.date_parser import parse_datetime, parse_date_only
+from src.core.appointments import (
+    check_availability, book_appointment, prefetch_availability, resolve_prefetched_availability,
+)
+from src.core.tool_cache import ToolResultCache
+from src.utils.date_parser import parse_datetime, parse_date_only, extract_date
+from src.utils.tracing import traced
+from src.utils.metrics import timed, calendar_call_scope, TOOL_CALL_SECONDS, CALENDAR_CALLS_PER_BOOKING
 
 @dataclass
 class BeautyAdvisorDependencies:
-    # In a real app, this might hold a database connection or user session info
-    pass
+    """Per-conversation state shared by the tools; one instance lives as long as the chat's history."""
+    # Availability lookups started before the run: "YYYY-MM-DD" -> Future with the free slots
+    prefetched_availability: Dict[str, Future] = field(default_factory=dict)
+    # Recent tool results, so repeated calls within and across turns don't run again
+    tool_cache: ToolResultCache = field(default_factory=ToolResultCache)
+
+    def start_turn(self):
+        """Forget prefetches the previous turn never used; their dates may no longer be relevant."""
+        self.prefetched_availability.clear()
+
+    def prefetch_availability(self, text: str) -> Optional[str]:
+        """
+        If the client's message names a date, start checking it now - the agent will
+        almost certainly ask, and the calendar lookup then overlaps the LLM call.
+        
+        Returns:
+            The prefetched date, or None
+        """
+        date_str = extract_date(text)
+        if not date_str or self.tool_cache.has("check_appointment_availability", date_str):
+            return None
+        if date_str not in self.prefetched_availability:
+            self.prefetched_availability[date_str] = prefetch_availability(date_str)
+        return date_str
 
 # הגדרת הפרומפט של המערכת
 SYSTEM_PROMPT = """
@@ -86,42 +112,40 @@ SYSTEM_PROMPT = """
 - דברי פשוט ובטבעיות
 """
 
-from pydantic_ai.models.openai import OpenAIModel
-from openai import AsyncOpenAI
-from src.core.config import Config
-
-# Initialize the Agent using DeepSeek
-deepseek_key = Config.get_deepseek_api_key()
-if not deepseek_key:
-    raise ValueError("DEEPSEEK_API_KEY is required. Please add it to your .env file")
+from src.core.router import build_router
 
-# Set environment variable for OpenAI client to use
-os.environ['OPENAI_API_KEY'] = deepseek_key
-os.environ['OPENAI_BASE_URL'] = 'https://api.deepseek.com'
+# Each request goes to the fastest healthy provider among those with an API key
+llm_router = build_router()
 
-# Initialize agent with DeepSeek model
 beauty_advisor_agent = Agent(
-    OpenAIModel('deepseek-chat'),
+    llm_router,
     deps_type=BeautyAdvisorDependencies,
     instructions=SYSTEM_PROMPT,
 )
 
 @beauty_advisor_agent.tool
+@traced("tool.lookup_products")
+@timed(TOOL_CALL_SECONDS, tool="lookup_products")
 def lookup_products(ctx: RunContext[BeautyAdvisorDependencies], query: str) -> List[Product]:
     """
     חיפוש מוצרים במאגר הידע לפי שאילתא (שם, קטגוריה, בעיה או תועלת).
     השתמשי בכלי זה כדי למצוא את המוצרים הנכונים להמליץ עליהם.
     """
-    return search_products(query)
+    key = " ".join(query.lower().split())
+    return ctx.deps.tool_cache.get_or_call("lookup_products", key, lambda: search_products(query))
 
 @beauty_advisor_agent.tool
+@traced("tool.list_all_products")
+@timed(TOOL_CALL_SECONDS, tool="list_all_products")
 def list_all_products(ctx: RunContext[BeautyAdvisorDependencies]) -> List[Product]:
     """
     קבלת רשימה של כל המוצרים הזמינים. שימושי אם רוצים לראות מה זמין באופן כללי.
     """
-    return get_all_products()
+    return ctx.deps.tool_cache.get_or_call("list_all_products", None, get_all_products)
 
 @beauty_advisor_agent.tool
+@traced("tool.check_appointment_availability")
+@timed(TOOL_CALL_SECONDS, tool="check_appointment_availability")
 def check_appointment_availability(ctx: RunContext[BeautyAdvisorDependencies], date_text: str) -> List[str]:
     """
     בדיקת תורים פנויים לתאריך נתון.
@@ -141,9 +165,18 @@ def check_appointment_availability(ctx: RunContext[BeautyAdvisorDependencies], d
     if not date_str:
         return [f"Error: Could not understand date '{date_text}'. Try 'tomorrow' or 'מחר'."]
     
-    return check_availability(date_str)
+    def lookup() -> List[str]:
+        prefetched = ctx.deps.prefetched_availability.pop(date_str, None)
+        if prefetched is not None:
+            return resolve_prefetched_availability(prefetched, date_str)
+        return check_availability(date_str)
+    
+    # "מחר" and "tomorrow" share an entry: the key is the parsed date
+    return ctx.deps.tool_cache.get_or_call("check_appointment_availability", date_str, lookup)
 
 @beauty_advisor_agent.tool
+@traced("tool.book_consultation")
+@timed(TOOL_CALL_SECONDS, tool="book_consultation")
 def book_consultation(ctx: RunContext[BeautyAdvisorDependencies], datetime_text: str, user_name: str, email: str, treatment_name: str = "ייעוץ קוסמטי") -> str:
     """
     קביעת תור לטיפול.
@@ -173,9 +206,18 @@ def book_consultation(ctx: RunContext[BeautyAdvisorDependencies], datetime_text:
         if matching_products[0].duration_hours:
             duration_hours = matching_products[0].duration_hours
     
-    return book_appointment(date_str, time_str, user_name, email, treatment_name, duration_hours)
+    # Availability re-check, alternatives and the insert all hit the calendar API
+    with calendar_call_scope(CALENDAR_CALLS_PER_BOOKING):
+        result = book_appointment(date_str, time_str, user_name, email, treatment_name, duration_hours)
+    
+    # The calendar just changed (or someone else took the slot) - availability must be checked again
+    ctx.deps.tool_cache.invalidate("check_appointment_availability")
+    ctx.deps.prefetched_availability.pop(date_str, None)
+    return result
 
 @beauty_advisor_agent.tool
+@traced("tool.get_product_visual")
+@timed(TOOL_CALL_SECONDS, tool="get_product_visual")
 def get_product_visual(ctx: RunContext[BeautyAdvisorDependencies], product_name: str) -> str:
     """
     קבלת נתיב התמונה של מוצר כדי להראות ללקוחה איך הוא נראה.
@@ -189,7 +231,9 @@ def get_product_visual(ctx: RunContext[BeautyAdvisorDependencies], product_name:
     """
     from src.utils.image_manager import get_product_image
     
-    image_path = get_product_image(product_name)
+    image_path = ctx.deps.tool_cache.get_or_call(
+        "get_product_visual", product_name.strip().lower(), lambda: get_product_image(product_name)
+    )
     if image_path:
         return f"IMAGE:{image_path}"
     return "אין תמונה זמינה למוצר זה."
@@ -1,12 +1,20 @@
 import datetime
+import logging
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import timedelta
 import pytz
-from typing import List
+from typing import Dict, List
 from src.utils.google_calendar import GoogleCalendarManager
 
 # Initialize calendar manager
 calendar_manager = GoogleCalendarManager()
 
+# שעות פעילות - תורים מתחילים בשעה עגולה בין 10:00 ל-18:00
+WORKING_HOURS_START = 10
+WORKING_HOURS_END = 18
+
 def check_availability(date_str: str) -> List[str]:
     """
     Check available appointment slots for a given date using Google Calendar API.
@@ -17,8 +25,7 @@ def check_availability(date_str: str) -> List[str]:
     Returns:
         List of available time slots in "HH:MM" format.
     """
-    # Define working hours (10:00 to 18:00)
-    working_hours = [f"{h:02d}:00" for h in range(10, 19)]
+    working_hours = [f"{h:02d}:00" for h in range(WORKING_HOURS_START, WORKING_HOURS_END + 1)]
     
     try:
         check_date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
@@ -42,6 +49,51 @@ def check_availability(date_str: str) -> List[str]:
             
     return available
 
+# Speculative availability lookups started while the LLM is still thinking
+PREFETCH_WORKERS = 4
+# How long the tool waits for a prefetch before doing its own lookup
+PREFETCH_WAIT = 30.0
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="availability-prefetch")
+_prefetch_lock = threading.Lock()
+_prefetch_stats = {"started": 0, "used": 0, "failed": 0}
+
+
+def prefetch_availability(date_str: str) -> Future:
+    """
+    Start `check_availability(date_str)` in the background.
+    
+    Returns:
+        concurrent.futures.Future with the list of available slots
+    """
+    with _prefetch_lock:
+        _prefetch_stats["started"] += 1
+    # Run in a copy of the caller's context so the lookup's spans belong to the current turn
+    return _prefetch_executor.submit(contextvars.copy_context().run, check_availability, date_str)
+
+
+def resolve_prefetched_availability(future: Future, date_str: str) -> List[str]:
+    """Result of a prefetched lookup, or a fresh lookup if the prefetch failed."""
+    try:
+        slots = future.result(timeout=PREFETCH_WAIT)
+    except Exception as e:
+        logging.warning(f"Availability prefetch for {date_str} failed, checking again: {e}")
+        with _prefetch_lock:
+            _prefetch_stats["failed"] += 1
+        return check_availability(date_str)
+    with _prefetch_lock:
+        _prefetch_stats["used"] += 1
+    return slots
+
+
+def get_prefetch_stats() -> Dict[str, int]:
+    """Prefetches started, used by the tool, failed, and wasted (started but never asked for)."""
+    with _prefetch_lock:
+        stats = dict(_prefetch_stats)
+    stats["wasted"] = stats["started"] - stats["used"] - stats["failed"]
+    return stats
+
+
 def find_nearest_available_slots(date_str: str, time_str: str, num_alternatives: int = 3) -> List[str]:
     """
     Find nearest available time slots around a requested time.
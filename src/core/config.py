@@ -43,6 +43,21 @@ class Config:
         """Get DeepSeek API key from environment."""
         return os.environ.get("DEEPSEEK_API_KEY")
 
+    @staticmethod
+    def get_openrouter_model() -> str:
+        """Get the OpenRouter model name (default: the same DeepSeek chat model)."""
+        return os.environ.get("OPENROUTER_MODEL", "deepseek/deepseek-chat")
+
+    @staticmethod
+    def get_gemini_model() -> str:
+        """Get the Gemini model name."""
+        return os.environ.get("GEMINI_MODEL", "gemini-2.0-flash")
+
+    @staticmethod
+    def get_fake_llm_url() -> Optional[str]:
+        """Base URL of a local fake LLM (src/utils/fake_llm.py); when set it replaces every real provider."""
+        return os.environ.get("FAKE_LLM_URL")
+
     @staticmethod
     def get_calendar_id() -> str:
         """Get Google Calendar ID from environment."""
@@ -79,6 +94,86 @@ class Config:
         """Get business owner email from environment."""
         return os.environ.get("BUSINESS_OWNER_EMAIL")
 
+    @staticmethod
+    def get_stream_replies() -> bool:
+        """Whether to stream agent replies into Telegram while they are generated (default: on)."""
+        return os.environ.get("STREAM_REPLIES", "true").lower() not in ("0", "false", "no")
+
+    @staticmethod
+    def get_local_intents() -> bool:
+        """Whether simple turns (greetings, hours, prices, free slots) are answered without the LLM (default: on)."""
+        return os.environ.get("LOCAL_INTENTS", "true").lower() not in ("0", "false", "no")
+
+    @staticmethod
+    def get_llm_hedging() -> bool:
+        """Whether to send a second LLM request when the first is slower than the recent p95 (default: off)."""
+        return os.environ.get("LLM_HEDGING", "false").lower() in ("1", "true", "yes")
+
+    @staticmethod
+    def get_max_concurrent_llm() -> int:
+        """Maximum number of agent runs talking to the LLM at the same time (default: 8)."""
+        return int(os.environ.get("MAX_CONCURRENT_LLM", "8"))
+
+    @staticmethod
+    def get_coalesce_window() -> float:
+        """Seconds to wait for more messages before answering a burst; adapts per chat, 0 disables (default: 1.0)."""
+        return float(os.environ.get("COALESCE_WINDOW", "1.0"))
+
+    @staticmethod
+    def get_trace_export() -> str:
+        """Where tracing spans go: off, file or otlp (default: off)."""
+        return os.environ.get("TRACE_EXPORT", "off").lower()
+
+    @staticmethod
+    def get_trace_file() -> str:
+        """JSONL file for spans when TRACE_EXPORT=file (default: logs/traces.jsonl)."""
+        return os.environ.get("TRACE_FILE", "logs/traces.jsonl")
+
+    @staticmethod
+    def get_conversation_store() -> str:
+        """Where chat histories persist: memory, sqlite:<path> or redis://... (default: sqlite:data/conversations.db)."""
+        return os.environ.get("CONVERSATION_STORE", "sqlite:data/conversations.db")
+
+    @staticmethod
+    def get_conversation_cache_size() -> int:
+        """Chats whose history is kept in memory in front of the store (default: 1000)."""
+        return int(os.environ.get("CONVERSATION_CACHE_SIZE", "1000"))
+
+    @staticmethod
+    def get_conversation_idle_timeout() -> float:
+        """Seconds without messages before a chat's history leaves memory, 0 disables (default: 3600)."""
+        return float(os.environ.get("CONVERSATION_IDLE_TIMEOUT", "3600"))
+
+    @staticmethod
+    def get_conversation_memory_budget() -> int:
+        """Bytes all histories in memory may hold before the least recently used are evicted, 0 disables (default: 256MB)."""
+        return int(float(os.environ.get("CONVERSATION_MEMORY_MB", "256")) * 1024 * 1024)
+
+    @staticmethod
+    def get_conversation_spill_path() -> Optional[str]:
+        """Scratch SQLite file evicted chats spill to when CONVERSATION_STORE=memory; unset drops them (default)."""
+        return os.environ.get("CONVERSATION_SPILL_PATH") or None
+
+    @staticmethod
+    def get_file_id_cache_path() -> str:
+        """JSON file of Telegram file_ids for photos already uploaded (default: data/telegram_file_ids.json)."""
+        return os.environ.get("FILE_ID_CACHE_PATH", "data/telegram_file_ids.json")
+
+    @staticmethod
+    def get_record_file() -> Optional[str]:
+        """JSONL file to record redacted conversations to for replay benchmarks; unset disables (default)."""
+        return os.environ.get("RECORD_CONVERSATIONS") or None
+
+    @staticmethod
+    def get_metrics_port() -> int:
+        """Port of the Prometheus /metrics endpoint, 0 disables it (default: 9464)."""
+        return int(os.environ.get("METRICS_PORT", "9464"))
+
+    @staticmethod
+    def get_metrics_host() -> str:
+        """Interface the metrics endpoint listens on (default: 127.0.0.1)."""
+        return os.environ.get("METRICS_HOST", "127.0.0.1")
+
     @staticmethod
     def get_google_credentials_path() -> str:
         """Get path to Google Service Account JSON."""
@@ -93,7 +188,8 @@ class Config:
         if not os.environ.get("TELEGRAM_BOT_TOKEN"):
             errors.append("TELEGRAM_BOT_TOKEN is required")
         
-        if not os.environ.get("OPENROUTER_API_KEY") and not os.environ.get("GEMINI_API_KEY") and not os.environ.get("DEEPSEEK_API_KEY"):
+        if not os.environ.get("OPENROUTER_API_KEY") and not os.environ.get("GEMINI_API_KEY") and not os.environ.get("DEEPSEEK_API_KEY") \
+                and not os.environ.get("FAKE_LLM_URL"):
             errors.append("At least one of OPENROUTER_API_KEY, GEMINI_API_KEY, or DEEPSEEK_API_KEY must be set")
         
         if errors:
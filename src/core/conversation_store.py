@@ -0,0 +1,501 @@
+"""
+Persistent conversation store.
+
+Chat histories live in an in-memory LRU (`ConversationStore`) in front of a
+persistent backend, so a restart or deploy doesn't make every client start
+over:
+  - reads are lazy: a chat's history is loaded on its first message after a
+    restart (`await store.load(chat_id)`), in a worker thread
+  - writes are behind: a finished turn only marks the chat dirty; dirty chats
+    are written in one batch every FLUSH_INTERVAL seconds, when they are evicted
+    from the LRU, and on shutdown
+  - memory is bounded: chats are evicted when idle, when there are too many, or
+    when the histories together go over a byte budget (see `ConversationStore`)
+  - histories are stored compactly: msgpack (JSON without it), compressed with
+    zstd (zlib without it) once they are big enough to be worth it
+
+Backends, chosen by CONVERSATION_STORE:
+  - "memory": nothing is persisted; evicted chats are dropped, or spilled to a
+    scratch SQLite file (cleared on start) when a spill path is given
+  - "sqlite:<path>": a local SQLite file (default: sqlite:data/conversations.db)
+  - "redis://[:password@]host[:port][/db]": anything speaking the Redis protocol
+    (Redis, Valkey, KeyDB, Dragonfly), through a small built-in client
+"""
+import os
+import json
+import time
+import zlib
+import socket
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from src.core.history import ConversationHistory
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Seconds between two write-behind flushes of the dirty chats
+FLUSH_INTERVAL = 5.0
+
+# Encoded histories smaller than this are stored uncompressed
+COMPRESS_MIN_BYTES = 512
+
+# Key prefix for the Redis backend
+REDIS_KEY_PREFIX = "ragcosmetic:conversation:"
+
+# Timeout for Redis connects and replies (seconds)
+REDIS_TIMEOUT = 5.0
+
+# First byte: serialization, second byte: compression
+_JSON, _MSGPACK = b"j", b"m"
+_RAW, _ZLIB, _ZSTD = b"-", b"z", b"s"
+
+
+def encode_history(history: ConversationHistory) -> bytes:
+    """A history as compact bytes: a two-byte format header, then the (compressed) state."""
+    state = history.to_state()
+    if msgpack is not None:
+        serializer, payload = _MSGPACK, msgpack.packb(state, use_bin_type=True)
+    else:
+        serializer, payload = _JSON, json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    compression = _RAW
+    if len(payload) >= COMPRESS_MIN_BYTES:
+        if zstandard is not None:
+            compression, payload = _ZSTD, zstandard.ZstdCompressor(level=3).compress(payload)
+        else:
+            compression, payload = _ZLIB, zlib.compress(payload, 6)
+    return serializer + compression + payload
+
+
+def decode_history(data: bytes) -> ConversationHistory:
+    """Inverse of `encode_history`; reads whatever format the header names."""
+    serializer, compression, payload = data[:1], data[1:2], data[2:]
+    if compression == _ZSTD:
+        if zstandard is None:
+            raise ValueError("History is zstd-compressed but the zstandard package is not installed")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif compression == _ZLIB:
+        payload = zlib.decompress(payload)
+    elif compression != _RAW:
+        raise ValueError(f"Unknown history compression {compression!r}")
+    if serializer == _MSGPACK:
+        if msgpack is None:
+            raise ValueError("History is msgpack-encoded but the msgpack package is not installed")
+        state = msgpack.unpackb(payload, raw=False)
+    elif serializer == _JSON:
+        state = json.loads(payload.decode("utf-8"))
+    else:
+        raise ValueError(f"Unknown history serialization {serializer!r}")
+    return ConversationHistory.from_state(state)
+
+
+class SQLiteBackend:
+    """
+    Histories in a local SQLite file; safe to call from worker threads.
+    A `scratch` file only holds spilled chats of this run: it's emptied on open and deleted on close.
+    """
+
+    def __init__(self, path: str, scratch: bool = False):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.scratch = scratch
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversations (chat_id TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL)"
+        )
+        if scratch:
+            self._db.execute("DELETE FROM conversations")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM conversations WHERE chat_id = ?", (key,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def put_many(self, items: Dict[str, bytes]):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO conversations (chat_id, data, updated_at) VALUES (?, ?, ?)",
+                [(key, data, now) for key, data in items.items()],
+            )
+            self._db.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM conversations WHERE chat_id = ?", (key,))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+        if self.scratch:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self.path + suffix)
+                except FileNotFoundError:
+                    pass
+
+
+class RedisBackend:
+    """Histories in a Redis-protocol server, over a minimal RESP2 client (no extra package)."""
+
+    def __init__(self, url: str, ttl: Optional[int] = None):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=REDIS_TIMEOUT)
+        self._reader = self._sock.makefile("rb")
+        try:
+            if self.password:
+                self._call_locked([("AUTH", self.password)])
+            if self.db:
+                self._call_locked([("SELECT", str(self.db))])
+        except Exception:
+            self._close_locked()
+            raise
+
+    @staticmethod
+    def _encode(command) -> bytes:
+        out = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode("utf-8")
+        if kind == b"-":
+            raise RuntimeError(f"Redis error: {rest.decode('utf-8')}")
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected Redis reply {line!r}")
+
+    def _call_locked(self, commands: List[tuple]) -> List[Any]:
+        """Send the commands as one pipeline and read their replies."""
+        self._sock.sendall(b"".join(self._encode(command) for command in commands))
+        # Read every reply before raising, so the connection stays in step with the server
+        replies, error = [], None
+        for _ in commands:
+            try:
+                replies.append(self._read_reply())
+            except RuntimeError as e:
+                error = error or e
+                replies.append(None)
+        if error is not None:
+            raise error
+        return replies
+
+    def _call(self, commands: List[tuple]) -> List[Any]:
+        with self._lock:
+            # One reconnect on a dropped connection (server restart, idle timeout)
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._call_locked(commands)
+                except (ConnectionError, OSError):
+                    self._close_locked()
+                    if attempt:
+                        raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._call([("GET", REDIS_KEY_PREFIX + key)])[0]
+
+    def put_many(self, items: Dict[str, bytes]):
+        expiry = ("EX", str(self.ttl)) if self.ttl else ()
+        self._call([("SET", REDIS_KEY_PREFIX + key, data) + expiry for key, data in items.items()])
+
+    def delete(self, key: str):
+        self._call([("DEL", REDIS_KEY_PREFIX + key)])
+
+    def _close_locked(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+    def close(self):
+        with self._lock:
+            self._close_locked()
+
+
+def open_backend(spec: Optional[str], spill_path: Optional[str] = None):
+    """The backend for a CONVERSATION_STORE value; for "memory", a scratch file at `spill_path` or None."""
+    spec = (spec or "memory").strip()
+    if spec == "memory":
+        return SQLiteBackend(spill_path, scratch=True) if spill_path else None
+    if spec.startswith(("redis://", "rediss://")):
+        if spec.startswith("rediss://"):
+            raise ValueError("TLS (rediss://) is not supported by the built-in Redis client")
+        return RedisBackend(spec)
+    if spec.startswith("sqlite:"):
+        return SQLiteBackend(spec[len("sqlite:"):])
+    raise ValueError(f"Unknown CONVERSATION_STORE '{spec}' (expected memory, sqlite:<path> or redis://...)")
+
+
+class ConversationStore:
+    """
+    Chat histories in an LRU written behind to `backend`. A chat leaves memory when
+      - more than `capacity` chats are held,
+      - it has been idle for `idle_timeout` seconds, or
+      - the histories together hold more than `memory_budget` bytes (least recently used first).
+    An evicted chat is written to the backend first (and loaded again on its next
+    message); without a backend it is dropped and the chat starts over.
+    Used from the event loop; the backend is only called from worker threads.
+    """
+
+    def __init__(self, backend=None, capacity: int = 1000, idle_timeout: Optional[float] = None,
+                 memory_budget: Optional[int] = None, on_evict: Optional[Callable[[int], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.backend = backend
+        self.capacity = capacity
+        self.idle_timeout = idle_timeout
+        self.memory_budget = memory_budget
+        # Called with the chat id after a chat leaves memory, to drop per-chat state kept elsewhere
+        self.on_evict = on_evict
+        self._clock = clock
+        # Least recently used first
+        self._histories: "OrderedDict[int, ConversationHistory]" = OrderedDict()
+        self._last_used: Dict[int, float] = {}
+        self._bytes: Dict[int, int] = {}
+        self._total_bytes = 0
+        self._dirty: set = set()
+        # Evicted but not yet written; served from here if the chat comes back first
+        self._pending: Dict[int, bytes] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.loads = 0
+        self.load_misses = 0
+        self.flushes = 0
+        self.written = 0
+        self.evicted = {"capacity": 0, "idle": 0, "memory": 0}
+        self.dropped = 0
+
+    @staticmethod
+    def _key(chat_id: int) -> str:
+        return str(chat_id)
+
+    # Dict-like access to the chats held in memory
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self._histories
+
+    def __len__(self) -> int:
+        return len(self._histories)
+
+    def __getitem__(self, chat_id: int) -> ConversationHistory:
+        history = self._histories[chat_id]
+        self._use(chat_id)
+        return history
+
+    def __setitem__(self, chat_id: int, history: ConversationHistory):
+        """Store a new or changed history (a /start, a finished turn); it's written on the next flush."""
+        self._histories[chat_id] = history
+        self._pending.pop(chat_id, None)
+        self.mark_dirty(chat_id)
+
+    def values(self) -> Iterator[ConversationHistory]:
+        return iter(list(self._histories.values()))
+
+    def get(self, chat_id: int) -> ConversationHistory:
+        """The chat's history in memory, creating an empty one if it wasn't loaded."""
+        if chat_id not in self._histories:
+            self._histories[chat_id] = ConversationHistory()
+            self._account(chat_id)
+            self._evict()
+        return self[chat_id]
+
+    def mark_dirty(self, chat_id: int):
+        """The chat's history changed: account its new size and write it on the next flush."""
+        if chat_id not in self._histories:
+            return
+        if self.backend is not None:
+            self._dirty.add(chat_id)
+        self._use(chat_id)
+        self._account(chat_id)
+        self._evict(keep=chat_id)
+
+    def _use(self, chat_id: int):
+        self._histories.move_to_end(chat_id)
+        self._last_used[chat_id] = self._clock()
+
+    def _account(self, chat_id: int):
+        size = self._histories[chat_id].memory_bytes()
+        self._total_bytes += size - self._bytes.get(chat_id, 0)
+        self._bytes[chat_id] = size
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the histories in memory (as of their last change)."""
+        return self._total_bytes
+
+    async def load(self, chat_id: int):
+        """Bring a chat's persisted history into memory (on its first message after a restart or eviction)."""
+        if chat_id in self._histories or self.backend is None:
+            return
+        data = self._pending.get(chat_id)
+        if data is None:
+            data = await asyncio.to_thread(self.backend.get, self._key(chat_id))
+        # Another message of the chat may have created it while we were reading
+        if chat_id in self._histories:
+            return
+        if data is None:
+            self.load_misses += 1
+            return
+        try:
+            history = decode_history(data)
+        except Exception as e:
+            logging.warning(f"Conversation store: dropping unreadable history of chat {chat_id}: {e}")
+            self.load_misses += 1
+            return
+        self.loads += 1
+        self._histories[chat_id] = history
+        self._use(chat_id)
+        self._account(chat_id)
+        self._evict(keep=chat_id)
+
+    def _evict_chat(self, chat_id: int, reason: str):
+        history = self._histories.pop(chat_id)
+        self._last_used.pop(chat_id, None)
+        self._total_bytes -= self._bytes.pop(chat_id, 0)
+        self.evicted[reason] += 1
+        if chat_id in self._dirty:
+            self._dirty.discard(chat_id)
+            self._pending[chat_id] = encode_history(history)
+        elif self.backend is None:
+            self.dropped += 1
+        if self.on_evict is not None:
+            self.on_evict(chat_id)
+
+    def _evict(self, keep: Optional[int] = None):
+        """Evict least recently used chats while over capacity or over the memory budget."""
+        while len(self._histories) > self.capacity:
+            self._evict_chat(next(iter(self._histories)), "capacity")
+        if self.memory_budget:
+            while self._total_bytes > self.memory_budget:
+                oldest = next(iter(self._histories), None)
+                # The chat being served stays, even if it alone is over the budget
+                if oldest is None or oldest == keep:
+                    break
+                self._evict_chat(oldest, "memory")
+
+    def evict_idle(self) -> int:
+        """Evict the chats idle for longer than `idle_timeout`. Returns how many were evicted."""
+        if not self.idle_timeout:
+            return 0
+        cutoff = self._clock() - self.idle_timeout
+        evicted = 0
+        # Least recently used first, so stop at the first chat that was used after the cutoff
+        for chat_id in list(self._histories):
+            if self._last_used.get(chat_id, 0.0) > cutoff:
+                break
+            self._evict_chat(chat_id, "idle")
+            evicted += 1
+        if evicted:
+            logging.info(f"Conversation store: evicted {evicted} idle chats")
+        return evicted
+
+    async def flush(self):
+        """Write every dirty and evicted chat to the backend in one batch."""
+        if self.backend is None:
+            return
+        async with self._flush_lock:
+            items = {self._key(chat_id): data for chat_id, data in self._pending.items()}
+            written_pending = dict(self._pending)
+            for chat_id in self._dirty:
+                if chat_id in self._histories:
+                    items[self._key(chat_id)] = encode_history(self._histories[chat_id])
+            dirty, self._dirty = self._dirty, set()
+            if not items:
+                return
+            try:
+                await asyncio.to_thread(self.backend.put_many, items)
+            except Exception as e:
+                logging.warning(f"Conversation store: writing {len(items)} chats failed, will retry: {e}")
+                self._dirty |= {chat_id for chat_id in dirty if chat_id in self._histories}
+                return
+            for chat_id, data in written_pending.items():
+                if self._pending.get(chat_id) is data:
+                    del self._pending[chat_id]
+            self.flushes += 1
+            self.written += len(items)
+
+    async def _maintain(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+            await self.flush()
+
+    def start(self, interval: float = FLUSH_INTERVAL):
+        """Start the write-behind and idle-eviction task on the running loop."""
+        if (self.backend is not None or self.idle_timeout) and self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._maintain(interval))
+
+    async def close(self):
+        """Stop the background task, write what's left and close the backend."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.close)
+
+    def stats(self) -> Dict[str, Any]:
+        """Chats and bytes in memory, dirty chats waiting for a flush, loads, writes and evictions by reason."""
+        return {
+            "cached": len(self._histories),
+            "memory_bytes": self._total_bytes,
+            "memory_budget_bytes": self.memory_budget or 0,
+            "dirty": len(self._dirty) + len(self._pending),
+            "loads": self.loads,
+            "load_misses": self.load_misses,
+            "flushes": self.flushes,
+            "written": self.written,
+            "evicted": dict(self.evicted),
+            "dropped": self.dropped,
+        }
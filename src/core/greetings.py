@@ -0,0 +1,80 @@
+"""
+Precomputed greetings.
+
+A new client used to wait for a full LLM round trip (often the first call after
+a restart, so a cold connection too) just to be greeted. The greetings below
+were written offline in the agent's voice (friendly, short, one question, at
+most one emoji, no markdown) and are served in rotation, so /start costs a
+single Telegram message. The welcome is stored in the history as the answer to
+START_TRIGGER, the same turn the agent used to produce, so the conversation
+continues as if the model had said it.
+
+The greeting intent (`src.core.intents`) answers "היי" from its own pool here.
+"""
+import random
+import threading
+from typing import Dict, List, Sequence
+
+# The turn a welcome answers in the history: what the agent was told when a client arrived
+START_TRIGGER = "הלקוחה הגיעה כרגע. התחילי את השיחה לפי ההוראות שלך."
+
+# Sent on /start, before the client has said anything
+WELCOME_GREETINGS = [
+    "היי, ברוכה הבאה להיפות של רותי! 😊 אני העוזרת הדיגיטלית של הקליניקה. מה מעניין אותך היום, טיפוח פנים, ציפורניים או מוצרים לבית?",
+    "שלום וברוכה הבאה! אני כאן לעזור לך למצוא את הטיפול שמתאים לך. ספרי לי, מה הכי מעסיק אותך בעור או בציפורניים?",
+    "היי! כיף שהגעת להיפות של רותי. אשמח להכיר, את מחפשת טיפול פנים, מניקור ופדיקור או משהו אחר?",
+    "שלום! אני העוזרת של הקליניקה של רותי 🌸 אפשר לשאול אותי על טיפולים, מחירים ותורים. במה אפשר לעזור?",
+    "היי, נעים מאוד! אני העוזרת הדיגיטלית של היפות של רותי. יש משהו ספציפי שהיית רוצה לשפר או לפנק את עצמך בו?",
+    "ברוכה הבאה! כאן אפשר לשמוע על הטיפולים שלנו ולקבוע תור בקלות. מה הביא אותך אלינו היום?",
+]
+
+# Replies to a client who opens with "היי" / "שלום" mid-conversation or without /start
+GREETING_REPLIES = [
+    "היי, כיף שכתבת! 😊 במה אפשר לעזור היום?",
+    "שלום! אני העוזרת הדיגיטלית של היפות של רותי. מה מעניין אותך, טיפוח פנים או ציפורניים?",
+    "היי! איזה טיפול מעניין אותך? 😊",
+    "שלום שלום! ספרי לי, מה היית רוצה לשפר או לפנק?",
+]
+
+
+class GreetingPool:
+    """Hands out greetings in a shuffled rotation: every greeting is used once before any repeats."""
+
+    def __init__(self, greetings: Sequence[str]):
+        if not greetings:
+            raise ValueError("GreetingPool needs at least one greeting")
+        self.greetings = list(greetings)
+        self._lock = threading.Lock()
+        self._order: List[str] = []
+        self._last = None
+        self.served = 0
+
+    def next(self) -> str:
+        with self._lock:
+            if not self._order:
+                self._order = random.sample(self.greetings, len(self.greetings))
+                # Don't repeat the last greeting across the reshuffle
+                if len(self._order) > 1 and self._order[-1] == self._last:
+                    self._order[0], self._order[-1] = self._order[-1], self._order[0]
+            self._last = self._order.pop()
+            self.served += 1
+            return self._last
+
+
+_welcomes = GreetingPool(WELCOME_GREETINGS)
+_replies = GreetingPool(GREETING_REPLIES)
+
+
+def next_welcome() -> str:
+    """The next /start welcome."""
+    return _welcomes.next()
+
+
+def next_greeting_reply() -> str:
+    """The next reply to a client's greeting."""
+    return _replies.next()
+
+
+def get_greeting_stats() -> Dict[str, int]:
+    """Welcomes and greeting replies served from the pools."""
+    return {"welcomes": _welcomes.served, "replies": _replies.served}
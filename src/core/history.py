@@ -0,0 +1,298 @@
+"""
+Token-budgeted conversation history.
+
+The history sent to the model is kept under a rough token budget instead of a
+fixed message count:
+  - messages are grouped into turns (a user prompt plus every model response,
+    tool call and tool return that followed it), so a tool call is never
+    separated from its return
+  - tool returns older than the last few turns are compressed to a short digest
+    (e.g. the names in a product list instead of the full records)
+  - the oldest turns are rolled into a short extractive summary that is sent as
+    a system prompt part
+
+The provider caches prompt prefixes (DeepSeek serves and bills cached prefix
+tokens much cheaper), so the history is append-only: new turns are added at the
+end and nothing before them changes. Compression and summarizing only happen
+when the history reaches HISTORY_TOKEN_BUDGET, and then cut it down to
+COMPACT_TARGET_TOKENS in one step, so the prefix stays byte-stable for the many
+turns between two compactions.
+
+The agent's own prompt is passed as `instructions`, which pydantic-ai sends with
+every request, so it is not part of the stored history.
+"""
+import json
+import logging
+import threading
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from pydantic_ai.messages import (
+    ModelMessage, ModelMessagesTypeAdapter, ModelRequest, SystemPromptPart, TextPart,
+    ToolCallPart, ToolReturnPart, UserPromptPart,
+)
+from pydantic_ai.usage import RunUsage
+
+from src.utils.memory import deep_sizeof
+from src.utils.metrics import LLM_TOKENS
+
+# Rough size of a token for our Hebrew-heavy text
+CHARS_PER_TOKEN = 3
+
+# Budget for the turns sent to the model (system prompt and summary not included).
+# Reaching it triggers a compaction down to COMPACT_TARGET_TOKENS.
+HISTORY_TOKEN_BUDGET = 6000
+COMPACT_TARGET_TOKENS = 2000
+
+# Tool returns in this many most recent turns survive a compaction in full
+RAW_TOOL_TURNS = 1
+
+# Older tool returns are compressed to at most this many characters
+TOOL_RETURN_MAX_CHARS = 240
+
+# Limits for the running summary of rolled-up turns
+SUMMARY_LINE_CHARS = 120
+SUMMARY_MAX_CHARS = 1200
+
+SUMMARY_HEADER = "סיכום החלק המוקדם של השיחה:"
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _part_text(part) -> str:
+    """The text a part contributes to the prompt."""
+    if isinstance(part, ToolReturnPart):
+        return part.model_response_str()
+    if isinstance(part, ToolCallPart):
+        return part.tool_name + part.args_as_json_str()
+    content = getattr(part, "content", "")
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False, default=str)
+
+
+def estimate_tokens(messages: List[ModelMessage]) -> int:
+    """Approximate prompt tokens of `messages` from their character count."""
+    chars = sum(len(_part_text(part)) for message in messages for part in message.parts)
+    return chars // CHARS_PER_TOKEN
+
+
+def split_turns(messages: List[ModelMessage]) -> List[List[ModelMessage]]:
+    """Group messages into turns, each starting at a request with a user prompt."""
+    turns: List[List[ModelMessage]] = []
+    for message in messages:
+        starts_turn = isinstance(message, ModelRequest) and any(
+            isinstance(part, UserPromptPart) for part in message.parts
+        )
+        if starts_turn or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _compress_tool_return(part: ToolReturnPart) -> ToolReturnPart:
+    text = part.model_response_str()
+    if len(text) <= TOOL_RETURN_MAX_CHARS:
+        return part
+    content = part.content
+    if isinstance(content, list) and content and all(hasattr(item, "name") for item in content):
+        digest = f"{len(content)} פריטים: " + ", ".join(item.name for item in content)
+    else:
+        digest = text
+    return replace(part, content=_shorten(digest, TOOL_RETURN_MAX_CHARS))
+
+
+def _compress_turn(turn: List[ModelMessage]) -> List[ModelMessage]:
+    compressed = []
+    for message in turn:
+        if isinstance(message, ModelRequest) and any(isinstance(p, ToolReturnPart) for p in message.parts):
+            parts = [_compress_tool_return(p) if isinstance(p, ToolReturnPart) else p for p in message.parts]
+            message = replace(message, parts=parts)
+        compressed.append(message)
+    return compressed
+
+
+def summarize_turn(turn: List[ModelMessage]) -> List[str]:
+    """Extractive summary lines for one turn: what the client said, what was done, what we answered."""
+    lines = []
+    reply = None
+    for message in turn:
+        for part in message.parts:
+            if isinstance(part, UserPromptPart):
+                lines.append(f"לקוחה: {_shorten(_part_text(part), SUMMARY_LINE_CHARS)}")
+            elif isinstance(part, ToolCallPart):
+                lines.append(f"כלי {part.tool_name}: {_shorten(part.args_as_json_str(), SUMMARY_LINE_CHARS)}")
+            elif isinstance(part, TextPart) and part.content.strip():
+                reply = part.content
+    if reply:
+        lines.append(f"עוזרת: {_shorten(reply, SUMMARY_LINE_CHARS)}")
+    return lines
+
+
+def dump_messages(messages: List[ModelMessage]) -> List[dict]:
+    """Messages as JSON-ready dicts, without empty fields and zero usage counters."""
+    dumped = ModelMessagesTypeAdapter.dump_python(list(messages), mode="json", exclude_none=True)
+    for message in dumped:
+        usage = message.get("usage")
+        if isinstance(usage, dict):
+            message["usage"] = {key: value for key, value in usage.items() if value}
+    return dumped
+
+
+def load_messages(dumped: List[dict]) -> List[ModelMessage]:
+    """Inverse of `dump_messages` (tool results come back as plain JSON values)."""
+    return ModelMessagesTypeAdapter.validate_python(dumped)
+
+
+class ConversationHistory:
+    """Append-only history of one chat, compacted when it reaches HISTORY_TOKEN_BUDGET."""
+
+    def __init__(self):
+        self.turns: List[List[ModelMessage]] = []
+        self.summary_lines: List[str] = []
+        self.compactions = 0
+        # Built once per compaction so the head of the history is the same object every turn
+        self._summary_message: Optional[ModelRequest] = None
+        # Memory footprint, recomputed lazily after the history changes
+        self._memory_bytes: Optional[int] = None
+
+    @property
+    def summary(self) -> Optional[str]:
+        if not self.summary_lines:
+            return None
+        return "\n".join([SUMMARY_HEADER] + self.summary_lines)
+
+    @property
+    def messages(self) -> List[ModelMessage]:
+        return [message for turn in self.turns for message in turn]
+
+    def add_turn(self, new_messages: List[ModelMessage]):
+        """Append the messages of a finished run, compacting if the budget is reached."""
+        messages = []
+        for message in new_messages:
+            if isinstance(message, ModelRequest):
+                # Only the summary is sent as a system prompt; drop any other system parts
+                parts = [p for p in message.parts if not isinstance(p, SystemPromptPart)]
+                if not parts:
+                    continue
+                message = replace(message, parts=parts)
+            messages.append(message)
+        self.turns.extend(split_turns(messages))
+        self._memory_bytes = None
+        if estimate_tokens(self.messages) > HISTORY_TOKEN_BUDGET:
+            self._compact()
+
+    def _compact(self):
+        if len(self.turns) > RAW_TOOL_TURNS:
+            old = len(self.turns) - RAW_TOOL_TURNS
+            self.turns[:old] = [_compress_turn(turn) for turn in self.turns[:old]]
+
+        # Always keep the latest turn, whatever its size
+        while len(self.turns) > 1 and estimate_tokens(self.messages) > COMPACT_TARGET_TOKENS:
+            self.summary_lines.extend(summarize_turn(self.turns.pop(0)))
+
+        while self.summary_lines and len(self.summary) > SUMMARY_MAX_CHARS:
+            self.summary_lines.pop(0)
+
+        self.compactions += 1
+        self._summary_message = ModelRequest(parts=[SystemPromptPart(content=self.summary)]) if self.summary else None
+        logging.debug(f"Compacted history to {len(self.turns)} turns")
+
+    def for_model(self) -> List[ModelMessage]:
+        """The message history to pass to the agent: the summary (if any), then the kept turns."""
+        if self._summary_message is None:
+            return self.messages
+        return [self._summary_message] + self.messages
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the stored turns and summary."""
+        if self._memory_bytes is None:
+            self._memory_bytes = deep_sizeof([self.turns, self.summary_lines, self._summary_message])
+        return self._memory_bytes
+
+    def estimated_tokens(self) -> int:
+        """Approximate prompt tokens of the history as sent to the model."""
+        return estimate_tokens(self.for_model())
+
+    def to_state(self) -> Dict:
+        """JSON-ready state for persisting the history (see `from_state`)."""
+        return {
+            "turns": [dump_messages(turn) for turn in self.turns],
+            "summary": list(self.summary_lines),
+            "summary_message": dump_messages([self._summary_message]) if self._summary_message else None,
+            "compactions": self.compactions,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "ConversationHistory":
+        history = cls()
+        history.turns = [load_messages(turn) for turn in state.get("turns", [])]
+        history.summary_lines = list(state.get("summary", []))
+        history.compactions = state.get("compactions", 0)
+        if state.get("summary_message"):
+            history._summary_message = load_messages(state["summary_message"])[0]
+        return history
+
+
+class _PromptCacheStats:
+    """Thread-safe totals of prompt tokens served from the provider's prefix cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, prompt_tokens: int, cached_tokens: int):
+        with self._lock:
+            self.runs += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "uncached_tokens": self.prompt_tokens - self.cached_tokens,
+                "hit_rate": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.runs = self.prompt_tokens = self.cached_tokens = 0
+
+
+_cache_stats = _PromptCacheStats()
+
+
+def record_prompt_usage(usage: RunUsage) -> int:
+    """
+    Record the prompt tokens of an agent run and how many of them were cache hits.
+    pydantic-ai maps OpenAI's `cached_tokens` to `cache_read_tokens`; DeepSeek reports
+    `prompt_cache_hit_tokens` instead, which ends up in `usage.details`.
+    
+    Returns:
+        Number of cached prompt tokens
+    """
+    cached = usage.cache_read_tokens or usage.details.get("prompt_cache_hit_tokens", 0)
+    _cache_stats.record(usage.input_tokens, cached)
+    LLM_TOKENS.inc(usage.input_tokens, kind="prompt")
+    LLM_TOKENS.inc(cached, kind="cached")
+    LLM_TOKENS.inc(usage.output_tokens, kind="completion")
+    logging.info(f"Prompt tokens: {usage.input_tokens} ({cached} cached)")
+    return cached
+
+
+def get_prompt_cache_stats() -> Dict[str, float]:
+    """Prompt tokens across runs, split into cached and uncached, with the hit rate."""
+    return _cache_stats.snapshot()
+
+
+def reset_prompt_cache_stats():
+    """Reset the prompt cache counters."""
+    _cache_stats.reset()
@@ -0,0 +1,334 @@
+"""
+Local intent fast path.
+
+Greetings, opening hours, "how much is X" and "what's free tomorrow" make up a
+large share of client messages. Each of them used to cost a full LLM round trip
+with the whole system prompt. Here a keyword/regex layer proposes an intent, a
+small naive-Bayes model trained on the seed phrases below confirms it, and only
+when both agree (and the answer can be built from the catalog or the calendar)
+is the turn answered locally. Everything else goes to the agent unchanged.
+"""
+import re
+import math
+import asyncio
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from pydantic_ai.messages import ModelMessage, ModelRequest, ModelResponse, TextPart, UserPromptPart
+
+from src.core.greetings import next_greeting_reply
+from src.core.products import get_catalog
+from src.core.appointments import check_availability, WORKING_HOURS_START, WORKING_HOURS_END
+from src.utils.date_parser import extract_date
+
+GREETING = "greeting"
+HOURS = "hours"
+PRICE = "price"
+AVAILABILITY = "availability"
+OTHER = "other"
+
+# Minimum model confidence (see `classify`) for the intent proposed by the rules
+CONFIDENCE_THRESHOLD = 0.6
+
+# Longer messages usually carry more than one request - leave them to the agent
+MAX_WORDS = 8
+
+# Phrases the model is trained on. "other" holds look-alikes that must go to the agent.
+SEED_EXAMPLES: Dict[str, List[str]] = {
+    GREETING: [
+        "היי", "הי", "שלום", "שלום לך", "היי מה נשמע", "בוקר טוב", "ערב טוב", "צהריים טובים",
+        "אהלן", "הלו", "hi", "hello", "hey", "hey there", "good morning", "hi there",
+    ],
+    HOURS: [
+        "מה שעות הפתיחה", "מה שעות הפעילות שלכם", "מתי אתם פתוחים", "עד מתי אתם עובדים",
+        "מאיזה שעה אתם פתוחים", "באיזה שעות אפשר להגיע", "מה השעות שלכם", "מתי את עובדת",
+        "what are your hours", "when are you open", "opening hours", "what time do you open",
+        "until what time are you open",
+    ],
+    PRICE: [
+        "כמה עולה לק ג'ל", "כמה עולה פדיקור", "מה המחיר של טיפול פנים", "כמה זה עולה",
+        "מה המחיר", "כמה עולה טיפול אקנה", "מחיר של פילינג", "כמה עולים הטיפולים",
+        "מה המחיר של הסרום", "how much is a pedicure", "how much does gel polish cost",
+        "price of the facial", "what is the price of the peeling",
+    ],
+    AVAILABILITY: [
+        "מה פנוי מחר", "יש תורים פנויים מחר", "יש תור פנוי ביום חמישי", "יש מקום מחר",
+        "מה יש פנוי ביום שני", "יש זמינות השבוע", "יש לך תור מחר", "מתי יש תור פנוי",
+        "איזה תורים יש מחרתיים", "what's free tomorrow", "any slots available on monday",
+        "do you have availability tomorrow", "is there a free slot on thursday",
+    ],
+    OTHER: [
+        "יש לי אקנה מה מומלץ", "העור שלי יבש מאוד", "אני רוצה לקבוע תור מחר ב-10",
+        "כמה זמן מחזיק לק ג'ל", "מה ההבדל בין פילינג לטיפול פנים", "תודה רבה", "אוקיי מעולה",
+        "שמי דנה והמייל שלי dana@example.com", "תראי לי תמונה של הפדיקור", "כן בבקשה",
+        "אפשר לבטל את התור", "what do you recommend for dry skin", "can you book me for 10",
+        "show me a picture", "thanks", "איפה אתם נמצאים", "יש חניה ליד",
+        "עד מתי הלק מחזיק", "עד מתי אפשר לבטל", "יש לך שני טיפולים מומלצים", "מה הטיפול הראשון שכדאי",
+    ],
+}
+
+_GREETING_RE = re.compile(
+    r'^(?:היי+|הי|שלום(?:\s+לך)?|אהלן|הלו|בוקר טוב|ערב טוב|צהריים טובים|hi+|hello|hey|good\s+(?:morning|evening))'
+    r'(?:\s+(?:there|מה נשמע|מה שלומך|רותי))?[\s!.,?🙂😊👋]*$'
+)
+_HOURS_RE = re.compile(
+    r'שעות\s+(?:ה)?(?:פתיחה|פעילות|עבודה)|(?:עד\s+)?מתי\s+(?:אתם|את|אתן)\s+(?:פתוח|עובד)|מאיזו?\s+שעה'
+    r'|באיזה\s+שעות|השעות\s+שלכם|opening\s+hours|your\s+hours|when\s+are\s+you\s+open|what\s+time\s+do\s+you\s+open'
+)
+_PRICE_RE = re.compile(
+    r'כמה\s+(?:זה\s+)?(?:עולה|עולים|עולות|יעלה)|מה\s+(?:ה)?מחיר(?:ים)?(?:\s+של)?|מחיר(?:\s+של)?'
+    r'|how\s+much\s+(?:is|are|does|for)(?:\s+(?:a|an|the))?|what(?:\'s|\s+is)\s+the\s+price\s+of|price\s+of|\bcosts?\b'
+)
+_AVAILABILITY_RE = re.compile(
+    r'פנוי|פנויים|פנויות|תורים|תור\b|זמינות|זמינה|מקום|\bfree\b|available|availability|slots?\b|openings?'
+)
+# A specific time means the client is starting to book - that flow belongs to the agent
+_SPECIFIC_TIME_RE = re.compile(r'\d{1,2}:\d{2}|(?<!\w)ב-?\d{1,2}(?!\d)|בשעה|\d\s*(?:am|pm)\b|\bat\s+\d')
+_FILLER_WORDS = {'של', 'את', 'ל', 'the', 'a', 'an'}
+
+_HEBREW_WEEKDAY_NAMES = ['שני', 'שלישי', 'רביעי', 'חמישי', 'שישי', 'שבת', 'ראשון']
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    confidence: float
+
+
+class LocalAnswer(NamedTuple):
+    intent: str
+    text: str
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercased words, plus each Hebrew word without a one-letter prefix (ה/ו/ב/ל/מ/ש)."""
+    tokens = []
+    for word in re.findall(r"[\w']+", text.lower()):
+        tokens.append(word)
+        if len(word) > 3 and word[0] in "הובלמש":
+            tokens.append(word[1:])
+    return tokens
+
+
+class _NaiveBayes:
+    """Multinomial naive Bayes with Laplace smoothing over `_tokenize` features."""
+
+    def __init__(self, examples: Dict[str, List[str]]):
+        total = sum(len(texts) for texts in examples.values())
+        self.log_priors = {label: math.log(len(texts) / total) for label, texts in examples.items()}
+        self.counts = {label: Counter(t for text in texts for t in _tokenize(text))
+                       for label, texts in examples.items()}
+        self.totals = {label: sum(counts.values()) for label, counts in self.counts.items()}
+        self.vocab_size = len({t for counts in self.counts.values() for t in counts})
+
+    def posteriors(self, text: str) -> Dict[str, float]:
+        tokens = _tokenize(text)
+        scores = {}
+        for label, log_prior in self.log_priors.items():
+            denominator = self.totals[label] + self.vocab_size
+            scores[label] = log_prior + sum(
+                math.log((self.counts[label][t] + 1) / denominator) for t in tokens
+            )
+        best = max(scores.values())
+        exp_scores = {label: math.exp(score - best) for label, score in scores.items()}
+        norm = sum(exp_scores.values())
+        return {label: value / norm for label, value in exp_scores.items()}
+
+
+_model = _NaiveBayes(SEED_EXAMPLES)
+
+
+def _rule_intent(text: str) -> Optional[str]:
+    if _GREETING_RE.match(text):
+        return GREETING
+    if _HOURS_RE.search(text):
+        return HOURS
+    if _PRICE_RE.search(text):
+        return PRICE
+    if _AVAILABILITY_RE.search(text):
+        return AVAILABILITY
+    return None
+
+
+def classify(text: str) -> IntentMatch:
+    """
+    Classify a client message. The rules propose an intent and the model confirms it:
+    confidence is the posterior of that intent against "other" (look-alikes that need
+    the agent). Messages no rule recognizes are "other".
+    """
+    normalized = " ".join(text.lower().split())
+    intent = _rule_intent(normalized)
+    if intent is None or len(normalized.split()) > MAX_WORDS:
+        return IntentMatch(OTHER, 0.0)
+    posteriors = _model.posteriors(normalized)
+    return IntentMatch(intent, posteriors[intent] / (posteriors[intent] + posteriors[OTHER]))
+
+
+def _format_slots(slots: List[str]) -> str:
+    if len(slots) == 1:
+        return slots[0]
+    return ", ".join(slots[:-1]) + f" ו-{slots[-1]}"
+
+
+def _answer_greeting() -> str:
+    return next_greeting_reply()
+
+
+def _answer_hours() -> str:
+    return (f"אנחנו מקבלות תורים בין {WORKING_HOURS_START}:00 ל-{WORKING_HOURS_END}:00. "
+            f"רוצה שאבדוק מה פנוי?")
+
+
+# (catalog, name tokens of each product), rebuilt when the catalog is replaced
+_name_tokens = (None, [])
+
+
+def _catalog_name_tokens(catalog) -> List[set]:
+    global _name_tokens
+    if _name_tokens[0] is not catalog:
+        _name_tokens = (catalog, [set(_tokenize(catalog.name(i))) for i in range(len(catalog))])
+    return _name_tokens[1]
+
+
+def _named_product(words: List[str]) -> Optional[int]:
+    """
+    The product `words` name: every one of them is in its name, and at least
+    one of them is in no other product's name ("לק ג'ל", "טיפול אקנה"). Generic
+    words ("טיפול פנים", "קרם") or description matches ("פילינג") name nothing.
+    """
+    names = _catalog_name_tokens(get_catalog())
+
+    def in_name(word: str, tokens: set) -> bool:
+        return word in tokens or (len(word) > 3 and word[0] in "הובלמש" and word[1:] in tokens)
+
+    candidates = [i for i, tokens in enumerate(names) if all(in_name(w, tokens) for w in words)]
+    if len(candidates) != 1:
+        return None
+    index = candidates[0]
+    distinctive = any(
+        not any(in_name(w, tokens) for j, tokens in enumerate(names) if j != index) for w in words
+    )
+    return index if distinctive else None
+
+
+def _answer_price(text: str) -> Optional[str]:
+    """Price of a single, unambiguous product. Broad questions go to the agent, which asks first."""
+    words = [w for w in re.findall(r"[\w']+", _PRICE_RE.sub(" ", text)) if w not in _FILLER_WORDS]
+    if not words:
+        return None
+    index = _named_product(words)
+    if index is None:
+        return None
+
+    product = get_catalog().get(index)
+    duration = f" והוא נמשך כ-{product.duration_hours:g} שעות" if product.duration_hours else ""
+    return f"{product.name} עולה {product.price:g} ₪{duration}. רוצה שאבדוק תורים פנויים?"
+
+
+async def _answer_availability(text: str, reference_time: Optional[datetime]) -> Optional[str]:
+    if _SPECIFIC_TIME_RE.search(text):
+        return None
+    date_str = extract_date(text, reference_time)
+    if not date_str:
+        return None
+
+    # The calendar client is blocking - keep it off the event loop
+    slots = await asyncio.to_thread(check_availability, date_str)
+    if any(slot.startswith("Error") for slot in slots):
+        return None
+
+    date = datetime.strptime(date_str, "%Y-%m-%d")
+    day = f"ביום {_HEBREW_WEEKDAY_NAMES[date.weekday()]} ({date.day}.{date.month})"
+    if not slots:
+        return f"{day} הכל תפוס. לבדוק לך יום אחר?"
+    return f"{day} יש תורים פנויים ב-{_format_slots(slots[:4])}. איזו שעה נוחה לך?"
+
+
+class _IntentStats:
+    """Thread-safe counters for how many turns were answered locally."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.local: Counter = Counter()
+
+    def record(self, intent: Optional[str]):
+        with self._lock:
+            self.turns += 1
+            if intent:
+                self.local[intent] += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            handled = sum(self.local.values())
+            return {
+                "turns": self.turns,
+                "handled_locally": handled,
+                "local_fraction": handled / self.turns if self.turns else 0.0,
+                "by_intent": dict(self.local),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.turns = 0
+            self.local.clear()
+
+
+_stats = _IntentStats()
+
+
+def get_intent_stats() -> Dict[str, object]:
+    """Turns seen, turns answered locally, their fraction and a per-intent breakdown."""
+    return _stats.snapshot()
+
+
+def reset_intent_stats():
+    """Reset the local-answer counters."""
+    _stats.reset()
+
+
+async def answer_locally(text: str, reference_time: Optional[datetime] = None) -> Optional[LocalAnswer]:
+    """
+    Answer a simple message without the LLM.
+
+    Returns:
+        LocalAnswer, or None when the turn should go to the agent
+    """
+    match = classify(text)
+    reply = None
+    if match.intent != OTHER and match.confidence >= CONFIDENCE_THRESHOLD:
+        normalized = " ".join(text.lower().split())
+        try:
+            if match.intent == GREETING:
+                reply = _answer_greeting()
+            elif match.intent == HOURS:
+                reply = _answer_hours()
+            elif match.intent == PRICE:
+                reply = _answer_price(normalized)
+            elif match.intent == AVAILABILITY:
+                reply = await _answer_availability(normalized, reference_time)
+        except Exception as e:
+            logging.warning(f"Local {match.intent} answer failed, handing off to the agent: {e}")
+            reply = None
+
+    _stats.record(match.intent if reply else None)
+    if not reply:
+        return None
+    logging.info(f"Answered locally: {match.intent} (confidence {match.confidence:.2f}, "
+                 f"{get_intent_stats()['local_fraction']:.0%} of turns so far)")
+    return LocalAnswer(match.intent, reply)
+
+
+def local_turn_messages(user_text: str, reply: str, source: str = "local-intent") -> List[ModelMessage]:
+    """
+    A request/response pair for the conversation history, as if the agent had answered.
+
+    Args:
+        source: Recorded as the response's model name, to tell local answers apart
+    """
+    return [
+        ModelRequest(parts=[UserPromptPart(content=user_text)]),
+        ModelResponse(parts=[TextPart(content=reply)], model_name=source),
+    ]
@@ -0,0 +1,229 @@
+"""
+Shared HTTP client for the LLM providers.
+
+Every provider client is built on one pooled `httpx.AsyncClient`, so
+connections stay alive between turns instead of being set up per client.
+Requests go through `ResilientTransport`, which adds:
+  - a deadline per attempt for the response headers (the read timeout only
+    bounds the gap between chunks, which never fires on a slow streamed reply)
+  - retries with full jitter on connection errors, timeouts and 429/5xx
+  - optional hedging: when a response is slower than the rolling p95 of recent
+    ones, a second identical request is sent and the first response wins
+"""
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from src.core.config import Config
+from src.utils.stats import percentile
+
+# HTTP/2 multiplexes concurrent requests over one connection; httpx needs the optional h2 package for it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Connection pool
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 60.0
+
+# Timeouts in seconds
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 30.0
+REQUEST_DEADLINE = 45.0
+
+# Retries: full jitter, i.e. a random delay between 0 and base * 2^attempt (capped)
+MAX_RETRIES = 2
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Hedging: only once there are enough samples, and never earlier than HEDGE_MIN_DELAY
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 1.0
+
+
+def _latency_key(request: httpx.Request) -> Tuple[str, str, bool]:
+    # Streamed and non-streamed completions have very different time-to-headers
+    try:
+        content = request.content
+    except httpx.RequestNotRead:
+        content = b""
+    streaming = b'"stream":true' in content or b'"stream": true' in content
+    return request.url.host, request.url.path, streaming
+
+
+def _discard_response(task: asyncio.Future):
+    """Close the response of a request that lost a hedge race."""
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().aclose())
+
+
+class _ClientStats:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latencies: Dict[Tuple[str, str, bool], Deque[float]] = {}
+
+    def record_latency(self, key: Tuple[str, str, bool], seconds: float):
+        self.latencies.setdefault(key, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        samples = [s for window in self.latencies.values() for s in window]
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p50_ms": percentile(samples, 50) * 1000 if samples else 0.0,
+            "p95_ms": percentile(samples, 95) * 1000 if samples else 0.0,
+        }
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport with per-attempt deadlines, jittered retries and optional hedging."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, hedging: bool = False):
+        self._transport = transport
+        self.hedging = hedging
+        self.stats = _ClientStats()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.requests += 1
+        for attempt in range(MAX_RETRIES + 1):
+            retry_after = None
+            try:
+                response = await self._send(request)
+            except httpx.TransportError as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                logging.warning(f"LLM request to {request.url.host} failed ({type(e).__name__}), retrying")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                    return response
+                retry_after = response.headers.get("retry-after")
+                await response.aclose()
+                logging.warning(f"LLM request to {request.url.host} returned {response.status_code}, retrying")
+
+            self.stats.retries += 1
+            await asyncio.sleep(self._retry_delay(attempt, retry_after))
+        raise RuntimeError("unreachable")
+
+    @staticmethod
+    def _retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after and retry_after.replace(".", "", 1).isdigit():
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+    def hedge_delay(self, request: httpx.Request) -> Optional[float]:
+        """Seconds to wait before hedging this request, or None to not hedge."""
+        if not self.hedging:
+            return None
+        window = self.stats.latencies.get(_latency_key(request))
+        if not window or len(window) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, percentile(window, 95))
+
+    async def _attempt(self, request: httpx.Request) -> httpx.Response:
+        try:
+            return await asyncio.wait_for(self._transport.handle_async_request(request), REQUEST_DEADLINE)
+        except asyncio.TimeoutError as e:
+            # Callers (httpx, openai) handle httpx timeouts, not asyncio's
+            raise httpx.ReadTimeout(f"No response within {REQUEST_DEADLINE}s", request=request) from e
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        delay = self.hedge_delay(request)
+        primary = asyncio.ensure_future(self._attempt(request))
+        tasks = [primary]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.stats.hedges += 1
+                    tasks.append(asyncio.ensure_future(self._attempt(request)))
+            winner = await self._first_success(tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    task.add_done_callback(_discard_response)
+
+        if winner is not primary:
+            self.stats.hedge_wins += 1
+        self.stats.record_latency(_latency_key(request), time.perf_counter() - start)
+        return winner.result()
+
+    @staticmethod
+    async def _first_success(tasks: list) -> asyncio.Future:
+        """The first task to return a response; raises the last error if all of them fail."""
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [task for task in done if task.exception() is None]
+            if succeeded:
+                for task in succeeded[1:]:
+                    _discard_response(task)
+                return succeeded[0]
+            error = next(iter(done)).exception()
+        raise error
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+_transport: Optional[ResilientTransport] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The pooled HTTP client shared by all LLM providers, created on first use."""
+    global _http_client, _transport
+    if _http_client is None:
+        limits = httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+        _transport = ResilientTransport(
+            httpx.AsyncHTTPTransport(limits=limits, http2=HTTP2_AVAILABLE),
+            hedging=Config.get_llm_hedging(),
+        )
+        _http_client = httpx.AsyncClient(
+            transport=_transport,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+        logging.info(f"LLM HTTP client ready (http2={HTTP2_AVAILABLE}, hedging={Config.get_llm_hedging()})")
+    return _http_client
+
+
+def create_openai_client(base_url: str, api_key: str) -> AsyncOpenAI:
+    """An OpenAI-compatible client on the shared pool. Retries are done by the transport."""
+    return AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=get_http_client(), max_retries=0)
+
+
+def get_llm_client_stats() -> Dict[str, float]:
+    """Requests, retries, hedges fired and won, and header latency percentiles."""
+    if _transport is None:
+        return _ClientStats().snapshot()
+    return _transport.stats.snapshot()
+
+
+async def close_http_client():
+    """Close the shared client's connections (on shutdown)."""
+    global _http_client, _transport
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = _transport = None
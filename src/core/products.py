@@ -1,5 +1,7 @@
+import math
+from array import array
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 
 class Product(BaseModel):
     id: str
@@ -134,21 +136,201 @@ PRODUCTS = [
     )
 ]
 
+
+class _StringTable:
+    """Interns repeated strings (or tuples of strings) and hands out small integer ids."""
+
+    __slots__ = ('values', 'lowered', '_index')
+
+    def __init__(self):
+        self.values = []
+        self.lowered = []
+        self._index = {}
+
+    def add(self, value) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = len(self.values)
+            self._index[value] = index
+            self.values.append(value)
+            if isinstance(value, tuple):
+                self.lowered.append(tuple(v.lower() for v in value))
+            else:
+                self.lowered.append(value.lower() if value else "")
+        return index
+
+    def matching(self, query: str) -> set:
+        """Ids of all entries containing `query` (any element, for tuple entries)."""
+        matches = set()
+        for index, lowered in enumerate(self.lowered):
+            if isinstance(lowered, tuple):
+                if any(query in v for v in lowered):
+                    matches.add(index)
+            elif query in lowered:
+                matches.add(index)
+        return matches
+
+
+class ProductCatalog:
+    """
+    Compact, columnar product store for large catalogs.
+
+    Repeated strings (categories, concerns, skin types, descriptions, image paths)
+    are interned into shared tables, prices and durations live in typed arrays,
+    and `Product` models are only materialized when returned to the caller.
+    """
+
+    __slots__ = (
+        '_ids', '_names', '_names_lower', '_id_index',
+        '_categories', '_descriptions', '_benefits', '_skin_types', '_concerns', '_images',
+        '_category_ids', '_description_ids', '_benefit_ids', '_skin_type_ids', '_concern_ids',
+        '_image_ids', '_prices', '_durations',
+    )
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._names_lower: List[str] = []
+        self._id_index: Dict[str, int] = {}
+
+        self._categories = _StringTable()
+        self._descriptions = _StringTable()
+        self._benefits = _StringTable()
+        self._skin_types = _StringTable()
+        self._concerns = _StringTable()
+        self._images = _StringTable()
+
+        self._category_ids = array('I')
+        self._description_ids = array('I')
+        self._benefit_ids = array('I')
+        self._skin_type_ids = array('I')
+        self._concern_ids = array('I')
+        self._image_ids = array('I')
+        self._prices = array('d')
+        self._durations = array('d')  # NaN when the product has no duration
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "ProductCatalog":
+        """Build a catalog from plain dicts with the same fields as `Product`."""
+        catalog = cls()
+        for record in records:
+            catalog.add(**record)
+        return catalog
+
+    @classmethod
+    def from_products(cls, products: Iterable[Product]) -> "ProductCatalog":
+        """Build a catalog from existing `Product` models."""
+        return cls.from_records(product.model_dump() for product in products)
+
+    def add(self, id: str, name: str, category: str, description: str, benefits: str,
+            price: float, target_skin_type: List[str], target_concern: List[str],
+            image_path: Optional[str] = None, duration_hours: Optional[float] = None):
+        """Append a single product to the catalog."""
+        # Like a scan of the product list, the first product with an id wins
+        self._id_index.setdefault(id, len(self._ids))
+        self._ids.append(id)
+        self._names.append(name)
+        lowered = name.lower()
+        # Share the original string when lowering doesn't change it (e.g. Hebrew names)
+        self._names_lower.append(name if lowered == name else lowered)
+
+        self._category_ids.append(self._categories.add(category))
+        self._description_ids.append(self._descriptions.add(description))
+        self._benefit_ids.append(self._benefits.add(benefits))
+        self._skin_type_ids.append(self._skin_types.add(tuple(target_skin_type)))
+        self._concern_ids.append(self._concerns.add(tuple(target_concern)))
+        self._image_ids.append(self._images.add(image_path or ""))
+        self._prices.append(float(price))
+        self._durations.append(math.nan if duration_hours is None else float(duration_hours))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get(self, index: int) -> Product:
+        """Materialize the product at `index` as a `Product` model."""
+        duration = self._durations[index]
+        return Product.model_construct(
+            id=self._ids[index],
+            name=self._names[index],
+            category=self._categories.values[self._category_ids[index]],
+            description=self._descriptions.values[self._description_ids[index]],
+            benefits=self._benefits.values[self._benefit_ids[index]],
+            price=self._prices[index],
+            target_skin_type=list(self._skin_types.values[self._skin_type_ids[index]]),
+            target_concern=list(self._concerns.values[self._concern_ids[index]]),
+            image_path=self.image_path(index),
+            duration_hours=None if math.isnan(duration) else duration,
+        )
+
+    def all(self) -> List[Product]:
+        return [self.get(i) for i in range(len(self))]
+
+    def name(self, index: int) -> str:
+        return self._names[index]
+
+    def image_path(self, index: int) -> Optional[str]:
+        return self._images.values[self._image_ids[index]] or None
+
+    def index_by_id(self, product_id: str) -> Optional[int]:
+        return self._id_index.get(product_id)
+
+    def first_index_by_name(self, name: str) -> Optional[int]:
+        """Index of the first product whose name contains `name` (case-insensitive)."""
+        name = name.lower()
+        for index, product_name in enumerate(self._names_lower):
+            if name in product_name:
+                return index
+        return None
+
+    def indices_by_category(self, category: str) -> List[int]:
+        """Indices of products whose category contains `category` (case-insensitive)."""
+        matching = self._categories.matching(category.lower())
+        return [i for i, category_id in enumerate(self._category_ids) if category_id in matching]
+
+    def search_indices(self, query: str) -> List[int]:
+        """
+        Indices of products matching `query` in name, category, benefits,
+        description or concerns. Each interned value is checked once per query.
+        """
+        query = query.lower()
+        categories = self._categories.matching(query)
+        descriptions = self._descriptions.matching(query)
+        benefits = self._benefits.matching(query)
+        concerns = self._concerns.matching(query)
+
+        return [
+            i for i, name in enumerate(self._names_lower)
+            if (query in name or
+                self._category_ids[i] in categories or
+                self._benefit_ids[i] in benefits or
+                self._description_ids[i] in descriptions or
+                self._concern_ids[i] in concerns)
+        ]
+
+    def search(self, query: str) -> List[Product]:
+        return [self.get(i) for i in self.search_indices(query)]
+
+
+_catalog = ProductCatalog.from_products(PRODUCTS)
+
+
+def get_catalog() -> ProductCatalog:
+    """Get the active product catalog."""
+    return _catalog
+
+
+def set_catalog(catalog: ProductCatalog):
+    """Replace the active product catalog (e.g. after importing a distributor catalog)."""
+    global _catalog
+    _catalog = catalog
+
+
 def search_products(query: str) -> List[Product]:
     """
     פונקציית חיפוש פשוטה למציאת מוצרים וטיפולים לפי שאילתא.
     מחפשת בשם, קטגוריה, תיאור או דאגות.
     """
-    query = query.lower()
-    results = []
-    for product in PRODUCTS:
-        if (query in product.name.lower() or 
-            query in product.category.lower() or 
-            query in product.benefits.lower() or
-            query in product.description.lower() or
-            any(query in c.lower() for c in product.target_concern)):
-            results.append(product)
-    return results
+    return _catalog.search(query)
 
 def get_all_products() -> List[Product]:
-    return PRODUCTS
+    return _catalog.all()
@@ -0,0 +1,282 @@
+"""
+Latency-aware routing across the LLM providers we have keys for.
+
+`RoutedModel` is a pydantic-ai model that sends each request to the provider
+with the best recent record and fails over to the next one when a request
+errors, like pydantic-ai's `FallbackModel` but with an order that follows live
+measurements:
+  - every provider keeps an exponentially weighted moving average (EWMA) of its
+    latency (streamed and non-streamed requests separately) and error rate
+  - a failed provider is skipped for a cooldown that doubles with each
+    consecutive failure
+  - the current provider is only replaced when another is clearly faster
+    (SWITCH_MARGIN), so a conversation keeps hitting the same provider's prompt cache
+  - a small share of requests goes to another healthy provider so its numbers stay fresh
+
+Every request logs the provider it was routed to.
+"""
+import time
+import random
+import asyncio
+import logging
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import APIConnectionError
+from pydantic_ai import RunContext
+from pydantic_ai.exceptions import FallbackExceptionGroup, ModelHTTPError
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.openai import OpenAIModel
+from pydantic_ai.providers.openai import OpenAIProvider
+from pydantic_ai.settings import ModelSettings, merge_model_settings
+
+from src.core.config import Config
+from src.core.llm_client import create_openai_client
+from src.utils.tracing import span
+
+DEEPSEEK_BASE_URL = 'https://api.deepseek.com'
+OPENROUTER_BASE_URL = 'https://openrouter.ai/api/v1'
+GEMINI_BASE_URL = 'https://generativelanguage.googleapis.com/v1beta/openai/'
+
+# Weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.2
+
+# A 100% error rate counts as this many times the latency
+ERROR_PENALTY = 4.0
+
+# Another provider must be this much better (relative score) to take over
+SWITCH_MARGIN = 0.25
+
+# Share of requests sent to a random other healthy provider to keep its numbers fresh
+EXPLORE_RATE = 0.02
+
+# Cooldown after a failure: base * 2^(consecutive failures - 1), capped
+COOLDOWN_BASE = 5.0
+COOLDOWN_MAX = 120.0
+
+# Errors that mean "try another provider" rather than "this request is broken"
+FAILOVER_ERRORS = (ModelHTTPError, APIConnectionError, httpx.TransportError, asyncio.TimeoutError)
+# HTTP statuses that are the provider's problem; any other 4xx is the request's
+FAILOVER_STATUS_CODES = (408, 429)
+
+
+def is_provider_failure(exc: Exception) -> bool:
+    """Whether a FAILOVER_ERRORS error counts against the provider (overload, outage, timeout)."""
+    if isinstance(exc, ModelHTTPError):
+        return exc.status_code >= 500 or exc.status_code in FAILOVER_STATUS_CODES
+    return True
+
+
+class ProviderHealth:
+    """Rolling latency and error numbers for one provider."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latency: Dict[bool, Optional[float]] = {False: None, True: None}
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def score(self, streamed: bool) -> Optional[float]:
+        """Expected cost of a request: latency inflated by the error rate. None until measured."""
+        latency = self.latency[streamed]
+        if latency is None:
+            return None
+        return latency * (1 + ERROR_PENALTY * self.error_rate)
+
+    def record_success(self, seconds: float, streamed: bool):
+        self.requests += 1
+        self.consecutive_failures = 0
+        previous = self.latency[streamed]
+        self.latency[streamed] = seconds if previous is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * previous
+        self.error_rate *= 1 - EWMA_ALPHA
+
+    def record_failure(self, now: float):
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_failures += 1
+        self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+        self.cooldown_until = now + min(COOLDOWN_MAX, COOLDOWN_BASE * 2 ** (self.consecutive_failures - 1))
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.error_rate,
+            "latency_ms": self.latency[False] * 1000 if self.latency[False] is not None else None,
+            "stream_latency_ms": self.latency[True] * 1000 if self.latency[True] is not None else None,
+            "healthy": self.healthy(now),
+        }
+
+
+class RoutedModel(Model):
+    """Routes each request to the fastest healthy provider and fails over on errors."""
+
+    def __init__(self, models: Dict[str, Model]):
+        """
+        Args:
+            models: Provider name -> model, in order of preference while nothing is measured yet.
+        """
+        super().__init__()
+        if not models:
+            raise ValueError("RoutedModel needs at least one model")
+        self.models = models
+        self.health = {name: ProviderHealth(name) for name in models}
+        self.current = next(iter(models))
+
+    @property
+    def model_name(self) -> str:
+        return f'routed:{",".join(model.model_name for model in self.models.values())}'
+
+    @property
+    def system(self) -> str:
+        return f'routed:{",".join(model.system for model in self.models.values())}'
+
+    @property
+    def base_url(self) -> Optional[str]:
+        return self.models[self.current].base_url
+
+    def route(self, streamed: bool) -> List[str]:
+        """Provider names in the order to try them for the next request."""
+        now = time.monotonic()
+        names = list(self.models)
+        healthy = [name for name in names if self.health[name].healthy(now)]
+        # Everyone cooling down: try them anyway, the one that failed longest ago first
+        if not healthy:
+            return sorted(names, key=lambda name: self.health[name].cooldown_until)
+
+        def sort_key(name: str):
+            score = self.health[name].score(streamed)
+            return (score is None, score or 0.0, names.index(name))
+
+        ordered = sorted(healthy, key=sort_key)
+        best = ordered[0]
+        if self.current in healthy and best != self.current:
+            current_score = self.health[self.current].score(streamed)
+            best_score = self.health[best].score(streamed)
+            if current_score is None or best_score is None or best_score > current_score * (1 - SWITCH_MARGIN):
+                ordered.remove(self.current)
+                ordered.insert(0, self.current)
+
+        if len(ordered) > 1 and random.random() < EXPLORE_RATE:
+            ordered.insert(0, ordered.pop(random.randrange(1, len(ordered))))
+
+        unhealthy = [name for name in names if name not in healthy]
+        return ordered + unhealthy
+
+    def _succeeded(self, name: str, start: float, streamed: bool):
+        elapsed = time.monotonic() - start
+        self.health[name].record_success(elapsed, streamed)
+        if name != self.current:
+            logging.info(f"LLM router: switching from {self.current} to {name}")
+            self.current = name
+        logging.info(f"LLM request routed to {name} ({'stream' if streamed else 'request'}, {elapsed * 1000:.0f}ms)")
+
+    def _failed(self, name: str, exc: Exception):
+        self.health[name].record_failure(time.monotonic())
+        logging.warning(f"LLM request to {name} failed, failing over: {exc}")
+
+    async def request(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        exceptions: List[Exception] = []
+        for name in self.route(streamed=False):
+            model = self.models[name]
+            parameters = model.customize_request_parameters(model_request_parameters)
+            start = time.monotonic()
+            try:
+                with span("llm.request", provider=name, model=model.model_name, streamed=False) as request_span:
+                    response = await model.request(
+                        messages, merge_model_settings(model.settings, model_settings), parameters
+                    )
+                    request_span.set_attribute("input_tokens", response.usage.input_tokens)
+                    request_span.set_attribute("output_tokens", response.usage.output_tokens)
+            except FAILOVER_ERRORS as exc:
+                if not is_provider_failure(exc):
+                    raise
+                self._failed(name, exc)
+                exceptions.append(exc)
+                continue
+            self._succeeded(name, start, streamed=False)
+            return response
+        raise FallbackExceptionGroup('All LLM providers failed', exceptions)
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+        run_context: Optional[RunContext[Any]] = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        exceptions: List[Exception] = []
+        for name in self.route(streamed=True):
+            model = self.models[name]
+            parameters = model.customize_request_parameters(model_request_parameters)
+            start = time.monotonic()
+            async with AsyncExitStack() as stack:
+                # The span covers the whole stream, with the time to the first chunk as an attribute
+                request_span = stack.enter_context(
+                    span("llm.request", provider=name, model=model.model_name, streamed=True)
+                )
+                try:
+                    # Entering the stream waits for the first chunk - that's the latency we track
+                    response = await stack.enter_async_context(model.request_stream(
+                        messages, merge_model_settings(model.settings, model_settings), parameters, run_context
+                    ))
+                except FAILOVER_ERRORS as exc:
+                    request_span.set_attribute("error", type(exc).__name__)
+                    if not is_provider_failure(exc):
+                        raise
+                    self._failed(name, exc)
+                    exceptions.append(exc)
+                    continue
+                request_span.set_attribute("first_chunk_ms", (time.monotonic() - start) * 1000)
+                self._succeeded(name, start, streamed=True)
+                yield response
+                return
+        raise FallbackExceptionGroup('All LLM providers failed', exceptions)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {name: health.snapshot(now) for name, health in self.health.items()}
+
+
+def _openai_compatible(model_name: str, base_url: str, api_key: str) -> OpenAIModel:
+    provider = OpenAIProvider(openai_client=create_openai_client(base_url, api_key))
+    return OpenAIModel(model_name, provider=provider)
+
+
+def build_router() -> RoutedModel:
+    """A RoutedModel over every provider with an API key, DeepSeek preferred."""
+    models: Dict[str, Model] = {}
+    if Config.get_fake_llm_url():
+        # Load tests: never send a request to a real provider
+        logging.warning(f"LLM router: using the fake LLM at {Config.get_fake_llm_url()}")
+        return RoutedModel({"fake": _openai_compatible('fake-llm', Config.get_fake_llm_url(), 'fake-key')})
+    if Config.get_deepseek_api_key():
+        models["deepseek"] = _openai_compatible('deepseek-chat', DEEPSEEK_BASE_URL, Config.get_deepseek_api_key())
+    if Config.get_openrouter_api_key():
+        models["openrouter"] = _openai_compatible(
+            Config.get_openrouter_model(), OPENROUTER_BASE_URL, Config.get_openrouter_api_key()
+        )
+    if Config.get_gemini_api_key():
+        # Gemini through its OpenAI-compatible endpoint, so all providers share one client stack
+        models["gemini"] = _openai_compatible(Config.get_gemini_model(), GEMINI_BASE_URL, Config.get_gemini_api_key())
+
+    if not models:
+        raise ValueError(
+            "No LLM API key found. Please add DEEPSEEK_API_KEY, OPENROUTER_API_KEY or GEMINI_API_KEY to your .env file"
+        )
+    logging.info(f"LLM router providers: {', '.join(models)}")
+    return RoutedModel(models)
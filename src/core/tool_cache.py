@@ -0,0 +1,143 @@
+"""
+Conversation-scoped cache of tool results.
+
+Within a run, and over a few consecutive turns, the model often calls the same
+tool with the same arguments again (availability for the date it already
+checked, the product query it already ran). Each chat's
+`BeautyAdvisorDependencies` carries a `ToolResultCache`, so a repeated call
+returns the earlier result while it is fresh:
+  - every tool has its own time-to-live (TOOL_TTLS); tools without one are not cached
+  - booking an appointment invalidates the cached availability, which it just changed
+"""
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Seconds a tool result stays fresh. Availability changes when anyone books, products almost never.
+TOOL_TTLS = {
+    "check_appointment_availability": 60.0,
+    "lookup_products": 600.0,
+    "list_all_products": 600.0,
+    "get_product_visual": 600.0,
+}
+
+# Entries per conversation before the oldest are dropped
+MAX_ENTRIES = 64
+
+
+class _ToolCacheStats:
+    """Thread-safe hit/miss totals across all conversations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def record_invalidation(self, entries: int):
+        with self._lock:
+            self.invalidations += entries
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+
+
+_stats = _ToolCacheStats()
+
+
+class ToolResultCache:
+    """Tool results of one conversation, keyed by tool name and normalized arguments."""
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, clock: Callable[[], float] = time.monotonic):
+        self.ttls = TOOL_TTLS if ttls is None else ttls
+        self._clock = clock
+        # Tools of one run may execute in parallel worker threads
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, Hashable], Tuple[float, Any]] = {}
+
+    def has(self, tool: str, key: Hashable) -> bool:
+        """True if a fresh result of `tool` for `key` is cached."""
+        with self._lock:
+            entry = self._entries.get((tool, key))
+        return entry is not None and entry[0] > self._clock()
+
+    def get_or_call(self, tool: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        The cached result of `tool` for `key`, or `compute()` (cached for the tool's TTL).
+
+        Args:
+            key: The tool's arguments in normalized form, e.g. the parsed date rather than the raw text
+        """
+        ttl = self.ttls.get(tool)
+        if not ttl:
+            return compute()
+
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get((tool, key))
+        if entry is not None and entry[0] > now:
+            _stats.record(hit=True)
+            logging.debug(f"Tool cache hit: {tool}({key!r})")
+            return entry[1]
+
+        _stats.record(hit=False)
+        result = compute()
+        with self._lock:
+            self._entries[(tool, key)] = (self._clock() + ttl, result)
+            if len(self._entries) > MAX_ENTRIES:
+                self._evict(now)
+        return result
+
+    def _evict(self, now: float):
+        # Expired entries first, then the ones closest to expiry
+        for cache_key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[cache_key]
+        while len(self._entries) > MAX_ENTRIES:
+            del self._entries[min(self._entries, key=lambda k: self._entries[k][0])]
+
+    def invalidate(self, tool: Optional[str] = None) -> int:
+        """
+        Drop the cached results of `tool` (all tools if None).
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            stale = [k for k in self._entries if tool is None or k[0] == tool]
+            for cache_key in stale:
+                del self._entries[cache_key]
+        _stats.record_invalidation(len(stale))
+        return len(stale)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def get_tool_cache_stats() -> Dict[str, float]:
+    """Tool cache hits, misses, invalidated entries and hit rate across conversations."""
+    return _stats.snapshot()
+
+
+def reset_tool_cache_stats():
+    """Reset the tool cache counters."""
+    _stats.reset()
@@ -2,10 +2,27 @@ import os
 import asyncio
 import logging
 import re
+from typing import List, Tuple
 from telegram import Update
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, filters
+from telegram.error import BadRequest
+from pydantic_ai import Agent
 from src.core.config import Config
-from src.core.agent import beauty_advisor_agent, BeautyAdvisorDependencies
+from src.core.agent import beauty_advisor_agent, BeautyAdvisorDependencies, llm_router
+from src.core.history import ConversationHistory, record_prompt_usage, get_prompt_cache_stats
+from src.core.conversation_store import ConversationStore, open_backend
+from src.core.llm_client import close_http_client, get_llm_client_stats
+from src.telegram.dispatcher import ChatDispatcher
+from src.telegram.coalescer import MessageCoalescer
+from src.telegram.file_id_cache import FileIdCache
+from src.core.intents import answer_locally, local_turn_messages, get_intent_stats
+from src.core.greetings import next_welcome, START_TRIGGER, get_greeting_stats
+from src.utils.date_parser import warm_up_date_parser, get_cache_stats as get_date_cache_stats
+from src.utils.tracing import span, traced, configure_tracing, shutdown_tracing
+from src.utils.metrics import register_stats, start_metrics_server, timing_scope, AGENT_RUN_SECONDS, TURN_SECONDS
+from src.utils.recorder import configure_recorder, close_recorder, record_turn, start_session
+from src.core.appointments import get_prefetch_stats
+from src.core.tool_cache import get_tool_cache_stats
 
 # Configure logging
 logging.basicConfig(
@@ -13,36 +30,81 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-# Store conversation history: chat_id -> List[Message]
-# Note: In production, use a persistent database (Redis, Postgres).
-# For this prototype, in-memory is fine, but it will be lost on restart.
-conversations = {}
+# Streaming: minimum seconds between edits of the streamed message (Telegram rate-limits edits)
+STREAM_EDIT_INTERVAL = 1.0
+# Streaming: seconds to group incoming tokens before looking at the text again
+STREAM_DEBOUNCE = 0.2
+
+# Per-chat tool state (tool result cache, prefetches): chat_id -> BeautyAdvisorDependencies
+dependencies = {}
+
+# כל צ'אט מעובד לפי הסדר, וצ'אטים שונים במקביל עד למגבלת קריאות ה-LLM
+dispatcher = ChatDispatcher(Config.get_max_concurrent_llm())
+
+# הודעות קצרות שנשלחות ברצף מאוחדות להרצה אחת של הסוכן
+coalescer = MessageCoalescer(dispatcher, Config.get_coalesce_window())
+
+# file_id של תמונות שכבר הועלו לטלגרם (נשמר לקובץ בהפעלה)
+photo_cache = FileIdCache()
+
+def forget_chat(chat_id: int):
+    """Drop the per-chat state kept next to a history that left memory."""
+    dependencies.pop(chat_id, None)
+    coalescer.forget(chat_id)
+
+# Store conversation history: chat_id -> ConversationHistory
+# היסטוריות בזיכרון (LRU) מול מאגר קבוע (SQLite/Redis) שמוגדר בהפעלה, כך שהפעלה מחדש לא מאפסת שיחות
+# צ'אט לא פעיל, או חריגה מתקציב הזיכרון, מוציאים את ההיסטוריה מהזיכרון (היא נטענת שוב בהודעה הבאה)
+conversations = ConversationStore(
+    capacity=Config.get_conversation_cache_size(),
+    idle_timeout=Config.get_conversation_idle_timeout(),
+    memory_budget=Config.get_conversation_memory_budget(),
+    on_evict=forget_chat,
+)
+
+def get_history(chat_id: int) -> ConversationHistory:
+    """The token-budgeted history of a chat, created on first use (see `conversations.load`)."""
+    return conversations.get(chat_id)
+
+def get_conversation_stats() -> dict:
+    """Chats held in memory, the approximate bytes of their histories, and store activity."""
+    return {
+        "active": len(conversations),
+        "tool_state_chats": len(dependencies),
+        **conversations.stats(),
+    }
+
+def get_dependencies(chat_id: int) -> BeautyAdvisorDependencies:
+    """The tool state of a chat, kept alongside its history."""
+    if chat_id not in dependencies:
+        dependencies[chat_id] = BeautyAdvisorDependencies()
+    return dependencies[chat_id]
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    deps = BeautyAdvisorDependencies()
-    
-    # Reset history on /start
-    conversations[chat_id] = []
+    await dispatcher.submit(chat_id, lambda: start_conversation(context, chat_id))
+
+@traced("telegram.start", root=True)
+async def start_conversation(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    # Reset history and cached tool results on /start
+    conversations[chat_id] = ConversationHistory()
+    dependencies[chat_id] = BeautyAdvisorDependencies()
+    start_session(chat_id)
     
-    # Trigger the agent's welcome message
-    trigger_msg = "הלקוחה הגיעה כרגע. התחילי את השיחה לפי ההוראות שלך."
+    # ברכת פתיחה מוכנה מראש במקום קריאה ל-LLM; נשמרת בהיסטוריה כאילו הסוכן כתב אותה
+    greeting = next_welcome()
     try:
-        result = await beauty_advisor_agent.run(trigger_msg, deps=deps)
-        conversations[chat_id].extend(result.new_messages())
-        await send_response(context, chat_id, result.output)
+        await context.bot.send_message(chat_id=chat_id, text=greeting)
+        conversations[chat_id].add_turn(local_turn_messages(START_TRIGGER, greeting, source="greeting"))
+        conversations.mark_dirty(chat_id)
     except Exception as e:
         logging.error(f"Error in start: {e}")
-        await context.bot.send_message(chat_id=chat_id, text="סליחה, יש לי קצת בעיה להתעורר עכשיו. 😴")
 
-async def send_response(context: ContextTypes.DEFAULT_TYPE, chat_id: int, response_text: str):
+def extract_markers(response_text: str) -> Tuple[str, List[str], List[str]]:
     """
-    Parse the response and send text with images/calendar files if needed.
-    Supports IMAGE:path and CALENDAR:path syntax in responses.
+    Split an agent response into clean text, image paths and calendar file paths.
+    Supports IMAGE:path, Markdown ![alt](path) and CALENDAR:path syntax.
     """
-    # Log the raw response for debugging
-    logging.info(f"Raw agent response: {response_text}")
-
     # Check for image markers (both IMAGE:path and Markdown ![alt](path))
     # Capture non-whitespace characters for IMAGE:, and content inside () for Markdown
     image_pattern = r'IMAGE:\s*([^\s]+)|!\[.*?\]\((.*?)\)'
@@ -56,7 +118,8 @@ async def send_response(context: ContextTypes.DEFAULT_TYPE, chat_id: int, respon
         # match is a tuple, take the non-empty one
         path = match[0] if match[0] else match[1]
         if path:
-            images.append(path)
+            # Clean up common punctuation that might adhere to the URL/Path if the LLM puts it at the end of a sentence
+            images.append(path.rstrip('.,;!?)]}"\''))
     
     # Check for calendar markers
     calendar_pattern = r'CALENDAR:\s*([^\s]+)'
@@ -70,31 +133,54 @@ async def send_response(context: ContextTypes.DEFAULT_TYPE, chat_id: int, respon
     # Remove Calendar pattern
     clean_text = re.sub(calendar_pattern, '', clean_text).strip()
     
-    # Send images first
+    return clean_text, images, calendars
+
+
+def _visible_partial_text(partial_text: str) -> str:
+    """Text of a still-streaming reply that is safe to show: markers removed, half-written markers held back."""
+    clean_text, _, _ = extract_markers(partial_text)
+    words = clean_text.split()
+    if words:
+        tail = words[-1]
+        if tail.startswith('![') or any(marker.startswith(tail) or tail.startswith(marker)
+                                        for marker in ('IMAGE:', 'CALENDAR:')):
+            clean_text = clean_text[:clean_text.rfind(tail)].rstrip()
+    return clean_text
+
+
+async def send_images(context: ContextTypes.DEFAULT_TYPE, chat_id: int, images: List[str]):
+    bot_id = getattr(context.bot, "id", None)
     for image_path in images:
-        # Clean up common punctuation that might adhere to the URL/Path if the LLM puts it at the end of a sentence
-        image_path = image_path.rstrip('.,;!?)]}"\'')
-        
         if os.path.exists(image_path):
             try:
-                with open(image_path, 'rb') as photo:
-                    await context.bot.send_photo(chat_id=chat_id, photo=photo)
+                # תמונה שכבר הועלתה נשלחת לפי ה-file_id של טלגרם, בלי להעלות את הקובץ שוב
+                file_id = photo_cache.lookup(image_path, bot_id)
+                if file_id:
+                    try:
+                        with span("telegram.send_photo", path=image_path, cached=True):
+                            await context.bot.send_photo(chat_id=chat_id, photo=file_id)
+                        continue
+                    except BadRequest as e:
+                        logging.warning(f"Cached file_id for {image_path} rejected ({e}), uploading again")
+                        photo_cache.forget(image_path)
+                with open(image_path, 'rb') as photo, span("telegram.send_photo", path=image_path, cached=False):
+                    message = await context.bot.send_photo(chat_id=chat_id, photo=photo)
+                sizes = getattr(message, "photo", None)
+                if sizes:
+                    photo_cache.remember(image_path, sizes[-1].file_id, bot_id)
             except Exception as e:
                 logging.error(f"Error sending image {image_path}: {e}")
         else:
             logging.warning(f"Image path not found: {image_path}")
-    
-    # Send text message
-    if clean_text:
-        await context.bot.send_message(chat_id=chat_id, text=clean_text)
-    
-    # Send calendar files last
+
+
+async def send_calendars(context: ContextTypes.DEFAULT_TYPE, chat_id: int, calendars: List[str]):
     for calendar_path in calendars:
         if os.path.exists(calendar_path):
             try:
                 filename = os.path.basename(calendar_path)
                 # Send file with HTML formatted caption that makes it clickable
-                with open(calendar_path, 'rb') as calendar_file:
+                with open(calendar_path, 'rb') as calendar_file, span("telegram.send_document"):
                     await context.bot.send_document(
                         chat_id=chat_id, 
                         document=calendar_file,
@@ -106,30 +192,191 @@ async def send_response(context: ContextTypes.DEFAULT_TYPE, chat_id: int, respon
                 logging.error(f"Error sending calendar {calendar_path}: {e}")
 
 
-async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    chat_id = update.effective_chat.id
-    user_text = update.message.text
-    deps = BeautyAdvisorDependencies()
+async def send_response(context: ContextTypes.DEFAULT_TYPE, chat_id: int, response_text: str):
+    """
+    Parse the response and send text with images/calendar files if needed.
+    Supports IMAGE:path and CALENDAR:path syntax in responses.
+    """
+    # Log the raw response for debugging
+    logging.info(f"Raw agent response: {response_text}")
+
+    clean_text, images, calendars = extract_markers(response_text)
     
-    # Retrieve history
-    if chat_id not in conversations:
-        conversations[chat_id] = []
+    # Send images first
+    await send_images(context, chat_id, images)
     
-    # הגבל את ההיסטוריה ל-50 הודעות אחרונות
-    # זה ימנע התנפחות ויאיץ את התשובות, אך ישמור על הקשר מספיק ארוך
-    history = conversations[chat_id][-50:]
+    # Send text message
+    if clean_text:
+        with span("telegram.send_message"):
+            await context.bot.send_message(chat_id=chat_id, text=clean_text)
     
-    try:
-        result = await beauty_advisor_agent.run(user_text, deps=deps, message_history=history)
-        conversations[chat_id].extend(result.new_messages())
+    # Send calendar files last
+    await send_calendars(context, chat_id, calendars)
+
+
+async def stream_agent_reply(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_text: str,
+                             deps: BeautyAdvisorDependencies, history: list) -> list:
+    """
+    Run the agent and stream its reply into Telegram: the first message goes out as
+    soon as text arrives and is then edited in throttled batches. IMAGE:/CALENDAR:
+    markers are extracted from the final text and their files sent afterwards.
+    
+    The run is driven node by node, so text the model writes before a tool call
+    ("רגע, בודקת...") is shown while the tool still runs, and the message is then
+    edited into the final answer.
+    
+    Returns:
+        The new messages of the run, for the conversation history.
+    """
+    loop = asyncio.get_running_loop()
+    message = None
+    shown_text = ""
+    last_edit = 0.0
+    
+    async with beauty_advisor_agent.iter(user_text, deps=deps, message_history=history) as run:
+        async for node in run:
+            if not Agent.is_model_request_node(node):
+                continue
+            async with node.stream(run.ctx) as response_stream:
+                async for partial_text in response_stream.stream_text(debounce_by=STREAM_DEBOUNCE):
+                    visible = _visible_partial_text(partial_text)
+                    if not visible or visible == shown_text:
+                        continue
+                    if message is None:
+                        with span("telegram.send_message", streamed=True):
+                            message = await context.bot.send_message(chat_id=chat_id, text=visible)
+                        shown_text, last_edit = visible, loop.time()
+                    elif loop.time() - last_edit >= STREAM_EDIT_INTERVAL:
+                        try:
+                            with span("telegram.edit_message_text"):
+                                await context.bot.edit_message_text(chat_id=chat_id, message_id=message.message_id, text=visible)
+                            shown_text, last_edit = visible, loop.time()
+                        except Exception as e:
+                            logging.warning(f"Error editing streamed message: {e}")
         
-        # שמור רק 50 הודעות אחרונות בזיכרון כולל
-        conversations[chat_id] = conversations[chat_id][-50:]
+        output = run.result.output
+        new_messages = run.result.new_messages()
+        record_prompt_usage(run.usage())
+    
+    logging.info(f"Raw agent response: {output}")
+    clean_text, images, calendars = extract_markers(output)
+    
+    if message is None:
+        if clean_text:
+            with span("telegram.send_message"):
+                await context.bot.send_message(chat_id=chat_id, text=clean_text)
+    elif clean_text and clean_text != shown_text:
+        # The answer was already (mostly) shown; a failed last edit must not fail the turn
+        try:
+            with span("telegram.edit_message_text"):
+                await context.bot.edit_message_text(chat_id=chat_id, message_id=message.message_id, text=clean_text)
+        except Exception as e:
+            logging.warning(f"Error editing streamed message: {e}")
+    
+    await send_images(context, chat_id, images)
+    await send_calendars(context, chat_id, calendars)
+    return new_messages
+
+
+async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    user_text = update.message.text
+    # מהגעת ההודעה ועד שהתשובה נשלחה, כולל המתנה לאיחוד הודעות ולתור של הצ'אט
+    with span("telegram.handle_message", chat_id=chat_id):
+        await coalescer.add(chat_id, user_text, lambda text: reply_to_message(context, chat_id, text))
+
+async def reply_to_message(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_text: str):
+    # כל תור הוא trace נפרד, עם תת-span לכל קריאת LLM, כלי, בדיקת יומן ושליחה לטלגרם
+    turn_start = asyncio.get_running_loop().time()
+    turn_path = "error"
+    with span("turn", root=True, chat_id=chat_id) as turn_span, timing_scope() as tool_timings:
+        # תוצאות כלים נשמרות לאורך השיחה (עם תוקף קצר), כך שבדיקה חוזרת של אותו תאריך לא פונה שוב ליומן
+        deps = get_dependencies(chat_id)
+        deps.start_turn()
         
-        await send_response(context, chat_id, result.output)
-    except Exception as e:
-        logging.error(f"Error in handle_message: {e}")
-        await context.bot.send_message(chat_id=chat_id, text="אופס! משהו השתבש. בבקשה נסי שוב.")
+        try:
+            # ההיסטוריה מוגבלת בתקציב טוקנים ונשמרת כ-append-only כדי שהספק ימשיך לנצל את מטמון הפרומפט
+            # אחרי הפעלה מחדש היא נטענת מהמאגר בהודעה הראשונה של הצ'אט
+            # (מאגר שלא זמין נכשל את התור, במקום להתחיל שיחה ריקה שתדרוס את השמורה)
+            await conversations.load(chat_id)
+            conversation = get_history(chat_id)
+            history = conversation.for_model()
+            turn_span.set_attribute("turn.history_tokens", conversation.estimated_tokens())
+        
+            # פניות פשוטות (ברכה, שעות, מחיר, תורים פנויים) נענות מקומית בלי לפנות למודל
+            local_answer = await answer_locally(user_text) if Config.get_local_intents() else None
+        
+            if not local_answer:
+                # תאריך בהודעה -> הסוכן כמעט בטוח יבדוק זמינות, אז מתחילים לבדוק כבר עכשיו במקביל ל-LLM
+                deps.prefetch_availability(user_text)
+        
+            if local_answer:
+                turn_path = "local"
+                turn_span.set_attribute("turn.path", f"local:{local_answer.intent}")
+                with span("telegram.send_message"):
+                    await context.bot.send_message(chat_id=chat_id, text=local_answer.text)
+                new_messages = local_turn_messages(user_text, local_answer.text)
+            elif Config.get_stream_replies():
+                turn_path = "stream"
+                turn_span.set_attribute("turn.path", "stream")
+                async with dispatcher.llm_slot():
+                    with AGENT_RUN_SECONDS.time(mode="stream"):
+                        new_messages = await stream_agent_reply(context, chat_id, user_text, deps, history)
+            else:
+                turn_path = "run"
+                turn_span.set_attribute("turn.path", "run")
+                async with dispatcher.llm_slot():
+                    with AGENT_RUN_SECONDS.time(mode="run"):
+                        result = await beauty_advisor_agent.run(user_text, deps=deps, message_history=history)
+                new_messages = result.new_messages()
+                record_prompt_usage(result.usage())
+                await send_response(context, chat_id, result.output)
+        
+            conversation.add_turn(new_messages)
+            # נשמר במאגר בכתיבה מושהית (גם אם הצ'אט נדחק מהזיכרון באמצע התור)
+            conversations[chat_id] = conversation
+            # הקלטה (אם הופעלה) עם הסתרת שמות, אימיילים וטלפונים, לשחזור שיחות אמיתיות בבנצ'מרקים
+            record_turn(chat_id, user_text, new_messages, turn_path,
+                        asyncio.get_running_loop().time() - turn_start, tool_timings)
+        except Exception as e:
+            turn_span.set_attribute("error", type(e).__name__)
+            logging.error(f"Error in handle_message: {e}")
+            await context.bot.send_message(chat_id=chat_id, text="אופס! משהו השתבש. בבקשה נסי שוב.")
+    TURN_SECONDS.observe(asyncio.get_running_loop().time() - turn_start, path=turn_path)
+
+def register_metrics():
+    """Export the stats every module keeps through the metrics endpoint."""
+    register_stats("conversations", get_conversation_stats)
+    register_stats("dispatcher", dispatcher.stats)
+    register_stats("coalescer", coalescer.stats)
+    register_stats("llm_provider", llm_router.stats, label="provider")
+    register_stats("llm_client", get_llm_client_stats)
+    register_stats("prompt_cache", get_prompt_cache_stats)
+    register_stats("tool_cache", get_tool_cache_stats)
+    register_stats("date_cache", get_date_cache_stats)
+    register_stats("intents", get_intent_stats)
+    register_stats("prefetch", get_prefetch_stats)
+    register_stats("greetings", get_greeting_stats)
+    register_stats("photo_cache", photo_cache.stats)
+
+# שרת ה-metrics רץ על אותה לולאת asyncio של הבוט
+metrics_server = None
+
+async def post_init(application):
+    global metrics_server
+    register_metrics()
+    if Config.get_metrics_port():
+        metrics_server = await start_metrics_server(Config.get_metrics_host(), Config.get_metrics_port())
+    conversations.start()
+
+async def post_shutdown(application):
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+    await conversations.close()
+    await close_http_client()
+    shutdown_tracing()
+    close_recorder()
 
 if __name__ == '__main__':
     # Get token from config (reads from .env)
@@ -139,7 +386,15 @@ if __name__ == '__main__':
         print(f"Error: {e}")
         exit(1)
         
-    application = ApplicationBuilder().token(TOKEN).build()
+    # Updates are handled concurrently; ordering per chat is kept by the dispatcher
+    application = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .concurrent_updates(True)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     start_handler = CommandHandler('start', start)
     message_handler = MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message)
@@ -147,5 +402,14 @@ if __name__ == '__main__':
     application.add_handler(start_handler)
     application.add_handler(message_handler)
     
+    configure_tracing(Config.get_trace_export(), Config.get_trace_file())
+    configure_recorder(Config.get_record_file())
+    conversations.backend = open_backend(Config.get_conversation_store(), Config.get_conversation_spill_path())
+    photo_cache.open(Config.get_file_id_cache_path())
+    
+    # Load date parsing language data now, not on the first client message
+    warm_up_seconds = warm_up_date_parser()
+    logging.info(f"Date parser warmed up in {warm_up_seconds * 1000:.0f}ms")
+    
     print("הבוט רץ...")
     application.run_polling()
@@ -0,0 +1,142 @@
+"""
+Merge bursts of short messages from one chat into a single agent run.
+
+Clients often split one thought over several messages ("היי", "כמה עולה",
+"טיפול פנים?"). Each chat has a pending buffer that stays open while its
+debounce timer runs and while the job waits in the dispatcher queue (e.g.
+behind a run that is still in flight). Everything that arrives until the job
+actually starts is answered by that one run.
+
+The debounce window adapts per chat: it follows the chat's typical gap between
+messages of a burst, and a message that looks finished (ends with "?", "." or
+"!") closes the window early.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.telegram.dispatcher import ChatDispatcher
+
+# Bounds for the adaptive window (seconds)
+MIN_WINDOW = 0.3
+MAX_WINDOW = 3.0
+
+# A burst is waited out for this multiple of the chat's usual gap between messages
+GAP_FACTOR = 1.5
+
+# Weight of the newest gap in the per-chat moving average
+GAP_ALPHA = 0.3
+
+_FINISHED_ENDINGS = ('?', '.', '!')
+
+Process = Callable[[str], Awaitable[Any]]
+
+
+class _PendingBatch:
+    def __init__(self, first_at: float, future: asyncio.Future):
+        self.texts: List[str] = []
+        self.first_at = first_at
+        self.future = future
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.submitted = False
+
+
+class MessageCoalescer:
+    """Buffers messages per chat and submits each burst to the dispatcher as one job."""
+
+    def __init__(self, dispatcher: ChatDispatcher, window: float):
+        self.dispatcher = dispatcher
+        self.window = window
+        self._pending: Dict[int, _PendingBatch] = {}
+        self._last_message_at: Dict[int, float] = {}
+        self._gaps: Dict[int, float] = {}
+        self.messages = 0
+        self.runs = 0
+        self.merged_messages = 0
+
+    def window_for(self, chat_id: int, text: str) -> float:
+        """Seconds to wait for another message after `text`."""
+        if self.window <= 0:
+            return 0.0
+        gap = self._gaps.get(chat_id)
+        window = self.window if gap is None else min(MAX_WINDOW, max(MIN_WINDOW, gap * GAP_FACTOR))
+        if text.rstrip().endswith(_FINISHED_ENDINGS):
+            window = min(window, MIN_WINDOW)
+        return window
+
+    def _observe_gap(self, chat_id: int, now: float):
+        last = self._last_message_at.get(chat_id)
+        self._last_message_at[chat_id] = now
+        if last is None or now - last > MAX_WINDOW:
+            return
+        gap = now - last
+        previous = self._gaps.get(chat_id)
+        self._gaps[chat_id] = gap if previous is None else GAP_ALPHA * gap + (1 - GAP_ALPHA) * previous
+
+    def forget(self, chat_id: int):
+        """Drop the timing kept for a chat (it's been idle); a burst in progress is left alone."""
+        self._last_message_at.pop(chat_id, None)
+        self._gaps.pop(chat_id, None)
+
+    def add(self, chat_id: int, text: str, process: Process) -> asyncio.Future:
+        """
+        Add a message to the chat's current burst.
+
+        Args:
+            process: Called with the merged text of the burst once it's the chat's turn.
+
+        Returns:
+            Future with the result of `process` for the burst this message joined
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self._observe_gap(chat_id, now)
+        self.messages += 1
+
+        batch = self._pending.get(chat_id)
+        if batch is None:
+            batch = self._pending[chat_id] = _PendingBatch(now, loop.create_future())
+        batch.texts.append(text)
+
+        if not batch.submitted:
+            if batch.timer is not None:
+                batch.timer.cancel()
+            # Never hold the first message of a burst longer than MAX_WINDOW
+            delay = min(self.window_for(chat_id, text), max(0.0, batch.first_at + MAX_WINDOW - now))
+            batch.timer = loop.call_later(delay, self._submit, chat_id, batch, process)
+        return batch.future
+
+    def _submit(self, chat_id: int, batch: _PendingBatch, process: Process):
+        batch.submitted = True
+        self.runs += 1
+        job = self.dispatcher.submit(chat_id, lambda: self._run(chat_id, batch, process))
+        job.add_done_callback(lambda done: self._resolve(batch.future, done))
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, done: asyncio.Future):
+        if future.cancelled():
+            return
+        if done.cancelled():
+            future.cancel()
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result())
+
+    async def _run(self, chat_id: int, batch: _PendingBatch, process: Process):
+        # From here on, new messages start the next burst
+        if self._pending.get(chat_id) is batch:
+            del self._pending[chat_id]
+        self.merged_messages += len(batch.texts) - 1
+        if len(batch.texts) > 1:
+            logging.info(f"Coalesced {len(batch.texts)} messages from chat {chat_id} into one run")
+        return await process("\n".join(batch.texts))
+
+    def stats(self) -> Dict[str, Any]:
+        """Messages received, runs submitted, and messages that were merged into another's run."""
+        return {
+            "messages": self.messages,
+            "runs": self.runs,
+            "merged_messages": self.merged_messages,
+            "pending_chats": len(self._pending),
+        }
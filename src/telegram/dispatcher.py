@@ -0,0 +1,107 @@
+"""
+Per-chat ordered work queue with a global limit on concurrent LLM calls.
+
+Updates from one chat are processed one at a time, in the order they arrived,
+so two quick messages never race on the same conversation history. Different
+chats run in parallel, but only `max_concurrent_llm` of them can be inside an
+LLM call at once (`llm_slot`); the rest wait their turn instead of piling up
+requests on the provider.
+"""
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from src.utils.stats import LatencyWindow
+from src.utils.tracing import span
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class ChatDispatcher:
+    """Runs jobs per chat in FIFO order and hands out LLM slots."""
+
+    def __init__(self, max_concurrent_llm: int):
+        self.max_concurrent_llm = max_concurrent_llm
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._queues: Dict[int, Deque[Tuple[Job, float, asyncio.Future]]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self.llm_in_flight = 0
+        self.jobs_done = 0
+        self.max_queue_depth = 0
+        self.queue_wait = LatencyWindow()
+        self.llm_wait = LatencyWindow()
+
+    def submit(self, chat_id: int, job: Job) -> asyncio.Future:
+        """
+        Queue `job` behind the chat's earlier jobs.
+
+        Returns:
+            Future with the job's result (or exception)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._queues.setdefault(chat_id, deque())
+        queue.append((job, loop.time(), future))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth())
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.ensure_future(self._run_chat(chat_id))
+        return future
+
+    async def _run_chat(self, chat_id: int):
+        loop = asyncio.get_running_loop()
+        queue = self._queues[chat_id]
+        try:
+            while queue:
+                job, enqueued_at, future = queue.popleft()
+                self.queue_wait.add(loop.time() - enqueued_at)
+                try:
+                    result = await job()
+                except Exception as e:
+                    logging.error(f"Error processing update for chat {chat_id}: {e}")
+                    if not future.cancelled():
+                        future.set_exception(e)
+                else:
+                    if not future.cancelled():
+                        future.set_result(result)
+                self.jobs_done += 1
+        finally:
+            # No await between the last empty check and here, so a new submit always finds either
+            # a queue that will still be drained or no worker at all
+            del self._queues[chat_id]
+            del self._workers[chat_id]
+
+    @asynccontextmanager
+    async def llm_slot(self):
+        """Hold one of the global LLM slots for the duration of the block."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_llm)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with span("dispatcher.llm_slot_wait"):
+            await self._semaphore.acquire()
+        self.llm_wait.add(loop.time() - start)
+        self.llm_in_flight += 1
+        try:
+            yield
+        finally:
+            self.llm_in_flight -= 1
+            self._semaphore.release()
+
+    def queue_depth(self) -> int:
+        """Jobs waiting across all chats (not counting the ones running)."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, active chats, LLM slot usage and wait-time percentiles."""
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+            "active_chats": len(self._workers),
+            "jobs_done": self.jobs_done,
+            "llm_in_flight": self.llm_in_flight,
+            "llm_slots": self.max_concurrent_llm,
+            "queue_wait": self.queue_wait.summary(),
+            "llm_wait": self.llm_wait.summary(),
+        }
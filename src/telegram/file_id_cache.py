@@ -0,0 +1,144 @@
+"""
+Telegram file_id cache for the photos we send.
+
+Telegram keeps every uploaded file and returns a `file_id` for it; sending that
+id again costs no upload. The catalog has about a dozen product images that are
+sent thousands of times, so each image is uploaded once and its file_id reused:
+  - entries are keyed by the image's sha256, so two paths with the same bytes
+    share one upload and an edited image gets a fresh one
+  - the hash is only recomputed when the file's size or mtime changes
+  - file_ids belong to the bot that uploaded them; a different bot starts empty
+  - the cache is a small JSON file, so it survives restarts
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+# Bytes read at a time while hashing an image
+HASH_CHUNK = 1 << 16
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileIdCache:
+    """Image path -> Telegram file_id, invalidated when the image's content changes."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.bot_id: Optional[int] = None
+        # path -> {"size", "mtime_ns", "sha256"}
+        self._files: Dict[str, Dict[str, Any]] = {}
+        # sha256 -> file_id
+        self._file_ids: Dict[str, str] = {}
+        self.hits = 0
+        self.uploads = 0
+        self.bytes_saved = 0
+        self.rejected = 0
+        if path:
+            self._load()
+
+    def open(self, path: str):
+        """Persist to (and load from) the JSON file at `path`."""
+        with self._lock:
+            self.path = path
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"File id cache: ignoring unreadable {self.path}: {e}")
+            return
+        with self._lock:
+            self.bot_id = data.get("bot_id")
+            self._files = data.get("files", {})
+            self._file_ids = data.get("file_ids", {})
+
+    def _save_locked(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = self.path + ".tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump({"bot_id": self.bot_id, "files": self._files, "file_ids": self._file_ids}, f)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logging.warning(f"File id cache: could not save {self.path}: {e}")
+
+    def _use_bot(self, bot_id: Optional[int]):
+        """file_ids of another bot are useless to this one."""
+        if bot_id is not None and bot_id != self.bot_id:
+            if self._file_ids:
+                logging.info(f"File id cache: bot changed ({self.bot_id} -> {bot_id}), starting over")
+            self.bot_id = bot_id
+            self._file_ids = {}
+
+    def _sha256_locked(self, image_path: str) -> Optional[str]:
+        """The image's hash, recomputed only when its size or mtime changed."""
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        known = self._files.get(image_path)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha256"]
+        sha = file_sha256(image_path)
+        self._files[image_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha}
+        return sha
+
+    def lookup(self, image_path: str, bot_id: Optional[int] = None) -> Optional[str]:
+        """The file_id to send instead of uploading `image_path`, if it was uploaded before."""
+        with self._lock:
+            self._use_bot(bot_id)
+            sha = self._sha256_locked(image_path)
+            file_id = self._file_ids.get(sha) if sha else None
+            if file_id:
+                self.hits += 1
+                self.bytes_saved += self._files[image_path]["size"]
+            return file_id
+
+    def remember(self, image_path: str, file_id: str, bot_id: Optional[int] = None):
+        """Record the file_id Telegram returned for an upload of `image_path`."""
+        with self._lock:
+            self._use_bot(bot_id)
+            self.uploads += 1
+            sha = self._sha256_locked(image_path)
+            if sha is None:
+                return
+            self._file_ids[sha] = file_id
+            self._save_locked()
+
+    def forget(self, image_path: str):
+        """Telegram rejected the cached file_id; the next send uploads again."""
+        with self._lock:
+            self.rejected += 1
+            known = self._files.get(image_path)
+            if known and self._file_ids.pop(known["sha256"], None) is not None:
+                self._save_locked()
+
+    def stats(self) -> Dict[str, int]:
+        """Sends served by file_id, uploads, bytes not uploaded and rejected file_ids."""
+        with self._lock:
+            return {
+                "images": len(self._file_ids),
+                "hits": self.hits,
+                "uploads": self.uploads,
+                "bytes_saved": self.bytes_saved,
+                "rejected": self.rejected,
+            }
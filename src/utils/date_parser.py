@@ -1,8 +1,131 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
-import dateparser
+from typing import Any, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+from dateparser.conf import settings as dateparser_default_settings
+from dateparser.date import DateDataParser
 from dateutil.parser import parse as dateutil_parse
+import logging
 import re
+import threading
+import time
+
+# Maximum number of parse results kept in memory
+CACHE_SIZE = 2048
+
+# Tiers that can resolve a parse_datetime call, fastest first
+TIER_CACHE = "cache"
+TIER_FAST = "fast"
+TIER_DATEPARSER = "dateparser"
+TIER_FALLBACK = "fallback"
+TIER_NONE = "none"
+
+
+class ParseOutcome(NamedTuple):
+    """Result of `parse_datetime_with_tier`: the parsed date/time and the tier that produced it."""
+    date: Optional[str]
+    time: Optional[str]
+    tier: str
+
+
+# Phrases whose result depends on the exact reference minute ("in 2 hours", "בעוד שעה")
+_RELATIVE_OFFSET_RE = re.compile(r'בעוד|לפני|\bin\s+(?:an?|\d+)\b|\bago\b|hours?|minutes?|דקות|דקה|שעות')
+
+
+class _ParseCache:
+    """Bounded, thread-safe LRU cache for parse results with hit-rate counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, self._data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache = _ParseCache(CACHE_SIZE)
+
+_tier_counts: Dict[str, int] = {}
+_tier_lock = threading.Lock()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters and size of the date parsing cache."""
+    return _cache.stats()
+
+
+def get_tier_stats() -> Dict[str, int]:
+    """Number of parse_datetime calls resolved by each tier."""
+    with _tier_lock:
+        return dict(_tier_counts)
+
+
+def clear_cache():
+    """Drop all cached parse results and reset the counters."""
+    _cache.clear()
+    with _tier_lock:
+        _tier_counts.clear()
+
+
+def _record_tier(text: str, tier: str):
+    with _tier_lock:
+        _tier_counts[tier] = _tier_counts.get(tier, 0) + 1
+    logging.debug("parse_datetime(%r) resolved by %s tier", text, tier)
+
+
+def _normalize(text: str) -> str:
+    """Collapse whitespace and lowercase, so equivalent phrases share a cache entry."""
+    return " ".join(text.split()).lower()
+
+
+def _cache_key(normalized: str, reference_time: datetime) -> tuple:
+    """
+    Cache key for a phrase parsed relative to `reference_time`.
+    The reference date is always part of the key (so "מחר" rolls over at midnight);
+    the hour is added when the phrase has a time, and the minute for relative offsets
+    and for a time without a date ("10:30" is today until 10:30 passes, then tomorrow).
+    """
+    key = ("datetime", normalized, reference_time.date())
+    if _RELATIVE_OFFSET_RE.search(normalized):
+        return key + (reference_time.hour, reference_time.minute)
+    if not _FAST_DATE_RE.search(normalized) and (
+            _FAST_TIME_RE.fullmatch(normalized.strip(" ,")) or _has_time_component(normalized)):
+        return key + (reference_time.hour, reference_time.minute)
+    if _has_time_component(normalized):
+        return key + (reference_time.hour,)
+    return key
 
 
 def parse_datetime(text: str, reference_time: Optional[datetime] = None) -> Tuple[Optional[str], Optional[str]]:
@@ -27,23 +150,255 @@ def parse_datetime(text: str, reference_time: Optional[datetime] = None) -> Tupl
         >>> parse_datetime("ביום חמישי ב-14:00")
         ("2025-12-05", "14:00")
     """
+    outcome = parse_datetime_with_tier(text, reference_time)
+    return (outcome.date, outcome.time)
+
+
+def parse_datetime_with_tier(text: str, reference_time: Optional[datetime] = None) -> ParseOutcome:
+    """
+    Like `parse_datetime`, but also reports which tier resolved the call:
+    "cache", "fast" (rule-based), "dateparser", "fallback" or "none" (unparsed).
+    """
     if reference_time is None:
         reference_time = datetime.now()
     
-    # Try to parse with dateparser (supports Hebrew and many languages)
-    settings = {
-        'PREFER_DATES_FROM': 'future',  # Always prefer future dates
-        'RELATIVE_BASE': reference_time,
-        'RETURN_AS_TIMEZONE_AWARE': False,
-        'TIMEZONE': 'Asia/Jerusalem'
-    }
+    outcome = _parse_normalized(_normalize(text), reference_time)
+    _record_tier(text, outcome.tier)
+    return outcome
+
+
+def parse_many(texts: Iterable[str], reference_time: Optional[datetime] = None) -> List[ParseOutcome]:
+    """
+    Parse a batch of phrases against a single reference time.
+    
+    Normalization and the cache are shared across the batch, so repeated phrases
+    are parsed once; repeats are reported with the "cache" tier.
+    
+    Returns:
+        One `ParseOutcome` (date, time, tier) per input, in order.
+    """
+    if reference_time is None:
+        reference_time = datetime.now()
+    
+    outcomes = []
+    seen: Dict[str, ParseOutcome] = {}
+    for text in texts:
+        normalized = _normalize(text)
+        if normalized in seen:
+            outcome = seen[normalized]._replace(tier=TIER_CACHE)
+        else:
+            outcome = _parse_normalized(normalized, reference_time)
+            seen[normalized] = outcome
+        _record_tier(text, outcome.tier)
+        outcomes.append(outcome)
+    return outcomes
+
+
+def _parse_normalized(normalized: str, reference_time: datetime) -> ParseOutcome:
+    """Cached parse of already-normalized text."""
+    key = _cache_key(normalized, reference_time)
+    found, result = _cache.get(key)
+    if found:
+        return result._replace(tier=TIER_CACHE)
+    
+    outcome = _parse_datetime_uncached(normalized, reference_time)
+    _cache.put(key, outcome)
+    return outcome
+
+
+def _parse_datetime_uncached(text: str, reference_time: datetime) -> ParseOutcome:
+    """Parse `text` without consulting the cache: rule-based fast path first, dateparser for the rest."""
+    fast = _fast_parse(text, reference_time)
+    if fast:
+        return ParseOutcome(fast[0], fast[1], TIER_FAST)
+    return _dateparser_parse(text, reference_time)
+
+
+_HEBREW_WEEKDAYS = {'ראשון': 6, 'שני': 0, 'שלישי': 1, 'רביעי': 2, 'חמישי': 3, 'שישי': 4, 'שבת': 5}
+_ENGLISH_WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+_RELATIVE_DAYS = {
+    'היום': 0, 'today': 0,
+    'מחר': 1, 'tomorrow': 1,
+    'מחרתיים': 2, 'day after tomorrow': 2, 'the day after tomorrow': 2,
+}
+
+# Weekday names that are also common words ("שני טיפולים", "הטיפול הראשון"):
+# only a weekday after "יום"/"ביום" or a "ב" prefix
+_AMBIGUOUS_WEEKDAYS = ('שני', 'ראשון')
+
+# Relative day, weekday name or ISO date - anywhere in the text
+_FAST_DATE_RE = re.compile(
+    r'(?<!\w)(?:'
+    r'(?P<relative>היום|מחרתיים|מחר|(?:the\s+)?day\s+after\s+tomorrow|today|tomorrow)'
+    r'|(?:ביום\s+|יום\s+|ב|on\s+|next\s+|this\s+)?'
+    r'(?P<weekday>(?:(?<=ב)|(?<=יום\s))(?:' + '|'.join(_AMBIGUOUS_WEEKDAYS) + r')|'
+    + '|'.join([day for day in _HEBREW_WEEKDAYS if day not in _AMBIGUOUS_WEEKDAYS] + list(_ENGLISH_WEEKDAYS)) + r')'
+    r'(?:\s+(?:הבא|הקרוב|הזה))?'
+    r'|(?:ב-?)?(?P<iso>\d{4}-\d{1,2}-\d{1,2})'
+    r')(?!\w)'
+)
+
+# A complete time expression: "10:30", "ב-10", "בשעה 3 אחרי הצהריים", "at 4pm"
+_FAST_TIME_RE = re.compile(
+    r'(?P<prefix>at\s*|בשעה\s*|ב-?\s*)?'
+    r'(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?'
+    r'\s*(?P<period>a\.?m\.?|p\.?m\.?|בבוקר|לפנה"צ|אחה"צ|אחרי הצהריים|בערב|בצהריים)?'
+)
+
+_PM_PERIODS = ('p', 'אחה"צ', 'אחרי הצהריים', 'בערב')
+_AM_PERIODS = ('a', 'בבוקר', 'לפנה"צ')
+
+
+def _fast_parse(text: str, reference_time: datetime) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """
+    Deterministic rule-based parser for the common cases: relative days, Hebrew/English
+    weekday names, ISO dates and explicit times. Returns None unless the whole text is
+    understood, so anything ambiguous is left to dateparser.
+    """
+    target_date = None
+    remainder = text
+    
+    date_match = _FAST_DATE_RE.search(text)
+    if date_match:
+        if date_match.group('relative'):
+            relative = " ".join(date_match.group('relative').split())
+            target_date = reference_time + timedelta(days=_RELATIVE_DAYS[relative])
+        elif date_match.group('weekday'):
+            weekday = date_match.group('weekday')
+            day_num = _HEBREW_WEEKDAYS.get(weekday, _ENGLISH_WEEKDAYS.get(weekday))
+            days_ahead = day_num - reference_time.weekday()
+            if days_ahead <= 0:  # Target day already happened this week
+                days_ahead += 7
+            target_date = reference_time + timedelta(days=days_ahead)
+        else:
+            try:
+                target_date = datetime.strptime(date_match.group('iso'), "%Y-%m-%d")
+            except ValueError:
+                return None
+        remainder = text[:date_match.start()] + " " + text[date_match.end():]
+    
+    remainder = remainder.strip(" ,")
+    if not remainder:
+        if target_date is None:
+            return None
+        return (target_date.strftime("%Y-%m-%d"), None)
+    
+    time_match = _FAST_TIME_RE.fullmatch(remainder)
+    if not time_match:
+        return None
+    
+    hour = int(time_match.group('hour'))
+    minute = int(time_match.group('minute') or 0)
+    period = time_match.group('period')
+    # A bare number ("מחר 10") could be a day of month - only accept explicit times
+    if not (time_match.group('prefix') or time_match.group('minute') or period):
+        return None
+    if hour > 23 or minute > 59 or (period and hour > 12):
+        return None
+    
+    # Handle 12-hour format, with the same business-hours default as the dateparser path
+    if period and period.startswith(_PM_PERIODS):
+        if hour < 12:
+            hour += 12
+    elif period and period.startswith(_AM_PERIODS):
+        if hour == 12:
+            hour = 0
+    elif hour <= 9:
+        hour += 12
+    
+    if target_date is None:
+        # Time only: today if it is still ahead of us, otherwise tomorrow
+        target_date = reference_time
+        if (hour, minute) <= (reference_time.hour, reference_time.minute):
+            target_date = reference_time + timedelta(days=1)
+    
+    return (target_date.strftime("%Y-%m-%d"), f"{hour:02d}:{minute:02d}")
+
+
+def extract_date(text: str, reference_time: Optional[datetime] = None) -> Optional[str]:
+    """
+    Find a common date expression (relative day, weekday name, ISO date) anywhere in
+    free text, e.g. "מה פנוי מחר?" -> tomorrow. Uses only the rule-based fast path.
+    
+    Returns:
+        Date string in "YYYY-MM-DD" format or None
+    """
+    if reference_time is None:
+        reference_time = datetime.now()
+    
+    date_match = _FAST_DATE_RE.search(_normalize(text))
+    if not date_match:
+        return None
+    fast = _fast_parse(date_match.group(0), reference_time)
+    return fast[0] if fast else None
+
+
+# dateparser only ever loads language data for these locales
+DATEPARSER_LANGUAGES = ['he', 'en']
+
+_DATEPARSER_SETTINGS = {
+    'PREFER_DATES_FROM': 'future',  # Always prefer future dates
+    'RETURN_AS_TIMEZONE_AWARE': False,
+    'TIMEZONE': 'Asia/Jerusalem'
+}
+
+# Phrases that exercise dateparser's relative and absolute parsers in both languages
+_WARM_UP_PHRASES = ["מחר בשעה 10", "בעוד שבוע", "3 בדצמבר", "next week", "December 3rd at 4pm", "in 2 hours"]
+
+
+class _SharedDateParser:
+    """
+    Reusable, preconfigured dateparser parser for he/en.
     
-    # Parse the full text
-    parsed_dt = dateparser.parse(text, languages=['he', 'en'], settings=settings)
+    dateparser fixes RELATIVE_BASE in a parser's settings, so the parser is rebuilt
+    only when the reference minute changes, not on every call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reference: Optional[datetime] = None
+        self._parser: Optional[DateDataParser] = None
+
+    def get(self, reference_time: datetime) -> DateDataParser:
+        reference = reference_time.replace(second=0, microsecond=0)
+        with self._lock:
+            if self._parser is None or reference != self._reference:
+                settings = dict(_DATEPARSER_SETTINGS, RELATIVE_BASE=reference)
+                self._parser = DateDataParser(
+                    languages=DATEPARSER_LANGUAGES,
+                    settings=dateparser_default_settings.replace(mod_settings=settings, **settings),
+                )
+                self._reference = reference
+            return self._parser
+
+
+_shared_parser = _SharedDateParser()
+
+
+def warm_up_date_parser() -> float:
+    """
+    Load dateparser's he/en language data ahead of the first client message,
+    so no user pays the one-time loading delay. Returns the seconds spent.
+    """
+    start = time.perf_counter()
+    reference = datetime.now()
+    for phrase in _WARM_UP_PHRASES:
+        _dateparser_parse(phrase, reference)
+    return time.perf_counter() - start
+
+
+def _dateparser_parse(text: str, reference_time: datetime) -> ParseOutcome:
+    """Parse `text` with dateparser, falling back to `_fallback_parse` when it fails."""
+    # Try to parse with dateparser (supports Hebrew and many languages)
+    parsed_dt = _shared_parser.get(reference_time).get_date_data(text)['date_obj']
     
     if not parsed_dt:
         # Try a more aggressive approach - extract any numbers and keywords
-        return _fallback_parse(text, reference_time)
+        date_str, time_str = _fallback_parse(text, reference_time)
+        return ParseOutcome(date_str, time_str, TIER_FALLBACK if date_str else TIER_NONE)
     
     # Extract date and time
     date_str = parsed_dt.strftime("%Y-%m-%d")
@@ -73,7 +428,7 @@ def parse_datetime(text: str, reference_time: Optional[datetime] = None) -> Tupl
         # No time specified at all
         time_str = None
     
-    return (date_str, time_str)
+    return ParseOutcome(date_str, time_str, TIER_DATEPARSER)
 
 
 def _has_time_component(text: str) -> bool:
@@ -197,6 +552,19 @@ def parse_time_only(text: str) -> Optional[str]:
     Returns:
         Time string in "HH:MM" format or None
     """
+    normalized = _normalize(text)
+    key = ("time", normalized)
+    found, result = _cache.get(key)
+    if found:
+        return result
+    
+    result = _parse_time_uncached(normalized)
+    _cache.put(key, result)
+    return result
+
+
+def _parse_time_uncached(text: str) -> Optional[str]:
+    """Parse the time part of `text` without consulting the cache. See `parse_time_only`."""
     # Look for time patterns
     time_match = re.search(r'(\d{1,2}):?(\d{2})?', text)
     if not time_match:
@@ -0,0 +1,365 @@
+"""
+Local stand-in for an OpenAI-compatible chat-completions API.
+
+Load tests must not spend real tokens or run into provider rate limits, so
+this server answers `POST /v1/chat/completions` itself:
+  - replies follow simple rules that drive the agent through our real flows: a
+    product question calls `lookup_products`, a date calls
+    `check_appointment_availability`, an email address calls `book_consultation`,
+    and a tool result is turned into a short Hebrew answer
+  - or a script (a list of replies) is replayed first, in order
+  - time to first token and the delay between streamed chunks are drawn from
+    configurable log-normal distributions; a share of requests can fail with
+    503 to exercise retries and failover
+  - `"stream": true` is answered with server-sent events like the real API
+
+Point the bot at it with FAKE_LLM_URL (it then replaces every real provider):
+
+    python -m src.utils.fake_llm --port 8089 --ttft 0.8 --chunk-delay 0.03
+    FAKE_LLM_URL=http://127.0.0.1:8089/v1 python -m src.telegram.bot
+"""
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import argparse
+import itertools
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Rough size of a token, as in the history budget
+CHARS_PER_TOKEN = 3
+
+# Longest a request may take to arrive before the connection is dropped
+REQUEST_TIMEOUT = 10.0
+
+# Streamed text is sent in chunks of this many characters
+STREAM_CHUNK_CHARS = 12
+
+_EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.]+')
+_TIME_RE = re.compile(r'(\d{1,2}):(\d{2})|(?<!\w)ב-?(\d{1,2})(?![\d:])|בשעה\s+(\d{1,2})(?![\d:])')
+_NAME_RE = re.compile(r'(?:שמי|קוראים לי|השם שלי)\s+(\w+)|my name is\s+(\w+)', re.IGNORECASE)
+_DATE_WORDS = ["מחרתיים", "מחר", "היום", "tomorrow", "today"] + [
+    f"יום {day}" for day in ["ראשון", "שני", "שלישי", "רביעי", "חמישי", "שישי"]
+]
+_AVAILABILITY_RE = re.compile(r'פנוי|תור|זמינ|לקבוע|available|slot|book', re.IGNORECASE)
+_PRODUCT_RE = re.compile(r'מחיר|עולה|טיפול|קרם|סרום|לק|פדיקור|מניקור|פנים|אקנה|עור|ציפורנ|price|facial|cream',
+                         re.IGNORECASE)
+_QUESTION_WORDS_RE = re.compile(r'כמה|עולה|מה|המחיר|של|יש|לכם|\?|how much|is|the|price of', re.IGNORECASE)
+
+
+@dataclass
+class LatencyProfile:
+    """Log-normal time to first token and delay between streamed chunks (seconds)."""
+    ttft_median: float = 0.8
+    ttft_sigma: float = 0.4
+    chunk_delay: float = 0.03
+    chunk_sigma: float = 0.3
+
+    def time_to_first_token(self, rng: random.Random) -> float:
+        return self._sample(rng, self.ttft_median, self.ttft_sigma)
+
+    def between_chunks(self, rng: random.Random) -> float:
+        return self._sample(rng, self.chunk_delay, self.chunk_sigma)
+
+    @staticmethod
+    def _sample(rng: random.Random, median: float, sigma: float) -> float:
+        if median <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(median), sigma) if sigma > 0 else median
+
+
+@dataclass
+class Reply:
+    """One assistant message: text, or a call to `tool` with `args`."""
+    text: Optional[str] = None
+    tool: Optional[str] = None
+    args: Optional[Dict[str, Any]] = None
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def _find_date_word(texts: List[str]) -> Optional[str]:
+    for text in texts:
+        lowered = text.lower()
+        for word in _DATE_WORDS:
+            if word in lowered:
+                return word
+    return None
+
+
+def _find_time(texts: List[str]) -> Optional[str]:
+    for text in texts:
+        match = _TIME_RE.search(text)
+        if match:
+            hour = int(next(group for group in (match.group(1), match.group(3), match.group(4)) if group))
+            minute = int(match.group(2) or 0)
+            return f"{hour:02d}:{minute:02d}"
+    return None
+
+
+def _answer_tool_result(tool: str, content: str, user_texts: List[str]) -> Reply:
+    try:
+        result = json.loads(content)
+    except (TypeError, ValueError):
+        result = content
+
+    if tool == "check_appointment_availability":
+        slots = [slot for slot in result if isinstance(slot, str) and ":" in slot] if isinstance(result, list) else []
+        if not slots:
+            return Reply(text="ביום הזה הכל תפוס. לבדוק לך יום אחר?")
+        wanted = _find_time(user_texts[:1])
+        if wanted and wanted in slots:
+            return Reply(text=f"השעה {wanted} פנויה! כדי שאוכל לשלוח לך זימון, מה השם והמייל שלך?")
+        return Reply(text=f"יש תורים פנויים ב-{', '.join(slots[:4])}. איזו שעה נוחה לך?")
+    if tool in ("lookup_products", "list_all_products"):
+        names = [item.get("name") for item in result if isinstance(item, dict)] if isinstance(result, list) else []
+        if not names:
+            return Reply(text="לא מצאתי בדיוק את זה. ספרי לי מה מפריע לך בעור?")
+        return Reply(text=f"יש לנו {', '.join(names[:3])}. רוצה שאבדוק תורים פנויים?")
+    if tool == "book_consultation":
+        return Reply(text=str(result))
+    return Reply(text="בשמחה. יש עוד משהו שאפשר לעזור בו?")
+
+
+def rule_based_reply(messages: List[Dict[str, Any]], tool_names: List[str]) -> Reply:
+    """
+    The reply a helpful agent would give at this point of the conversation,
+    using only the tools offered in the request.
+    """
+    if messages and messages[-1].get("role") == "tool":
+        call_id = messages[-1].get("tool_call_id")
+        tool = next((call["function"]["name"] for message in messages if message.get("role") == "assistant"
+                     for call in message.get("tool_calls") or [] if call.get("id") == call_id), "")
+        user_texts = [_content_text(m.get("content")) for m in reversed(messages) if m.get("role") == "user"]
+        return _answer_tool_result(tool, _content_text(messages[-1].get("content")), user_texts)
+
+    # Newest first
+    user_texts = [_content_text(m.get("content")) for m in reversed(messages) if m.get("role") == "user"]
+    text = user_texts[0] if user_texts else ""
+
+    email = _EMAIL_RE.search(text)
+    if email and "book_consultation" in tool_names:
+        date_word = _find_date_word(user_texts) or "מחר"
+        name_match = next((m for m in (_NAME_RE.search(t) for t in user_texts) if m), None)
+        name = next(group for group in name_match.groups() if group) if name_match else "לקוחה"
+        return Reply(tool="book_consultation", args={
+            "datetime_text": f"{date_word} בשעה {_find_time(user_texts) or '10:00'}",
+            "user_name": name,
+            "email": email.group(0),
+        })
+
+    date_word = _find_date_word([text])
+    if (date_word or _AVAILABILITY_RE.search(text)) and "check_appointment_availability" in tool_names:
+        return Reply(tool="check_appointment_availability", args={"date_text": date_word or "מחר"})
+
+    if _PRODUCT_RE.search(text) and "lookup_products" in tool_names:
+        query = " ".join(_QUESTION_WORDS_RE.sub(" ", text).split()) or text
+        return Reply(tool="lookup_products", args={"query": query})
+
+    return Reply(text="היי! איזה טיפול מעניין אותך, פנים או ציפורניים?")
+
+
+def _estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(json.dumps(m, ensure_ascii=False)) for m in messages) // CHARS_PER_TOKEN
+
+
+class FakeLLMServer:
+    """OpenAI-compatible chat-completions endpoint with scripted or rule-based replies."""
+
+    def __init__(self, latency: Optional[LatencyProfile] = None, error_rate: float = 0.0,
+                 script: Optional[List[Dict[str, Any]]] = None, seed: Optional[int] = None):
+        """
+        Args:
+            error_rate: Share of requests answered with 503
+            script: Replies to give first, in order: {"content": "..."} or {"tool": name, "args": {...}}
+        """
+        self.latency = latency or LatencyProfile()
+        self.error_rate = error_rate
+        self.script = list(script or [])
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.requests = 0
+        self.streamed = 0
+        self.tool_calls = 0
+        self.errors = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving on the running loop. Returns the base URL to give the OpenAI client."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/v1"
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "streamed": self.streamed, "tool_calls": self.tool_calls,
+                "errors": self.errors}
+
+    def next_reply(self, body: Dict[str, Any]) -> Reply:
+        if self.script:
+            step = self.script.pop(0)
+            return Reply(text=step.get("content"), tool=step.get("tool"), args=step.get("args"))
+        tool_names = [tool["function"]["name"] for tool in body.get("tools") or []]
+        return rule_based_reply(body.get("messages", []), tool_names)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body_bytes = await asyncio.wait_for(
+                reader.readexactly(int(headers.get("content-length", 0))), REQUEST_TIMEOUT
+            )
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2 or parts[0] != "POST" or not parts[1].rstrip("/").endswith("/chat/completions"):
+                await self._send(writer, "404 Not Found", {"error": {"message": "not found"}})
+                return
+
+            self.requests += 1
+            body = json.loads(body_bytes or b"{}")
+            await asyncio.sleep(self.latency.time_to_first_token(self._rng))
+            if self._rng.random() < self.error_rate:
+                self.errors += 1
+                await self._send(writer, "503 Service Unavailable", {"error": {"message": "overloaded (fake)"}})
+                return
+
+            reply = self.next_reply(body)
+            if reply.tool:
+                self.tool_calls += 1
+            if body.get("stream"):
+                self.streamed += 1
+                await self._stream(writer, body, reply)
+            else:
+                await self._send(writer, "200 OK", self._completion(body, reply))
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            logging.debug(f"Fake LLM request dropped: {e}")
+        finally:
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, status: str, payload: Dict[str, Any]):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    def _tool_call(self, reply: Reply) -> Dict[str, Any]:
+        return {
+            "id": f"call_{next(self._ids)}",
+            "type": "function",
+            "function": {"name": reply.tool, "arguments": json.dumps(reply.args or {}, ensure_ascii=False)},
+        }
+
+    def _usage(self, body: Dict[str, Any], reply: Reply) -> Dict[str, int]:
+        prompt = _estimate_tokens(body.get("messages", []))
+        completion = max(1, len(reply.text or json.dumps(reply.args or {})) // CHARS_PER_TOKEN)
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    def _completion(self, body: Dict[str, Any], reply: Reply) -> Dict[str, Any]:
+        message: Dict[str, Any] = {"role": "assistant", "content": reply.text}
+        if reply.tool:
+            message["tool_calls"] = [self._tool_call(reply)]
+        return {
+            "id": f"chatcmpl-fake-{next(self._ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-llm"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if reply.tool else "stop"}],
+            "usage": self._usage(body, reply),
+        }
+
+    async def _stream(self, writer: asyncio.StreamWriter, body: Dict[str, Any], reply: Reply):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Connection: close\r\n\r\n")
+        completion_id = f"chatcmpl-fake-{next(self._ids)}"
+        created = int(time.time())
+
+        async def event(delta: Dict[str, Any], finish_reason: Optional[str] = None, usage=None):
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                "model": body.get("model", "fake-llm"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+            writer.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            await writer.drain()
+
+        if reply.tool:
+            call = self._tool_call(reply)
+            await event({"role": "assistant", "tool_calls": [dict(call, index=0)]})
+            finish_reason = "tool_calls"
+        else:
+            text = reply.text or ""
+            for start in range(0, len(text), STREAM_CHUNK_CHARS):
+                if start:
+                    await asyncio.sleep(self.latency.between_chunks(self._rng))
+                delta = {"content": text[start:start + STREAM_CHUNK_CHARS]}
+                if not start:
+                    delta["role"] = "assistant"
+                await event(delta)
+            finish_reason = "stop"
+        await event({}, finish_reason, usage=self._usage(body, reply))
+        writer.write(b"data: [DONE]\n\n")
+        await writer.drain()
+
+
+async def _serve(args: argparse.Namespace):
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+    server = FakeLLMServer(
+        LatencyProfile(args.ttft, args.ttft_sigma, args.chunk_delay, args.chunk_sigma),
+        error_rate=args.error_rate, script=script, seed=args.seed,
+    )
+    url = await server.start(args.host, args.port)
+    print(f"Fake LLM listening on {url} (set FAKE_LLM_URL={url})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible LLM stand-in for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--ttft", type=float, default=0.8, help="Median time to first token (s)")
+    parser.add_argument("--ttft-sigma", type=float, default=0.4, help="Log-normal sigma of the time to first token")
+    parser.add_argument("--chunk-delay", type=float, default=0.03, help="Median delay between streamed chunks (s)")
+    parser.add_argument("--chunk-sigma", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--script", help="JSON list of replies to give first, in order")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
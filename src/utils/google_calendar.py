@@ -4,6 +4,8 @@ from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from src.core.config import Config
+from src.utils.tracing import traced
+from src.utils.metrics import record_calendar_call
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
@@ -64,6 +66,7 @@ class GoogleCalendarManager:
             print(f"Error building service: {e}")
             self.service = None
 
+    @traced("calendar.list_events")
     def list_events(self, start_time: datetime.datetime, end_time: datetime.datetime, calendar_id='primary'):
         """
         List events within a time range.
@@ -79,6 +82,7 @@ class GoogleCalendarManager:
         if not self.service:
             return []
 
+        record_calendar_call("list_events")
         try:
             events_result = self.service.events().list(
                 calendarId=calendar_id,
@@ -93,6 +97,7 @@ class GoogleCalendarManager:
             print(f"An error occurred: {error}")
             return []
 
+    @traced("calendar.create_event")
     def create_event(self, summary: str, start_time: datetime.datetime, end_time: datetime.datetime, 
                      attendee_email: str = None, description: str = "", calendar_id='primary'):
         """
@@ -128,6 +133,7 @@ class GoogleCalendarManager:
         if attendee_email:
             event["attendees"] = [{"email": attendee_email}]
 
+        record_calendar_call("create_event")
         try:
             event = self.service.events().insert(calendarId=calendar_id, body=event).execute()
             print(f"Event created: {event.get('htmlLink')}")
@@ -1,6 +1,21 @@
 import os
 from typing import Optional, List
-from src.core.products import PRODUCTS, Product
+from src.core.products import get_catalog
+
+def _existing_image(catalog, index: int, resolved: Optional[dict] = None) -> Optional[str]:
+    """
+    Absolute path of a product's image if the file exists.
+    `resolved` memoizes lookups within one call, since many products share images.
+    """
+    image_path = catalog.image_path(index)
+    if not image_path:
+        return None
+    if resolved is not None and image_path in resolved:
+        return resolved[image_path]
+    result = os.path.abspath(image_path) if os.path.exists(image_path) else None
+    if resolved is not None:
+        resolved[image_path] = result
+    return result
 
 def get_product_image(product_name: str) -> Optional[str]:
     """
@@ -12,16 +27,11 @@ def get_product_image(product_name: str) -> Optional[str]:
     Returns:
         Absolute path to the product image, or None if not found
     """
-    product_name_lower = product_name.lower()
-    
-    for product in PRODUCTS:
-        if product_name_lower in product.name.lower():
-            if product.image_path and os.path.exists(product.image_path):
-                # Return absolute path
-                return os.path.abspath(product.image_path)
-            return None
-    
-    return None
+    catalog = get_catalog()
+    index = catalog.first_index_by_name(product_name)
+    if index is None:
+        return None
+    return _existing_image(catalog, index)
 
 def get_product_image_by_id(product_id: str) -> Optional[str]:
     """
@@ -33,13 +43,11 @@ def get_product_image_by_id(product_id: str) -> Optional[str]:
     Returns:
         Absolute path to the product image, or None if not found
     """
-    for product in PRODUCTS:
-        if product.id == product_id:
-            if product.image_path and os.path.exists(product.image_path):
-                return os.path.abspath(product.image_path)
-            return None
-    
-    return None
+    catalog = get_catalog()
+    index = catalog.index_by_id(product_id)
+    if index is None:
+        return None
+    return _existing_image(catalog, index)
 
 def get_category_images(category: str) -> List[tuple[str, str]]:
     """
@@ -52,12 +60,13 @@ def get_category_images(category: str) -> List[tuple[str, str]]:
         List of tuples (product_name, image_path)
     """
     results = []
-    category_lower = category.lower()
+    catalog = get_catalog()
+    resolved = {}
     
-    for product in PRODUCTS:
-        if category_lower in product.category.lower():
-            if product.image_path and os.path.exists(product.image_path):
-                results.append((product.name, os.path.abspath(product.image_path)))
+    for index in catalog.indices_by_category(category):
+        image_path = _existing_image(catalog, index, resolved)
+        if image_path:
+            results.append((catalog.name(index), image_path))
     
     return results
 
@@ -81,9 +90,12 @@ def get_all_product_images() -> List[tuple[str, str]]:
         List of tuples (product_name, image_path)
     """
     results = []
+    catalog = get_catalog()
+    resolved = {}
     
-    for product in PRODUCTS:
-        if product.image_path and os.path.exists(product.image_path):
-            results.append((product.name, os.path.abspath(product.image_path)))
+    for index in range(len(catalog)):
+        image_path = _existing_image(catalog, index, resolved)
+        if image_path:
+            results.append((catalog.name(index), image_path))
     
     return results
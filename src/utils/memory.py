@@ -0,0 +1,42 @@
+"""
+Approximate memory footprint of in-process state (conversation histories and the like).
+"""
+import sys
+from typing import Any, Optional, Set
+
+# Shared, immutable or process-wide objects that shouldn't be charged to a conversation
+_SKIP_TYPES = (type, type(sys), type(len), type(lambda: None))
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Bytes held by `obj` and everything it references (containers, dataclass fields,
+    attributes), counting each object once. An estimate: interned strings and
+    small ints shared with the rest of the process are counted too.
+    """
+    if seen is None:
+        seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+
+        if isinstance(current, (str, bytes, bytearray, int, float, bool)) or current is None:
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        else:
+            attributes = getattr(current, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for slot in getattr(type(current), "__slots__", ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return total
@@ -0,0 +1,284 @@
+"""
+Prometheus metrics for the bot process.
+
+Counters and histograms are updated on the hot path (agent runs, tool calls,
+calendar API calls, LLM tokens); the stats our modules already keep (cache hit
+rates, router health, queue depth, ...) are read when the endpoint is scraped.
+`start_metrics_server` serves everything in the Prometheus text format from
+the bot's own asyncio loop, so there's no extra thread or dependency.
+
+    curl http://127.0.0.1:9464/metrics
+"""
+import math
+import time
+import functools
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Every metric name starts with this
+NAMESPACE = "ragcosmetic"
+
+# Latency buckets (seconds), from a cached tool result to a slow LLM turn
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+
+# Longest a scrape request may take to arrive before the connection is dropped
+REQUEST_TIMEOUT = 5.0
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = f"{NAMESPACE}_{name}"
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(key)} {_format_value(v)}" for key, v in sorted(values.items())]
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = f"{NAMESPACE}_{name}"
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> (count per bucket, sum, count)
+        self._series: Dict[LabelKey, List[Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the block in seconds, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (bucket_counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+# Hot-path metrics
+AGENT_RUN_SECONDS = Histogram("agent_run_seconds", "Duration of an agent run (LLM calls and tools), by mode")
+TURN_SECONDS = Histogram("turn_seconds", "Duration of a whole turn, by path (local answer, stream, run)")
+TOOL_CALL_SECONDS = Histogram("tool_call_seconds", "Duration of an agent tool call, by tool")
+CALENDAR_API_CALLS = Counter("calendar_api_calls_total", "Google Calendar API calls, by method")
+CALENDAR_CALLS_PER_BOOKING = Histogram(
+    "calendar_calls_per_booking", "Calendar API calls made while booking one appointment",
+    buckets=(1, 2, 3, 5, 10, 20, 50),
+)
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens, by kind (prompt, cached, completion)")
+
+_METRICS = [AGENT_RUN_SECONDS, TURN_SECONDS, TOOL_CALL_SECONDS, CALENDAR_API_CALLS, CALENDAR_CALLS_PER_BOOKING, LLM_TOKENS]
+
+
+# (function name, seconds) of the `timed` calls made inside the current `timing_scope`
+_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("timings", default=None)
+
+
+def timed(histogram: Histogram, **labels) -> Callable:
+    """Decorator: observe the duration of every call of a (sync) function."""
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                histogram.observe(elapsed, **labels)
+                scope = _timings.get()
+                if scope is not None:
+                    scope.append((func.__name__, elapsed))
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def timing_scope() -> Iterator[List[Tuple[str, float]]]:
+    """Collect the (function name, seconds) of every `timed` call made inside the block, in order."""
+    timings: List[Tuple[str, float]] = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+# Calendar calls made inside the current `calendar_call_scope`
+_calendar_calls: ContextVar[Optional[List[int]]] = ContextVar("calendar_calls", default=None)
+
+
+def record_calendar_call(method: str):
+    """Count a Google Calendar API call (and charge it to the enclosing scope, if any)."""
+    CALENDAR_API_CALLS.inc(method=method)
+    scope = _calendar_calls.get()
+    if scope is not None:
+        scope[0] += 1
+
+
+@contextmanager
+def calendar_call_scope(histogram: Histogram) -> Iterator[List[int]]:
+    """Count the calendar calls made inside the block and observe the total in `histogram`."""
+    calls = [0]
+    token = _calendar_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _calendar_calls.reset(token)
+        histogram.observe(calls[0])
+
+
+# Stats dicts read at scrape time: metric prefix -> (function, label for the top-level keys)
+_stats_sources: Dict[str, Tuple[Callable[[], Dict[str, Any]], Optional[str]]] = {}
+
+
+def register_stats(prefix: str, stats: Callable[[], Dict[str, Any]], label: Optional[str] = None):
+    """
+    Export a module's stats dict as gauges named `<namespace>_<prefix>_<key>`.
+    Nested dicts extend the name (`queue_wait: {p50_ms}` -> `..._queue_wait_p50_ms`);
+    with `label`, the top-level keys become that label instead (e.g. one series per provider).
+    Registering the same prefix again replaces the source.
+    """
+    _stats_sources[prefix] = (stats, label)
+
+
+def _flatten(stats: Dict[str, Any], name: str, labels: LabelKey, out: Dict[str, List[Tuple[LabelKey, float]]]):
+    for key, value in stats.items():
+        metric = f"{name}_{key}"
+        if isinstance(value, dict):
+            _flatten(value, metric, labels, out)
+        elif isinstance(value, (int, float)):
+            out.setdefault(metric, []).append((labels, float(value)))
+
+
+def _render_stats() -> List[str]:
+    lines = []
+    for prefix, (stats, label) in sorted(_stats_sources.items()):
+        try:
+            values = stats()
+        except Exception as e:
+            logging.warning(f"Metrics: reading {prefix} stats failed: {e}")
+            continue
+        series: Dict[str, List[Tuple[LabelKey, float]]] = {}
+        name = f"{NAMESPACE}_{prefix}"
+        if label:
+            for label_value, nested in values.items():
+                if isinstance(nested, dict):
+                    _flatten(nested, name, ((label, str(label_value)),), series)
+        else:
+            _flatten(values, name, (), series)
+        for metric, samples in series.items():
+            lines.append(f"# TYPE {metric} gauge")
+            lines += [f"{metric}{_format_labels(key)} {_format_value(value)}" for key, value in samples]
+    return lines
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _METRICS:
+        lines += metric.render()
+    lines += _render_stats()
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+        # Skip the headers; the request has no body
+        while (await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, content_type, body = "200 OK", "text/plain; version=0.0.4; charset=utf-8", render_metrics()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", "not found\n"
+        payload = body.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError) as e:
+        logging.debug(f"Metrics scrape dropped: {e}")
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int) -> asyncio.AbstractServer:
+    """Serve GET /metrics on the running loop."""
+    server = await asyncio.start_server(_handle_scrape, host, port)
+    logging.info(f"Metrics on http://{host}:{server.sockets[0].getsockname()[1]}/metrics")
+    return server
@@ -0,0 +1,326 @@
+"""
+Record real conversations and replay them as benchmarks.
+
+With RECORD_CONVERSATIONS=<path>, every turn the bot handles is appended to a
+JSONL file, one compact line per turn: the client's text, the model messages
+of the turn (LLM responses, tool calls and tool results), the path it took
+(local answer, stream, run) and its timings (the whole turn and each tool).
+Names, emails and phone numbers are redacted before anything is written; each
+session gets its own placeholders (Client1, client1@example.com), so a
+redacted conversation still reads and replays consistently. A name is often
+only recognised turns after it was first written (the client answers "דנה כהן",
+and the name shows up as the booking's user_name a turn later), so a session's
+turns are held in memory and written together when the session ends: on
+/start, after SESSION_IDLE_SECONDS without a turn, or when recording stops.
+
+`load_sessions` reads a recording back, and `ReplayScript` is a stand-in model
+that answers each turn with the LLM responses recorded for it. The bot's own
+code (history handling, local intents, tools, prompt assembly) runs for real,
+so `scripts/replay_conversations.py` can benchmark changes to it on real
+traffic shapes.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic_ai.messages import (
+    ModelMessage, ModelResponse, TextPart, ToolCallPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from src.core.history import dump_messages, estimate_tokens, load_messages
+
+# Bumped when the line format changes
+FORMAT_VERSION = 1
+
+# ASCII only, so a Hebrew prefix ("ל-dana@...") isn't taken as part of the address
+EMAIL_PATTERN = re.compile(r"(?<![A-Za-z0-9._%+])[A-Za-z0-9][A-Za-z0-9._%+-]*@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+")
+PHONE_PATTERN = re.compile(r"(?<!\d)(?:\+972[- ]?|0)5\d[- ]?\d{3}[- ]?\d{4}(?!\d)")
+# "שמי דנה", "קוראים לי דנה", "my name is Dana" -> the word after the phrase
+NAME_PATTERN = re.compile(r"(?:שמי|קוראים לי|השם שלי|my name is)\s*[:,\-]?\s*([^\W\d_]{2,})", re.IGNORECASE)
+# Tool arguments that always hold a name
+NAME_ARGUMENTS = ("user_name", "name")
+
+REDACTED_PHONE = "050-0000000"
+
+# A session with no turn for this long is over: its turns are redacted and written
+SESSION_IDLE_SECONDS = 30 * 60
+# Turns held per session before they are written anyway (bounds memory on very long chats)
+SESSION_MAX_PENDING_TURNS = 200
+
+# Reply used when a replayed turn asks the model for more responses than were recorded
+REPLAY_FALLBACK = "(no recorded response)"
+
+
+class Redactor:
+    """Replaces the names, emails and phone numbers of one session with stable placeholders."""
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}
+        self.emails: Dict[str, str] = {}
+        self._name_pattern: Optional[re.Pattern] = None
+
+    def learn(self, user_text: str, messages: Sequence[ModelMessage]):
+        """Pick up names from the client's text and from tool arguments (e.g. the booking name)."""
+        found = NAME_PATTERN.findall(user_text)
+        for message in messages:
+            if isinstance(message, ModelResponse):
+                for part in message.parts:
+                    if isinstance(part, ToolCallPart):
+                        try:
+                            args = part.args_as_dict()
+                        except Exception:
+                            continue
+                        for key in NAME_ARGUMENTS:
+                            if isinstance(args.get(key), str):
+                                found.extend(args[key].split())
+        for name in found:
+            if len(name) > 1 and name not in self.names:
+                self.names[name] = f"Client{len(self.names) + 1}"
+                self._name_pattern = None
+
+    def _email(self, match: re.Match) -> str:
+        email = match.group(0)
+        if email not in self.emails:
+            self.emails[email] = f"client{len(self.emails) + 1}@example.com"
+        return self.emails[email]
+
+    def redact_text(self, text: str) -> str:
+        text = EMAIL_PATTERN.sub(self._email, text)
+        text = PHONE_PATTERN.sub(REDACTED_PHONE, text)
+        if self.names:
+            if self._name_pattern is None:
+                # Longest first, and allow a one-letter Hebrew prefix ("לדנה", "ודנה")
+                alternatives = "|".join(re.escape(name) for name in sorted(self.names, key=len, reverse=True))
+                self._name_pattern = re.compile(rf"(?<!\w)([ובלהמשכ]?)({alternatives})(?!\w)")
+            text = self._name_pattern.sub(lambda m: m.group(1) + self.names[m.group(2)], text)
+        return text
+
+    def redact(self, value: Any) -> Any:
+        """Redact every string inside a JSON-like value."""
+        if isinstance(value, str):
+            return self.redact_text(value)
+        if isinstance(value, list):
+            return [self.redact(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.redact(item) for key, item in value.items()}
+        return value
+
+
+def _dump_messages(messages: Sequence[ModelMessage]) -> List[Dict[str, Any]]:
+    """
+    Messages as compact JSON-ready dicts. The system prompt is left out: the agent
+    adds its current one again when the turn is replayed.
+    """
+    dumped = dump_messages(list(messages))
+    for message in dumped:
+        message["parts"] = [part for part in message["parts"] if part.get("part_kind") != "system-prompt"]
+    return dumped
+
+
+@dataclass
+class RecordedTurn:
+    session: str
+    turn: int
+    user_text: str
+    path: str
+    turn_ms: float
+    messages: List[ModelMessage]
+    timings: List[Tuple[str, float]] = field(default_factory=list)
+
+    def responses(self) -> List[ModelResponse]:
+        """The LLM responses of the turn, in order."""
+        return [message for message in self.messages if isinstance(message, ModelResponse)]
+
+
+class _Session:
+    def __init__(self, now: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.turns = 0
+        self.redactor = Redactor()
+        # Unredacted records of the turns not written yet
+        self.pending: List[Dict[str, Any]] = []
+        self.last_turn = now
+
+
+class ConversationRecorder:
+    """
+    Appends redacted turns to a JSONL file; one session per chat until it's restarted.
+    Turns are written when their session ends, redacted with every name the session revealed.
+    """
+
+    def __init__(self, path: str, idle_seconds: float = SESSION_IDLE_SECONDS, clock=time.monotonic):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._sessions: Dict[int, _Session] = {}
+        self.turns_recorded = 0
+
+    def start_session(self, chat_id: int):
+        """The chat starts over (/start): its session is written and later turns go to a new one."""
+        with self._lock:
+            session = self._sessions.pop(chat_id, None)
+            if session is not None:
+                self._write_locked(session)
+
+    def record_turn(self, chat_id: int, user_text: str, messages: Sequence[ModelMessage], path: str,
+                    seconds: float, timings: Sequence[Tuple[str, float]] = ()):
+        now = self._clock()
+        with self._lock:
+            self._end_idle_locked(now)
+            session = self._sessions.get(chat_id)
+            if session is None:
+                session = self._sessions[chat_id] = _Session(now)
+            session.turns += 1
+            session.last_turn = now
+            session.redactor.learn(user_text, messages)
+            session.pending.append({
+                "v": FORMAT_VERSION,
+                "session": session.id,
+                "turn": session.turns,
+                "at": round(time.time(), 3),
+                "path": path,
+                "turn_ms": round(seconds * 1000, 1),
+                "user": user_text,
+                "timings": [[name, round(elapsed * 1000, 2)] for name, elapsed in timings],
+                "messages": _dump_messages(messages),
+            })
+            if len(session.pending) >= SESSION_MAX_PENDING_TURNS:
+                self._write_locked(session)
+
+    def _end_idle_locked(self, now: float):
+        for chat_id, session in list(self._sessions.items()):
+            if now - session.last_turn >= self.idle_seconds:
+                self._write_locked(session)
+                del self._sessions[chat_id]
+
+    def _write_locked(self, session: _Session):
+        """Redact the session's held turns with everything it has revealed, and append them."""
+        for record in session.pending:
+            record["user"] = session.redactor.redact_text(record["user"])
+            record["messages"] = session.redactor.redact(record["messages"])
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        if session.pending:
+            self._file.flush()
+            self.turns_recorded += len(session.pending)
+            session.pending = []
+
+    def pending_turns(self) -> int:
+        """Turns recorded but not written yet."""
+        with self._lock:
+            return sum(len(session.pending) for session in self._sessions.values())
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                self._write_locked(session)
+            self._sessions.clear()
+            self._file.close()
+
+
+_recorder: Optional[ConversationRecorder] = None
+
+
+def configure_recorder(path: Optional[str]) -> bool:
+    """Start recording to `path` (None or "" turns recording off). Returns whether recording is on."""
+    global _recorder
+    close_recorder()
+    if path:
+        _recorder = ConversationRecorder(path)
+        logging.info(f"Recording conversations to {path}")
+    return _recorder is not None
+
+
+def close_recorder():
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+    _recorder = None
+
+
+def recording_enabled() -> bool:
+    return _recorder is not None
+
+
+def start_session(chat_id: int):
+    if _recorder is not None:
+        _recorder.start_session(chat_id)
+
+
+def record_turn(chat_id: int, user_text: str, messages: Sequence[ModelMessage], path: str,
+                seconds: float, timings: Sequence[Tuple[str, float]] = ()):
+    """Append a turn to the recording, if one is configured. Never fails the turn."""
+    if _recorder is None:
+        return
+    try:
+        _recorder.record_turn(chat_id, user_text, messages, path, seconds, timings)
+    except Exception as e:
+        logging.warning(f"Recording turn failed: {e}")
+
+
+def load_sessions(path: str) -> Dict[str, List[RecordedTurn]]:
+    """Recorded turns grouped by session, in the order they were recorded."""
+    sessions: Dict[str, List[RecordedTurn]] = {}
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("v") != FORMAT_VERSION:
+                raise ValueError(f"{path}:{number}: unsupported recording format {record.get('v')}")
+            sessions.setdefault(record["session"], []).append(RecordedTurn(
+                session=record["session"],
+                turn=record["turn"],
+                user_text=record["user"],
+                path=record["path"],
+                turn_ms=record["turn_ms"],
+                messages=load_messages(record["messages"]),
+                timings=[(name, ms / 1000) for name, ms in record.get("timings", [])],
+            ))
+    return sessions
+
+
+class ReplayScript:
+    """
+    A model that answers with recorded responses: `load(turn)` queues the LLM
+    responses of a recorded turn, and every request the agent makes takes the next one.
+    Requests beyond what was recorded (the code under test now needs more LLM calls)
+    get a plain fallback text and count as divergences.
+    """
+
+    def __init__(self):
+        self._queue: List[ModelResponse] = []
+        self.requests = 0
+        self.divergences = 0
+        self.prompt_tokens: List[int] = []
+
+    def load(self, turn: RecordedTurn):
+        # A turn answered locally has no real LLM responses, only the reply stored in the history
+        self._queue = [] if turn.path == "local" else turn.responses()
+
+    def unused(self) -> int:
+        """Recorded responses the last turn didn't ask for."""
+        return len(self._queue)
+
+    def respond(self, messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        self.requests += 1
+        self.prompt_tokens.append(estimate_tokens(messages))
+        if self._queue:
+            return self._queue.pop(0)
+        self.divergences += 1
+        return ModelResponse(parts=[TextPart(REPLAY_FALLBACK)])
+
+    def model(self) -> FunctionModel:
+        return FunctionModel(self.respond, model_name="replay")
+
@@ -0,0 +1,34 @@
+"""
+Small helpers for the latency numbers our modules report.
+"""
+from collections import deque
+from typing import Deque, Dict, Iterable
+
+
+def percentile(samples: Iterable[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LatencyWindow:
+    """The most recent latency samples (seconds), summarized in milliseconds."""
+
+    def __init__(self, size: int = 500):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        return {
+            "p50_ms": percentile(self.samples, 50) * 1000,
+            "p95_ms": percentile(self.samples, 95) * 1000,
+            "max_ms": max(self.samples) * 1000,
+        }
@@ -0,0 +1,276 @@
+"""
+Tracing spans for the hot path of a turn.
+
+`span()` and `@traced()` mark the pieces of work a reply is made of (the turn
+itself, each LLM request, each tool, each calendar call, each Telegram send),
+so a slow reply can be broken down into where its time went.
+
+Where spans go is chosen once with `configure_tracing` (TRACE_EXPORT):
+  - "off" (default): spans are no-ops
+  - "file": one JSON line per finished span in TRACE_FILE, using OpenTelemetry's
+    field names (trace_id, span_id, parent_span_id, start/end in unix nanoseconds).
+    Finished spans are queued and written in batches by a background thread, so
+    a turn never waits on the disk. Needs no extra packages;
+    `scripts/trace_report.py` turns the file into a per-turn latency breakdown.
+  - "otlp": the OpenTelemetry SDK with an OTLP/HTTP exporter, configured through
+    the standard OTEL_EXPORTER_OTLP_* variables. Needs opentelemetry-sdk and
+    opentelemetry-exporter-otlp-proto-http; without them we fall back to "file".
+"""
+import os
+import json
+import time
+import random
+import inspect
+import logging
+import functools
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+SERVICE_NAME = "ragcosmetic-bot"
+
+# File exporter: seconds between background writes, and spans that trigger a write sooner
+EXPORT_INTERVAL = 1.0
+EXPORT_BATCH_SIZE = 512
+# Spans queued beyond this (the disk can't keep up) are dropped rather than held in memory
+EXPORT_MAX_QUEUE = 20000
+
+# Span attribute values must be primitives; anything else is recorded as its str()
+_PRIMITIVES = (str, bool, int, float)
+
+
+def _attribute(value: Any):
+    return value if isinstance(value, _PRIMITIVES) else str(value)
+
+
+class _NoopSpan:
+    """Returned when tracing is off; accepts and ignores everything."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _JsonlExporter:
+    """
+    Appends finished spans to a file, one JSON object per line. `export` only queues
+    the record; a background thread serializes and writes the queue in batches.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._queue: List[Dict[str, Any]] = []
+        self._condition = threading.Condition()
+        # Serializes writes between the background thread and `flush`
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, record: Dict[str, Any]):
+        with self._condition:
+            if self._closed or len(self._queue) >= EXPORT_MAX_QUEUE:
+                self.dropped += 1
+                return
+            self._queue.append(record)
+            if len(self._queue) >= EXPORT_BATCH_SIZE:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._closed and len(self._queue) < EXPORT_BATCH_SIZE:
+                    self._condition.wait(EXPORT_INTERVAL)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def flush(self):
+        """Write every queued span now."""
+        with self._write_lock:
+            with self._condition:
+                batch, self._queue = self._queue, []
+            if not batch or self._file.closed:
+                return
+            try:
+                self._file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in batch))
+                self._file.flush()
+            except (OSError, ValueError) as e:
+                logging.warning(f"Tracing: could not write {len(batch)} spans to {self.path}: {e}")
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        with self._write_lock:
+            self._file.close()
+        if self.dropped:
+            logging.warning(f"Tracing: dropped {self.dropped} spans (export queue full)")
+
+
+_current_span: ContextVar[Optional["_Span"]] = ContextVar("current_span", default=None)
+
+
+class _Span:
+    """Zero-dependency span: nests through contextvars, exported when it ends."""
+
+    def __init__(self, exporter: _JsonlExporter, name: str, attributes: Dict[str, Any], root: bool):
+        self._exporter = exporter
+        self.name = name
+        self.attributes = {key: _attribute(value) for key, value in attributes.items()}
+        self._root = root
+
+    def __enter__(self):
+        parent = None if self._root else _current_span.get()
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.time_ns()
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Ended from another context (e.g. a generator finalized elsewhere)
+            pass
+        if exc is not None:
+            self.attributes["exception.type"] = exc_type.__name__
+            self.attributes["exception.message"] = str(exc)
+        self._exporter.export({
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": end_ns,
+            "duration_ms": (end_ns - self.start_ns) / 1e6,
+            "status": "ERROR" if exc is not None else "OK",
+            "attributes": self.attributes,
+        })
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = _attribute(value)
+
+
+_mode = "off"
+_exporter: Optional[_JsonlExporter] = None
+_tracer = None
+_tracer_provider = None
+
+
+def _configure_otlp() -> bool:
+    global _tracer, _tracer_provider
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError as e:
+        logging.warning(f"OpenTelemetry SDK/OTLP exporter not installed ({e}), writing traces to a file instead")
+        return False
+
+    _tracer_provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    _tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    # Our own provider rather than the global one, so nothing else in the process is affected
+    _tracer = _tracer_provider.get_tracer(__name__)
+    return True
+
+
+def configure_tracing(mode: str, path: str = "logs/traces.jsonl") -> str:
+    """
+    Choose where spans go: "off", "file" (JSONL at `path`) or "otlp".
+
+    Returns:
+        The mode in effect ("otlp" falls back to "file" without the OpenTelemetry packages)
+    """
+    global _mode, _exporter
+    shutdown_tracing()
+    mode = (mode or "off").lower()
+    if mode == "otlp" and not _configure_otlp():
+        mode = "file"
+    if mode == "file":
+        _exporter = _JsonlExporter(path)
+    elif mode != "otlp":
+        mode = "off"
+    _mode = mode
+    logging.info(f"Tracing: {mode}" + (f" ({path})" if mode == "file" else ""))
+    return mode
+
+
+def flush_tracing():
+    """Write the spans the file exporter has queued so far (for tests and reports)."""
+    if _exporter is not None:
+        _exporter.flush()
+
+
+def shutdown_tracing():
+    """Flush and close the exporter (on shutdown); spans are no-ops afterwards."""
+    global _mode, _exporter, _tracer, _tracer_provider
+    if _exporter is not None:
+        _exporter.close()
+    if _tracer_provider is not None:
+        _tracer_provider.shutdown()
+    _mode, _exporter, _tracer, _tracer_provider = "off", None, None, None
+
+
+def tracing_enabled() -> bool:
+    return _mode != "off"
+
+
+def span(name: str, root: bool = False, **attributes):
+    """
+    Context manager for a span named `name`, nested under the current span.
+
+    Args:
+        root: Start a new trace instead (for work that runs apart from whatever queued it)
+        attributes: Initial span attributes; more can be added with `set_attribute`
+    """
+    if _mode == "off":
+        return _NOOP_SPAN
+    if _tracer is not None:
+        from opentelemetry import context as otel_context
+        attributes = {key: _attribute(value) for key, value in attributes.items()}
+        return _tracer.start_as_current_span(
+            name, context=otel_context.Context() if root else None, attributes=attributes
+        )
+    return _Span(_exporter, name, attributes, root)
+
+
+def traced(name: Optional[str] = None, root: bool = False, **attributes) -> Callable:
+    """Decorator: run each call of the function (sync or async) inside a span (see `span`)."""
+    def decorate(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, root=root, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, root=root, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate
@@ -0,0 +1,133 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from pydantic_ai.models.function import FunctionModel
+
+from src.telegram import bot
+from src.core.agent import beauty_advisor_agent, BeautyAdvisorDependencies
+
+
+class FakeBot:
+    """Records what the handlers send to Telegram."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls.append(("send_message", text))
+        return SimpleNamespace(message_id=len(self.calls))
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        self.calls.append(("edit_message_text", text))
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        self.calls.append(("send_photo", photo.name))
+
+    async def send_document(self, chat_id, document, **kwargs):
+        self.calls.append(("send_document", document.name))
+
+
+def test_extract_markers():
+    text = "הנה התמונה IMAGE:data/images/products/cleanser.png. והזימון CALENDAR:/tmp/a.ics"
+    clean, images, calendars = bot.extract_markers(text)
+    assert clean == "הנה התמונה  והזימון"
+    assert images == ["data/images/products/cleanser.png"]
+    assert calendars == ["/tmp/a.ics"]
+
+
+def test_partial_marker_is_held_back():
+    assert bot._visible_partial_text("שלום לך IMAG") == "שלום לך"
+    assert bot._visible_partial_text("שלום לך IMAGE:data/im") == "שלום לך"
+    assert bot._visible_partial_text("שלום לך") == "שלום לך"
+
+
+def test_stream_agent_reply_sends_then_edits(monkeypatch):
+    async def stream_reply(messages, info):
+        for chunk in ["היי! ", "הנה ", "הטיפול ", "IMAGE:data/images/products/cleanser.png"]:
+            yield chunk
+
+    fake_bot = FakeBot()
+    context = SimpleNamespace(bot=fake_bot)
+    monkeypatch.setattr(bot, "STREAM_DEBOUNCE", None)
+    monkeypatch.setattr(bot, "STREAM_EDIT_INTERVAL", 0)
+
+    async def run():
+        with beauty_advisor_agent.override(model=FunctionModel(stream_function=stream_reply)):
+            return await bot.stream_agent_reply(context, 1, "שלום", BeautyAdvisorDependencies(), [])
+
+    new_messages = asyncio.run(run())
+
+    kinds = [kind for kind, _ in fake_bot.calls]
+    assert kinds[0] == "send_message"
+    assert "edit_message_text" in kinds
+    assert kinds[-1] == "send_photo"
+    assert [text for kind, text in fake_bot.calls if kind != "send_photo"][-1] == "היי! הנה הטיפול"
+    assert new_messages[0].parts[0].content == "שלום"
+
+
+def test_stream_runs_tools_called_after_text(monkeypatch):
+    from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+    from pydantic_ai.models.function import DeltaToolCall
+    from src.core import agent
+
+    checked = []
+    monkeypatch.setattr(agent, "check_availability", lambda date_str: checked.append(date_str) or ["10:00"])
+
+    async def stream_reply(messages, info):
+        if not any(isinstance(p, ToolReturnPart) for m in messages for p in m.parts):
+            yield "רגע, בודקת"
+            yield {0: DeltaToolCall(name="check_appointment_availability", json_args='{"date_text": "מחר"}')}
+        else:
+            yield "מחר פנוי ב-10:00"
+
+    fake_bot = FakeBot()
+    context = SimpleNamespace(bot=fake_bot)
+    monkeypatch.setattr(bot, "STREAM_DEBOUNCE", None)
+    monkeypatch.setattr(bot, "STREAM_EDIT_INTERVAL", 0)
+
+    async def run():
+        with beauty_advisor_agent.override(model=FunctionModel(stream_function=stream_reply)):
+            return await bot.stream_agent_reply(context, 1, "יש תור מחר?", BeautyAdvisorDependencies(), [])
+
+    new_messages = asyncio.run(run())
+
+    assert len(checked) == 1
+    assert fake_bot.calls[0] == ("send_message", "רגע, בודקת")
+    assert fake_bot.calls[-1] == ("edit_message_text", "מחר פנוי ב-10:00")
+    # One request/response per model call, nothing repeated
+    responses = [m for m in new_messages if isinstance(m, ModelResponse)]
+    assert [type(p) for p in responses[0].parts] == [TextPart, ToolCallPart]
+    assert len(responses) == 2 and len(new_messages) == 4
+
+
+def test_failed_final_edit_keeps_the_turn(monkeypatch):
+    class FlakyEditBot(FakeBot):
+        async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+            if "!" in text:
+                raise RuntimeError("Message can't be edited")
+            await super().edit_message_text(chat_id, message_id, text, **kwargs)
+
+    async def stream_reply(messages, info):
+        for chunk in ["היי", " שמחה לעזור!"]:
+            yield chunk
+
+    fake_bot = FlakyEditBot()
+    context = SimpleNamespace(bot=fake_bot)
+    monkeypatch.setattr(bot, "STREAM_DEBOUNCE", None)
+    monkeypatch.setattr(bot, "STREAM_EDIT_INTERVAL", 3600)
+
+    async def run():
+        with beauty_advisor_agent.override(model=FunctionModel(stream_function=stream_reply)):
+            return await bot.stream_agent_reply(context, 1, "שלום", BeautyAdvisorDependencies(), [])
+
+    new_messages = asyncio.run(run())
+    assert fake_bot.calls == [("send_message", "היי")]
+    assert new_messages[-1].parts[0].content == "היי שמחה לעזור!"
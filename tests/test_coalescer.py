@@ -0,0 +1,82 @@
+import os
+import sys
+import asyncio
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.telegram import coalescer as coalescer_module
+from src.telegram.coalescer import MessageCoalescer
+from src.telegram.dispatcher import ChatDispatcher
+
+
+def test_burst_becomes_one_run():
+    runs = []
+
+    async def process(text):
+        runs.append(text)
+        return len(runs)
+
+    async def run():
+        coalescer = MessageCoalescer(ChatDispatcher(4), window=0.05)
+        futures = [coalescer.add(1, "היי", process)]
+        await asyncio.sleep(0.01)
+        futures.append(coalescer.add(1, "כמה עולה", process))
+        await asyncio.sleep(0.01)
+        futures.append(coalescer.add(1, "טיפול פנים", process))
+        results = await asyncio.gather(*futures)
+        return coalescer, results
+
+    coalescer, results = asyncio.run(run())
+    assert runs == ["היי\nכמה עולה\nטיפול פנים"]
+    assert results == [1, 1, 1]
+    assert coalescer.stats() == {"messages": 3, "runs": 1, "merged_messages": 2, "pending_chats": 0}
+
+
+def test_messages_during_a_run_are_merged_into_the_next():
+    runs = []
+
+    async def process(text):
+        runs.append(text)
+        await asyncio.sleep(0.05)
+
+    async def run():
+        coalescer = MessageCoalescer(ChatDispatcher(4), window=0)
+        first = coalescer.add(1, "יש תור מחר?", process)
+        await asyncio.sleep(0.01)  # first run is in flight
+        second = coalescer.add(1, "בבוקר", process)
+        await asyncio.sleep(0)
+        third = coalescer.add(1, "או בצהריים", process)
+        await asyncio.gather(first, second, third)
+
+    asyncio.run(run())
+    assert runs == ["יש תור מחר?", "בבוקר\nאו בצהריים"]
+
+
+def test_window_adapts_to_the_chat():
+    coalescer = MessageCoalescer(ChatDispatcher(4), window=1.0)
+    assert coalescer.window_for(1, "היי") == 1.0
+    # A finished-looking message doesn't wait for more
+    assert coalescer.window_for(1, "כמה עולה טיפול פנים?") == coalescer_module.MIN_WINDOW
+
+    for now in [0.0, 0.2, 0.4, 0.6]:
+        coalescer._observe_gap(1, now)
+    assert abs(coalescer.window_for(1, "היי") - 0.2 * coalescer_module.GAP_FACTOR) < 1e-9
+
+    for now in [10.0, 12.5, 15.0, 17.5]:
+        coalescer._observe_gap(2, now)
+    assert coalescer.window_for(2, "היי") == coalescer_module.MAX_WINDOW
+
+
+def test_chats_are_not_merged():
+    runs = []
+
+    async def process(text):
+        runs.append(text)
+
+    async def run():
+        coalescer = MessageCoalescer(ChatDispatcher(4), window=0.02)
+        await asyncio.gather(coalescer.add(1, "היי", process), coalescer.add(2, "שלום", process))
+
+    asyncio.run(run())
+    assert sorted(runs) == ["היי", "שלום"]
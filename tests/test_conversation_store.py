@@ -0,0 +1,326 @@
+import os
+import sys
+import socket
+import asyncio
+import socketserver
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart
+from pydantic_ai.models.function import FunctionModel
+
+from src.core import agent, history as history_module
+from src.core.config import Config
+from src.core.conversation_store import (
+    ConversationStore, RedisBackend, SQLiteBackend, decode_history, encode_history, open_backend,
+)
+from src.core.history import ConversationHistory, dump_messages
+from src.core.router import RoutedModel
+from src.telegram import bot
+
+
+def make_turn(i: int):
+    return [
+        ModelRequest(parts=[UserPromptPart(content=f"שאלה {i}")]),
+        ModelResponse(parts=[ToolCallPart("lookup_products", {"query": f"קרם {i}"}, f"call-{i}")]),
+        ModelRequest(parts=[ToolReturnPart("lookup_products", [{"name": f"קרם {i}", "price": 100 + i}], f"call-{i}")]),
+        ModelResponse(parts=[TextPart(content=f"תשובה {i} " + "מידע " * 40)]),
+    ]
+
+
+def make_history(turns: int) -> ConversationHistory:
+    history = ConversationHistory()
+    for i in range(turns):
+        history.add_turn(make_turn(i))
+    return history
+
+
+def test_encoding_round_trip(monkeypatch):
+    monkeypatch.setattr(history_module, "HISTORY_TOKEN_BUDGET", 400)
+    monkeypatch.setattr(history_module, "COMPACT_TARGET_TOKENS", 200)
+    history = make_history(6)
+    assert history.summary and history.compactions
+
+    data = encode_history(history)
+    restored = decode_history(data)
+    assert dump_messages(restored.for_model()) == dump_messages(history.for_model())
+    assert restored.compactions == history.compactions
+    # Big histories are compressed
+    assert data[1:2] != b"-" and len(data) < len(str(history.to_state()).encode("utf-8"))
+
+
+class FakeBackend:
+    def __init__(self):
+        self.data = {}
+        self.puts = 0
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def put_many(self, items):
+        self.puts += 1
+        self.data.update(items)
+
+    def close(self):
+        pass
+
+
+def test_write_behind_and_lazy_load():
+    backend = FakeBackend()
+
+    async def scenario():
+        store = ConversationStore(backend, capacity=10)
+        store.get(1).add_turn(make_turn(1))
+        store.mark_dirty(1)
+        assert backend.data == {}
+        await store.flush()
+        assert set(backend.data) == {"1"} and store.stats()["dirty"] == 0
+
+        # After a restart the chat is loaded on its first message; unknown chats start empty
+        restarted = ConversationStore(backend, capacity=10)
+        await restarted.load(1)
+        await restarted.load(2)
+        assert restarted.get(1).messages[0].parts[0].content == "שאלה 1"
+        assert restarted.get(2).messages == []
+        assert restarted.stats()["loads"] == 1 and restarted.stats()["load_misses"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_lru_eviction_keeps_unwritten_histories():
+    backend = FakeBackend()
+
+    async def scenario():
+        store = ConversationStore(backend, capacity=2)
+        for chat_id in (1, 2, 3):
+            store[chat_id] = make_history(1)
+        assert 1 not in store and len(store) == 2
+        assert backend.puts == 0 and store.stats()["evicted"]["capacity"] == 1
+
+        # Evicted before the flush: comes back from the pending writes
+        await store.load(1)
+        assert store.get(1).messages[0].parts[0].content == "שאלה 0"
+        await store.flush()
+        assert set(backend.data) == {"1", "2", "3"} and backend.puts == 1
+
+    asyncio.run(scenario())
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_idle_chats_leave_memory():
+    clock = FakeClock()
+    evicted = []
+    backend = FakeBackend()
+
+    async def scenario():
+        store = ConversationStore(backend, idle_timeout=600, on_evict=evicted.append, clock=clock)
+        store[1] = make_history(1)
+        clock.now += 400
+        store[2] = make_history(1)
+        clock.now += 300
+        assert store.evict_idle() == 1
+        assert 1 not in store and 2 in store and evicted == [1]
+        assert store.stats()["evicted"]["idle"] == 1
+
+        # Written before it left, and loaded again on the chat's next message
+        await store.flush()
+        await store.load(1)
+        assert store.get(1).messages[0].parts[0].content == "שאלה 0"
+
+    asyncio.run(scenario())
+
+
+def test_memory_budget_evicts_least_recently_used():
+    one_chat = make_history(3).memory_bytes()
+    store = ConversationStore(None, memory_budget=int(one_chat * 3.5))
+    for chat_id in (1, 2, 3):
+        store[chat_id] = make_history(3)
+    store[1]  # a message from chat 1 makes chat 2 the least recently used
+    store[4] = make_history(3)
+    assert list(store._histories) == [3, 1, 4] and 2 not in store
+    stats = store.stats()
+    assert stats["evicted"]["memory"] == 1 and stats["dropped"] == 1
+    assert stats["memory_bytes"] <= stats["memory_budget_bytes"]
+    assert stats["memory_bytes"] == sum(history.memory_bytes() for history in store.values())
+
+    # A single chat over the budget stays while it's being served
+    store.memory_budget = 1
+    store[5] = make_history(3)
+    assert list(store._histories) == [5]
+
+
+def test_memory_store_drops_or_spills(tmp_path):
+    store = ConversationStore(None, capacity=1)
+    store[1] = make_history(1)
+    store[2] = make_history(1)
+    assert len(store) == 1 and store.stats()["dropped"] == 1
+
+    spill_path = tmp_path / "spill.db"
+    backend = open_backend("memory", str(spill_path))
+    assert isinstance(backend, SQLiteBackend) and backend.scratch
+
+    async def scenario():
+        spilled = ConversationStore(backend, capacity=1)
+        spilled[1] = make_history(1)
+        spilled[2] = make_history(1)
+        await spilled.flush()
+        await spilled.load(1)
+        assert spilled.get(1).messages[0].parts[0].content == "שאלה 0"
+        assert spilled.stats()["dropped"] == 0
+        await spilled.close()
+
+    asyncio.run(scenario())
+    assert not spill_path.exists()
+
+
+def test_sqlite_backend(tmp_path):
+    backend = open_backend(f"sqlite:{tmp_path / 'conversations.db'}")
+    assert isinstance(backend, SQLiteBackend)
+    backend.put_many({"7": b"j-{}", "8": b"j-[]"})
+    backend.put_many({"7": b"j-{\"turns\":[]}"})
+    assert backend.get("7") == b"j-{\"turns\":[]}"
+    assert backend.get("9") is None
+    backend.delete("8")
+    assert backend.get("8") is None
+    backend.close()
+    assert open_backend("memory") is None
+    with pytest.raises(ValueError):
+        open_backend("postgres://db")
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """Just enough of the Redis protocol for the backend: AUTH, SELECT, GET, SET, DEL."""
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        data = self.server.data
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            name = command[0].upper()
+            if name == b"AUTH":
+                reply = b"+OK\r\n" if command[1] == b"secret" else b"-WRONGPASS invalid password\r\n"
+            elif name == b"SELECT":
+                reply = b"+OK\r\n"
+            elif name == b"SET":
+                data[command[1]] = command[2]
+                reply = b"+OK\r\n"
+            elif name == b"GET":
+                value = data.get(command[1])
+                reply = b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+            elif name == b"DEL":
+                reply = b":%d\r\n" % (data.pop(command[1], None) is not None)
+            else:
+                reply = b"-ERR unknown command\r\n"
+            self.wfile.write(reply)
+
+
+def test_redis_backend():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _RespHandler)
+    server.daemon_threads = True
+    server.data = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_address[1]
+        backend = open_backend(f"redis://:secret@127.0.0.1:{port}/2")
+        assert isinstance(backend, RedisBackend)
+        payload = encode_history(make_history(2))
+        backend.put_many({"42": payload, "43": b"j-{}"})
+        assert backend.get("42") == payload
+        assert backend.get("44") is None
+        backend.delete("43")
+        assert backend.get("43") is None
+
+        # Reconnects after the connection drops
+        backend._sock.shutdown(socket.SHUT_RDWR)
+        assert backend.get("42") == payload
+        backend.close()
+
+        with pytest.raises(RuntimeError):
+            RedisBackend(f"redis://:wrong@127.0.0.1:{port}").get("42")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class FakeBot:
+    async def send_message(self, chat_id, text, **kwargs):
+        return SimpleNamespace(message_id=1)
+
+
+def test_bot_history_survives_a_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "get_stream_replies", staticmethod(lambda: False))
+    monkeypatch.setattr(Config, "get_local_intents", staticmethod(lambda: False))
+    path = tmp_path / "conversations.db"
+    context = SimpleNamespace(bot=FakeBot())
+    seen = []
+
+    def model(messages, info):
+        seen.append([p.content for m in messages for p in m.parts if isinstance(p, UserPromptPart)])
+        return ModelResponse(parts=[TextPart(content="בשמחה")])
+
+    async def run_bot():
+        monkeypatch.setattr(bot, "conversations", ConversationStore(SQLiteBackend(str(path))))
+        await bot.start_conversation(context, 991)
+        await bot.reply_to_message(context, 991, "כמה עולה טיפול פנים?")
+        await bot.conversations.close()
+
+        # "Restart": a fresh store over the same file
+        monkeypatch.setattr(bot, "conversations", ConversationStore(SQLiteBackend(str(path))))
+        await bot.reply_to_message(context, 991, "ולק ג'ל?")
+        await bot.conversations.close()
+
+    with agent.beauty_advisor_agent.override(model=RoutedModel({"fake": FunctionModel(model)})):
+        asyncio.run(run_bot())
+
+    assert seen[-1][-2:] == ["כמה עולה טיפול פנים?", "ולק ג'ל?"]
+    assert len(seen[-1]) == 3  # the /start greeting trigger too
+
+
+class DownBackend(FakeBackend):
+    def get(self, key):
+        raise ConnectionError("redis is down")
+
+
+def test_unavailable_store_gets_the_fallback_reply(monkeypatch):
+    monkeypatch.setattr(Config, "get_local_intents", staticmethod(lambda: False))
+    sent = []
+
+    class RecordingBot:
+        async def send_message(self, chat_id, text, **kwargs):
+            sent.append(text)
+
+    async def run_bot():
+        monkeypatch.setattr(bot, "conversations", ConversationStore(DownBackend()))
+        await bot.reply_to_message(SimpleNamespace(bot=RecordingBot()), 992, "היי")
+
+    asyncio.run(run_bot())
+    assert sent == ["אופס! משהו השתבש. בבקשה נסי שוב."]
+    # Nothing was started over, so nothing overwrites the stored history later
+    assert 992 not in bot.conversations
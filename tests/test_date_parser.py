@@ -0,0 +1,140 @@
+import os
+import sys
+from datetime import datetime
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import date_parser
+from src.utils.date_parser import (
+    parse_datetime, parse_datetime_with_tier, parse_many, parse_date_only, parse_time_only,
+    extract_date, get_cache_stats, get_tier_stats, clear_cache,
+)
+
+REFERENCE = datetime(2025, 11, 30, 9, 15)  # Sunday
+
+
+def test_cache_hits_for_repeated_phrases():
+    clear_cache()
+    first = parse_datetime("מחר בשעה 10", REFERENCE)
+    second = parse_datetime("  מחר   בשעה 10 ", REFERENCE)
+    assert first == second == ("2025-12-01", "10:00")
+
+    stats = get_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_cached_result_matches_uncached():
+    clear_cache()
+    for text in ["tomorrow at 3pm", "ביום חמישי ב-14:00", "מחר", "Tomorrow AT 3PM"]:
+        expected = date_parser._parse_datetime_uncached(date_parser._normalize(text), REFERENCE)[:2]
+        assert parse_datetime(text, REFERENCE) == expected
+        assert parse_datetime(text, REFERENCE) == expected
+
+
+def test_cache_rolls_over_at_midnight():
+    clear_cache()
+    before = datetime(2025, 11, 30, 23, 59)
+    after = datetime(2025, 12, 1, 0, 1)
+    assert parse_date_only("מחר", before) == "2025-12-01"
+    assert parse_date_only("מחר", after) == "2025-12-02"
+
+
+def test_time_only_is_cached():
+    clear_cache()
+    assert parse_time_only("בשעה 4 אחרי הצהריים") == "16:00"
+    assert parse_time_only("בשעה 4 אחרי הצהריים") == "16:00"
+    assert get_cache_stats()["hits"] == 1
+
+
+def test_time_only_cache_follows_the_minute():
+    clear_cache()
+    before = datetime(2025, 11, 30, 10, 15)
+    after = datetime(2025, 11, 30, 10, 45)
+    assert parse_datetime("10:30 בבוקר", before) == ("2025-11-30", "10:30")
+    # Same hour, but 10:30 has passed: tomorrow, not the cached slot from today
+    assert parse_datetime("10:30 בבוקר", after) == ("2025-12-01", "10:30")
+    assert parse_datetime("10:30 בבוקר", after) == ("2025-12-01", "10:30")
+    assert get_cache_stats()["hits"] == 1
+
+    # A time with a bare "ב" prefix has no time keyword, but is just as time-only
+    clear_cache()
+    assert parse_datetime("ב10", datetime(2025, 11, 30, 9, 0)) == ("2025-11-30", "10:00")
+    assert parse_datetime("ב10", datetime(2025, 11, 30, 11, 0)) == ("2025-12-01", "10:00")
+
+
+def test_cache_is_bounded():
+    clear_cache()
+    cache = date_parser._ParseCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.stats()["size"] == 2
+
+
+def test_fast_path_common_phrases():
+    clear_cache()
+    cases = {
+        "מחר ב-10": ("2025-12-01", "10:00"),
+        "מחרתיים": ("2025-12-02", None),
+        "ביום חמישי ב-14:00": ("2025-12-04", "14:00"),
+        "יום ראשון הבא בשעה 11": ("2025-12-07", "11:00"),
+        "next Monday 4pm": ("2025-12-01", "16:00"),
+        "3pm tomorrow": ("2025-12-01", "15:00"),
+        "2025-12-03 14:30": ("2025-12-03", "14:30"),
+        "בשעה 8 בערב": ("2025-11-30", "20:00"),
+        "9:00": ("2025-11-30", "21:00"),
+        "9:00 בבוקר": ("2025-12-01", "09:00"),
+    }
+    for text, expected in cases.items():
+        outcome = parse_datetime_with_tier(text, REFERENCE)
+        assert outcome.tier == "fast", text
+        assert (outcome.date, outcome.time) == expected, text
+
+
+def test_fast_path_defers_long_tail():
+    clear_cache()
+    for text in ["in 2 hours", "מחר 10", "אני רוצה לקבוע למחר", "2025-02-30"]:
+        assert parse_datetime_with_tier(text, REFERENCE).tier != "fast", text
+
+
+def test_tier_stats():
+    clear_cache()
+    parse_datetime("מחר", REFERENCE)
+    parse_datetime("מחר", REFERENCE)
+    parse_datetime("in 2 hours", REFERENCE)
+    assert get_tier_stats() == {"fast": 1, "cache": 1, "dateparser": 1}
+
+
+def test_shared_dateparser_is_reused_within_a_minute():
+    parser = date_parser._shared_parser.get(REFERENCE)
+    assert date_parser._shared_parser.get(REFERENCE.replace(second=40)) is parser
+    assert date_parser._shared_parser.get(datetime(2025, 11, 30, 9, 16)) is not parser
+    assert date_parser.warm_up_date_parser() > 0
+
+
+def test_parse_many_shares_work_across_inputs():
+    clear_cache()
+    outcomes = parse_many(["מחר ב-10", "מחר  ב-10", "tomorrow at 3pm", "שטויות"], REFERENCE)
+    assert [(o.date, o.time) for o in outcomes] == [
+        ("2025-12-01", "10:00"), ("2025-12-01", "10:00"), ("2025-12-01", "15:00"), (None, None),
+    ]
+    assert [o.tier for o in outcomes[:3]] == ["fast", "cache", "fast"]
+    assert parse_many(["tomorrow at 3pm"], REFERENCE)[0].tier == "cache"
+
+
+def test_extract_date_from_free_text():
+    assert extract_date("מה פנוי מחר?", REFERENCE) == "2025-12-01"
+    assert extract_date("יש תורים ביום חמישי?", REFERENCE) == "2025-12-04"
+    assert extract_date("anything free tomorrow?", REFERENCE) == "2025-12-01"
+    assert extract_date("כמה עולה לק ג'ל?", REFERENCE) is None
+    # "שני" (two) and "ראשון" (first) are weekdays only with a day context
+    assert extract_date("יש לך שני טיפולים פנויים?", REFERENCE) is None
+    assert extract_date("מה הטיפול הראשון שכדאי?", REFERENCE) is None
+    assert extract_date("מה פנוי בשני?", REFERENCE) == "2025-12-01"
+    assert extract_date("יש תור ביום ראשון?", REFERENCE) == "2025-12-07"
@@ -0,0 +1,78 @@
+import os
+import sys
+import asyncio
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.telegram.dispatcher import ChatDispatcher
+
+
+def test_chat_jobs_run_in_order_and_chats_in_parallel():
+    dispatcher = ChatDispatcher(max_concurrent_llm=4)
+    events = []
+
+    def job(chat_id, n, delay):
+        async def run():
+            events.append(("start", chat_id, n))
+            await asyncio.sleep(delay)
+            events.append(("end", chat_id, n))
+            return n
+        return run
+
+    async def run():
+        futures = [
+            dispatcher.submit(1, job(1, 1, 0.03)),
+            dispatcher.submit(1, job(1, 2, 0.0)),
+            dispatcher.submit(2, job(2, 1, 0.01)),
+        ]
+        assert dispatcher.queue_depth() == 3
+        return await asyncio.gather(*futures)
+
+    assert asyncio.run(run()) == [1, 2, 1]
+    chat_1 = [event for event in events if event[1] == 1]
+    assert chat_1 == [("start", 1, 1), ("end", 1, 1), ("start", 1, 2), ("end", 1, 2)]
+    # Chat 2 didn't wait for chat 1's slow first job
+    assert events.index(("end", 2, 1)) < events.index(("end", 1, 1))
+
+    stats = dispatcher.stats()
+    assert stats["jobs_done"] == 3
+    assert stats["active_chats"] == 0
+    assert stats["max_queue_depth"] == 3
+    assert stats["queue_wait"]["max_ms"] > 0
+
+
+def test_llm_slots_are_limited():
+    dispatcher = ChatDispatcher(max_concurrent_llm=2)
+    peak = []
+
+    async def job():
+        async with dispatcher.llm_slot():
+            peak.append(dispatcher.llm_in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*[dispatcher.submit(chat_id, job) for chat_id in range(6)])
+
+    asyncio.run(run())
+    assert max(peak) == 2
+    assert dispatcher.stats()["llm_wait"]["max_ms"] > 0
+
+
+def test_failed_job_does_not_block_the_chat():
+    dispatcher = ChatDispatcher(max_concurrent_llm=1)
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def fine():
+        return "ok"
+
+    async def run():
+        first = dispatcher.submit(7, broken)
+        second = dispatcher.submit(7, fine)
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(run())
+    assert isinstance(first, RuntimeError)
+    assert second == "ok"
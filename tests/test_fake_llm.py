@@ -0,0 +1,110 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent to a real provider in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from pydantic_ai.exceptions import FallbackExceptionGroup
+
+from src.core import agent
+from src.core.agent import beauty_advisor_agent, BeautyAdvisorDependencies
+from src.core.llm_client import close_http_client
+from src.core.router import RoutedModel, _openai_compatible
+from src.utils.fake_llm import FakeLLMServer, LatencyProfile, rule_based_reply
+
+TOOLS = ["lookup_products", "check_appointment_availability", "book_consultation"]
+NO_LATENCY = LatencyProfile(ttft_median=0, chunk_delay=0)
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def test_rules_pick_the_tool():
+    assert rule_based_reply([user("כמה עולה טיפול פנים?")], TOOLS).tool == "lookup_products"
+    reply = rule_based_reply([user("יש משהו פנוי מחר?")], TOOLS)
+    assert (reply.tool, reply.args) == ("check_appointment_availability", {"date_text": "מחר"})
+
+    booking = rule_based_reply([user("מחר ב-14:00"), user("שמי דנה, dana@example.com")], TOOLS)
+    assert booking.tool == "book_consultation"
+    assert booking.args == {"datetime_text": "מחר בשעה 14:00", "user_name": "דנה", "email": "dana@example.com"}
+
+    # Tools that aren't offered are never called
+    assert rule_based_reply([user("כמה עולה טיפול פנים?")], []).text
+
+
+def test_tool_result_becomes_an_answer():
+    messages = [
+        user("יש משהו פנוי מחר?"),
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": "call_1", "type": "function",
+             "function": {"name": "check_appointment_availability", "arguments": '{"date_text": "מחר"}'}}]},
+        {"role": "tool", "tool_call_id": "call_1", "content": '["10:00", "14:00"]'},
+    ]
+    assert "10:00, 14:00" in rule_based_reply(messages, TOOLS).text
+
+
+def run_against_fake(server, prompts, stream=False):
+    async def conversation():
+        url = await server.start()
+        routed = RoutedModel({"fake": _openai_compatible("fake-llm", url, "fake-key")})
+        deps = BeautyAdvisorDependencies()
+        history, outputs = [], []
+        try:
+            with beauty_advisor_agent.override(model=routed):
+                for prompt in prompts:
+                    if stream:
+                        async with beauty_advisor_agent.run_stream(prompt, deps=deps, message_history=history) as result:
+                            output = await result.get_output()
+                            history = result.all_messages()
+                    else:
+                        result = await beauty_advisor_agent.run(prompt, deps=deps, message_history=history)
+                        output, history = result.output, result.all_messages()
+                    outputs.append(output)
+        finally:
+            await server.close()
+            await close_http_client()
+        return outputs
+
+    return asyncio.run(conversation())
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_agent_books_through_the_fake(monkeypatch, stream):
+    monkeypatch.setattr(agent, "check_availability", lambda date_str: ["10:00", "14:00"])
+    bookings = []
+    monkeypatch.setattr(agent, "book_appointment", lambda *args: bookings.append(args) or "נקבע! ✅")
+
+    server = FakeLLMServer(NO_LATENCY, seed=1)
+    outputs = run_against_fake(server, [
+        "כמה עולה טיפול פנים?",
+        "יש משהו פנוי מחר ב-14:00?",
+        "שמי דנה, dana@example.com",
+    ], stream=stream)
+
+    assert "רוצה שאבדוק" in outputs[0]
+    assert "14:00 פנויה" in outputs[1]
+    assert outputs[2] == "נקבע! ✅"
+    assert len(bookings) == 1 and bookings[0][2:4] == ("דנה", "dana@example.com")
+    assert server.stats()["tool_calls"] == 3
+    assert server.stats()["streamed"] == (6 if stream else 0)
+
+
+def test_scripted_replies_come_first():
+    server = FakeLLMServer(NO_LATENCY, script=[{"content": "תשובה מהתסריט"}])
+    assert run_against_fake(server, ["היי", "היי"]) == ["תשובה מהתסריט", "היי! איזה טיפול מעניין אותך, פנים או ציפורניים?"]
+
+
+def test_errors_surface_as_provider_failures(monkeypatch):
+    # No retries, so the 503 reaches the router
+    monkeypatch.setattr("src.core.llm_client.MAX_RETRIES", 0)
+    server = FakeLLMServer(NO_LATENCY, error_rate=1.0)
+    with pytest.raises(FallbackExceptionGroup):
+        run_against_fake(server, ["היי"])
+    assert server.stats()["errors"] == 1
@@ -0,0 +1,101 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from telegram.error import BadRequest
+
+from src.telegram import bot
+from src.telegram.file_id_cache import FileIdCache
+
+
+def write_image(path, data: bytes, mtime: int):
+    path.write_bytes(data)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_file_ids_follow_the_content(tmp_path):
+    image = tmp_path / "cream.png"
+    write_image(image, b"png-1", 1_000_000_000)
+    cache_path = tmp_path / "file_ids.json"
+    cache = FileIdCache(str(cache_path))
+
+    assert cache.lookup(str(image), bot_id=1) is None
+    cache.remember(str(image), "AgAD-1", bot_id=1)
+    assert cache.lookup(str(image), bot_id=1) == "AgAD-1"
+
+    # Same bytes under another name share the upload
+    copy = tmp_path / "copy.png"
+    write_image(copy, b"png-1", 2_000_000_000)
+    assert cache.lookup(str(copy), bot_id=1) == "AgAD-1"
+
+    # Survives a restart; another bot can't use the ids
+    assert FileIdCache(str(cache_path)).lookup(str(image), bot_id=1) == "AgAD-1"
+    assert FileIdCache(str(cache_path)).lookup(str(image), bot_id=2) is None
+
+    # An edited image needs a new upload
+    write_image(image, b"png-2", 3_000_000_000)
+    assert cache.lookup(str(image), bot_id=1) is None
+    assert cache.stats() == {"images": 1, "hits": 2, "uploads": 1, "bytes_saved": 10, "rejected": 0}
+
+
+def test_hash_is_only_recomputed_when_the_file_changes(tmp_path, monkeypatch):
+    image = tmp_path / "cream.png"
+    write_image(image, b"png-1", 1_000_000_000)
+    cache = FileIdCache()
+    cache.remember(str(image), "AgAD-1")
+
+    hashed = []
+    from src.telegram import file_id_cache
+    original = file_id_cache.file_sha256
+    monkeypatch.setattr(file_id_cache, "file_sha256", lambda path: hashed.append(path) or original(path))
+    for _ in range(5):
+        assert cache.lookup(str(image)) == "AgAD-1"
+    assert hashed == []
+
+    write_image(image, b"png-1", 2_000_000_000)
+    assert cache.lookup(str(image)) == "AgAD-1"
+    assert hashed == [str(image)]
+
+
+class PhotoBot:
+    id = 4242
+
+    def __init__(self, reject_file_ids: bool = False):
+        self.sent = []
+        self.reject_file_ids = reject_file_ids
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        if isinstance(photo, str):
+            if self.reject_file_ids:
+                raise BadRequest("Wrong file identifier/http url specified")
+            self.sent.append(("file_id", photo))
+        else:
+            self.sent.append(("upload", len(photo.read())))
+        return SimpleNamespace(photo=[SimpleNamespace(file_id="small"), SimpleNamespace(file_id=f"AgAD-{len(self.sent)}")])
+
+
+def test_send_images_uploads_once(tmp_path, monkeypatch):
+    image = tmp_path / "cream.png"
+    write_image(image, b"x" * 2048, 1_000_000_000)
+    monkeypatch.setattr(bot, "photo_cache", FileIdCache(str(tmp_path / "file_ids.json")))
+    telegram = PhotoBot()
+    context = SimpleNamespace(bot=telegram)
+
+    for _ in range(3):
+        asyncio.run(bot.send_images(context, 1, [str(image)]))
+    assert telegram.sent == [("upload", 2048), ("file_id", "AgAD-1"), ("file_id", "AgAD-1")]
+    assert bot.photo_cache.stats()["bytes_saved"] == 4096
+
+    # A file_id Telegram no longer accepts falls back to an upload and is replaced
+    telegram.reject_file_ids = True
+    asyncio.run(bot.send_images(context, 1, [str(image)]))
+    assert telegram.sent[-1] == ("upload", 2048)
+    assert bot.photo_cache.stats()["rejected"] == 1
+    assert bot.photo_cache.lookup(str(image), PhotoBot.id) == "AgAD-4"
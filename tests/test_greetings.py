@@ -0,0 +1,67 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from pydantic_ai.messages import ModelResponse, UserPromptPart
+
+from src.telegram import bot
+from src.core.greetings import GreetingPool, WELCOME_GREETINGS, GREETING_REPLIES, START_TRIGGER
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+        return SimpleNamespace(message_id=len(self.sent))
+
+
+def test_pool_uses_every_greeting_before_repeating():
+    pool = GreetingPool(["a", "b", "c"])
+    for _ in range(5):
+        batch = [pool.next() for _ in range(3)]
+        assert sorted(batch) == ["a", "b", "c"]
+    assert pool.served == 15
+
+
+def test_pool_never_repeats_back_to_back():
+    pool = GreetingPool(["a", "b"])
+    greetings = [pool.next() for _ in range(50)]
+    assert all(first != second for first, second in zip(greetings, greetings[1:]))
+
+
+def test_greetings_follow_the_persona():
+    for greeting in WELCOME_GREETINGS + GREETING_REPLIES:
+        # Short, a single question, no markdown
+        assert len(greeting.split()) <= 40
+        assert greeting.count("?") <= 1
+        assert "**" not in greeting and "#" not in greeting
+        assert "!!" not in greeting
+
+
+def test_start_greets_without_the_llm(monkeypatch):
+    async def no_llm(*args, **kwargs):
+        raise AssertionError("/start must not call the agent")
+
+    monkeypatch.setattr(bot.beauty_advisor_agent, "run", no_llm)
+    fake_bot = FakeBot()
+    chat_id = 4242
+    asyncio.run(bot.start_conversation(SimpleNamespace(bot=fake_bot), chat_id))
+
+    assert len(fake_bot.sent) == 1
+    assert fake_bot.sent[0] in WELCOME_GREETINGS
+
+    # The history continues from the welcome as if the agent had written it
+    request, response = bot.get_history(chat_id).for_model()
+    assert request.parts[0].content == START_TRIGGER
+    assert isinstance(request.parts[0], UserPromptPart)
+    assert isinstance(response, ModelResponse)
+    assert response.parts[0].content == fake_bot.sent[0]
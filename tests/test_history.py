@@ -0,0 +1,131 @@
+import os
+import sys
+import asyncio
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from pydantic_ai.messages import (
+    ModelRequest, ModelResponse, SystemPromptPart, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart,
+)
+from pydantic_ai.models.function import FunctionModel
+
+from src.core import history as history_module
+from pydantic_ai.usage import RunUsage
+
+from src.core.history import (
+    ConversationHistory, split_turns, record_prompt_usage, get_prompt_cache_stats, reset_prompt_cache_stats,
+)
+from src.core.products import get_all_products
+from src.core.agent import beauty_advisor_agent, BeautyAdvisorDependencies
+
+
+def product_turn(n: int) -> list:
+    """A turn where the agent looked up the whole catalog before answering."""
+    call_id = f"call-{n}"
+    return [
+        ModelRequest(parts=[UserPromptPart(content=f"שאלה מספר {n}: מה יש לכם לעור יבש?")]),
+        ModelResponse(parts=[ToolCallPart(tool_name="list_all_products", args={}, tool_call_id=call_id)]),
+        ModelRequest(parts=[ToolReturnPart(tool_name="list_all_products", content=get_all_products(),
+                                           tool_call_id=call_id)]),
+        ModelResponse(parts=[TextPart(content=f"תשובה {n}: ממליצה על טיפול לחות עמוקה. רוצה שאבדוק תורים?")]),
+    ]
+
+
+def test_prompt_size_stays_flat():
+    conversation = ConversationHistory()
+    sizes = []
+    for n in range(40):
+        conversation.add_turn(product_turn(n))
+        sizes.append(conversation.estimated_tokens())
+
+    summary_tokens = history_module.SUMMARY_MAX_CHARS // history_module.CHARS_PER_TOKEN
+    assert max(sizes) <= history_module.HISTORY_TOKEN_BUDGET + summary_tokens
+    assert max(sizes[20:]) <= max(sizes[:20])
+    assert "לקוחה:" in conversation.summary
+    assert len(conversation.summary) <= history_module.SUMMARY_MAX_CHARS
+
+
+def test_tool_calls_keep_their_returns():
+    conversation = ConversationHistory()
+    for n in range(15):
+        conversation.add_turn(product_turn(n))
+
+    messages = conversation.messages
+    assert isinstance(messages[0].parts[0], UserPromptPart)
+    call_ids = {p.tool_call_id for m in messages for p in m.parts if isinstance(p, ToolCallPart)}
+    return_ids = {p.tool_call_id for m in messages for p in m.parts if isinstance(p, ToolReturnPart)}
+    assert call_ids == return_ids
+
+
+def test_old_tool_returns_are_compressed():
+    conversation = ConversationHistory()
+    for n in range(3):
+        conversation.add_turn(product_turn(n))
+
+    conversation._compact()
+
+    old_return = conversation.turns[0][2].parts[0]
+    recent_return = conversation.turns[-1][2].parts[0]
+    assert isinstance(old_return.content, str)
+    assert len(old_return.content) <= history_module.TOOL_RETURN_MAX_CHARS
+    assert isinstance(recent_return.content, list)
+
+
+def test_split_turns():
+    turns = split_turns(product_turn(1) + product_turn(2))
+    assert [len(turn) for turn in turns] == [4, 4]
+
+
+def test_summary_reaches_the_model():
+    conversation = ConversationHistory()
+    for n in range(40):
+        conversation.add_turn(product_turn(n))
+
+    seen = []
+
+    def reply(messages, info):
+        seen.extend(messages)
+        return ModelResponse(parts=[TextPart(content="בטח!")])
+
+    with beauty_advisor_agent.override(model=FunctionModel(reply)):
+        result = asyncio.run(beauty_advisor_agent.run(
+            "ומה לגבי אקנה?", deps=BeautyAdvisorDependencies(), message_history=conversation.for_model()
+        ))
+    system_parts = [p for m in seen for p in m.parts if isinstance(p, SystemPromptPart)]
+    assert system_parts and system_parts[0].content == conversation.summary
+
+    conversation.add_turn(result.new_messages())
+    assert conversation.turns[-1][0].parts[0].content == "ומה לגבי אקנה?"
+
+
+def test_prefix_is_stable_between_compactions():
+    conversation = ConversationHistory()
+    previous = conversation.for_model()
+    for n in range(40):
+        compactions = conversation.compactions
+        conversation.add_turn(product_turn(n))
+        current = conversation.for_model()
+        if conversation.compactions == compactions:
+            # Append-only: everything sent last turn is sent again, unchanged, at the start
+            assert all(a is b for a, b in zip(previous, current))
+            assert len(current) == len(previous) + 4
+        previous = current
+
+    assert 0 < conversation.compactions <= 12
+
+
+def test_prompt_cache_usage_is_recorded():
+    reset_prompt_cache_stats()
+    assert record_prompt_usage(RunUsage(input_tokens=1000, cache_read_tokens=800)) == 800
+    # DeepSeek's own field name
+    assert record_prompt_usage(RunUsage(input_tokens=1000, details={"prompt_cache_hit_tokens": 600})) == 600
+
+    stats = get_prompt_cache_stats()
+    assert stats["runs"] == 2
+    assert stats["cached_tokens"] == 1400
+    assert stats["uncached_tokens"] == 600
+    assert stats["hit_rate"] == 0.7
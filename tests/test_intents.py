@@ -0,0 +1,90 @@
+import os
+import sys
+import asyncio
+from datetime import datetime
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core import intents
+from src.core.intents import classify, answer_locally, get_intent_stats, reset_intent_stats, local_turn_messages
+
+REFERENCE = datetime(2025, 11, 30, 9, 15)  # Sunday
+
+
+def test_classify_simple_intents():
+    cases = {
+        "היי": "greeting",
+        "hello!": "greeting",
+        "מה שעות הפתיחה?": "hours",
+        "כמה עולה לק ג'ל?": "price",
+        "מה פנוי מחר?": "availability",
+        "any slots free tomorrow?": "availability",
+    }
+    for text, expected in cases.items():
+        match = classify(text)
+        assert match.intent == expected, text
+        assert match.confidence >= intents.CONFIDENCE_THRESHOLD, text
+
+
+def test_classify_hands_off_look_alikes():
+    for text in ["כמה זמן מחזיק לק ג'ל?", "תודה רבה", "היי, יש לי עור יבש ואני מחפשת משהו טוב לחורף",
+                 "עד מתי הלק מחזיק?"]:
+        assert classify(text).intent == "other", text
+    assert classify("עד מתי אתם פתוחים?").intent == "hours"
+    assert classify("אני רוצה לקבוע תור למחר").confidence < intents.CONFIDENCE_THRESHOLD
+
+
+def test_price_answered_only_for_a_single_product():
+    answer = asyncio.run(answer_locally("כמה עולה לק ג'ל?"))
+    assert answer.intent == "price"
+    assert "120" in answer.text
+
+    # Broad questions go to the agent, which asks about the client's needs first
+    assert asyncio.run(answer_locally("כמה עולה טיפול?")) is None
+    # Three facial treatments: the generic name is not one product
+    assert asyncio.run(answer_locally("כמה עולה טיפול פנים?")) is None
+    # Only product names count, not a word in some description
+    assert asyncio.run(answer_locally("מחיר של פילינג")) is None
+    assert "280" in asyncio.run(answer_locally("כמה עולה טיפול אקנה?")).text
+
+
+def test_availability_uses_calendar(monkeypatch):
+    requested = []
+
+    def fake_check_availability(date_str):
+        requested.append(date_str)
+        return ["10:00", "12:00", "16:00"]
+
+    monkeypatch.setattr(intents, "check_availability", fake_check_availability)
+    answer = asyncio.run(answer_locally("מה פנוי מחר?", REFERENCE))
+    assert requested == ["2025-12-01"]
+    assert answer.text == "ביום שני (1.12) יש תורים פנויים ב-10:00, 12:00 ו-16:00. איזו שעה נוחה לך?"
+
+    # Asking for a specific time starts a booking - that's the agent's job
+    assert asyncio.run(answer_locally("יש תור מחר ב-10?", REFERENCE)) is None
+    assert requested == ["2025-12-01"]
+
+    # "שני" here is "two", not Monday
+    assert asyncio.run(answer_locally("יש לך שני טיפולים פנויים?", REFERENCE)) is None
+    assert requested == ["2025-12-01"]
+
+
+def test_local_fraction_is_reported():
+    reset_intent_stats()
+    asyncio.run(answer_locally("היי"))
+    asyncio.run(answer_locally("מה שעות הפתיחה?"))
+    asyncio.run(answer_locally("יש לי אקנה בלחיים, מה מומלץ?"))
+    asyncio.run(answer_locally("תודה"))
+
+    stats = get_intent_stats()
+    assert stats["turns"] == 4
+    assert stats["handled_locally"] == 2
+    assert stats["local_fraction"] == 0.5
+    assert stats["by_intent"] == {"greeting": 1, "hours": 1}
+
+
+def test_local_turn_messages_shape():
+    request, response = local_turn_messages("היי", "היי! במה אפשר לעזור?")
+    assert request.parts[0].content == "היי"
+    assert response.parts[0].content == "היי! במה אפשר לעזור?"
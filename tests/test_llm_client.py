@@ -0,0 +1,111 @@
+import os
+import sys
+import asyncio
+
+import httpx
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core import llm_client
+from src.core.llm_client import ResilientTransport, create_openai_client, get_http_client
+
+URL = "https://api.deepseek.com/chat/completions"
+
+
+def send(transport: ResilientTransport) -> httpx.Response:
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.post(URL, json={"model": "deepseek-chat"})
+    return asyncio.run(run())
+
+
+def test_retries_server_errors(monkeypatch):
+    monkeypatch.setattr(llm_client, "RETRY_BASE_DELAY", 0)
+    statuses = [503, 429, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), json={})
+
+    transport = ResilientTransport(httpx.MockTransport(handler))
+    assert send(transport).status_code == 200
+    assert transport.stats.retries == 2
+
+
+def test_retries_connection_errors_then_gives_up(monkeypatch):
+    monkeypatch.setattr(llm_client, "RETRY_BASE_DELAY", 0)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("connection refused")
+
+    transport = ResilientTransport(httpx.MockTransport(handler))
+    try:
+        send(transport)
+        assert False, "expected ConnectError"
+    except httpx.ConnectError:
+        pass
+    assert len(calls) == llm_client.MAX_RETRIES + 1
+
+
+def test_deadline_applies_per_attempt(monkeypatch):
+    monkeypatch.setattr(llm_client, "REQUEST_DEADLINE", 0.05)
+    monkeypatch.setattr(llm_client, "RETRY_BASE_DELAY", 0)
+    delays = [1.0, 0]
+
+    async def handler(request):
+        await asyncio.sleep(delays.pop(0))
+        return httpx.Response(200, json={})
+
+    transport = ResilientTransport(httpx.MockTransport(handler))
+    assert send(transport).status_code == 200
+    assert transport.stats.retries == 1
+
+
+def test_missed_deadlines_raise_an_httpx_timeout(monkeypatch):
+    monkeypatch.setattr(llm_client, "REQUEST_DEADLINE", 0.05)
+    monkeypatch.setattr(llm_client, "RETRY_BASE_DELAY", 0)
+
+    async def handler(request):
+        await asyncio.sleep(1.0)
+        return httpx.Response(200, json={})
+
+    transport = ResilientTransport(httpx.MockTransport(handler))
+    try:
+        send(transport)
+        assert False, "expected ReadTimeout"
+    except httpx.ReadTimeout as e:
+        assert e.request.url == URL
+    assert transport.stats.retries == llm_client.MAX_RETRIES
+
+
+def test_slow_request_is_hedged(monkeypatch):
+    monkeypatch.setattr(llm_client, "HEDGE_MIN_DELAY", 0.05)
+    delays = [1.0, 0]
+
+    async def handler(request):
+        await asyncio.sleep(delays.pop(0))
+        return httpx.Response(200, json={"hedge": not delays})
+
+    transport = ResilientTransport(httpx.MockTransport(handler), hedging=True)
+    key = ("api.deepseek.com", "/chat/completions", False)
+    for _ in range(llm_client.HEDGE_MIN_SAMPLES):
+        transport.stats.record_latency(key, 0.01)
+
+    response = send(transport)
+    assert response.json() == {"hedge": True}
+    assert transport.stats.hedges == 1
+    assert transport.stats.hedge_wins == 1
+
+
+def test_no_hedging_without_enough_samples():
+    transport = ResilientTransport(httpx.MockTransport(lambda request: httpx.Response(200)), hedging=True)
+    assert transport.hedge_delay(httpx.Request("POST", URL)) is None
+
+
+def test_provider_clients_share_the_pool():
+    deepseek = create_openai_client("https://api.deepseek.com", "key")
+    openrouter = create_openai_client("https://openrouter.ai/api/v1", "key")
+    assert deepseek._client is openrouter._client is get_http_client()
+    assert deepseek.max_retries == 0
@@ -0,0 +1,106 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from pydantic_ai.usage import RunUsage
+
+from src.core import agent, appointments
+from src.core.history import ConversationHistory, record_prompt_usage
+from src.core.intents import local_turn_messages
+from src.utils import metrics
+from src.utils.metrics import Counter, Histogram, register_stats, render_metrics, start_metrics_server
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, tool="a")
+    lines = histogram.render()
+    assert 'ragcosmetic_test_seconds_bucket{tool="a",le="0.1"} 1' in lines
+    assert 'ragcosmetic_test_seconds_bucket{tool="a",le="1"} 3' in lines
+    assert 'ragcosmetic_test_seconds_bucket{tool="a",le="+Inf"} 4' in lines
+    assert 'ragcosmetic_test_seconds_count{tool="a"} 4' in lines
+
+
+def test_counter_escapes_labels():
+    counter = Counter("test_total", "Test.")
+    counter.inc(2, kind='say "hi"')
+    assert 'ragcosmetic_test_total{kind="say \\"hi\\""} 2' in counter.render()
+
+
+def test_stats_are_flattened_into_gauges():
+    register_stats("test_queue", lambda: {"depth": 3, "wait": {"p50_ms": 1.5}, "healthy": True, "name": "x"})
+    register_stats("test_provider", lambda: {"deepseek": {"requests": 7}}, label="provider")
+    text = render_metrics()
+    assert "ragcosmetic_test_queue_depth 3" in text
+    assert "ragcosmetic_test_queue_wait_p50_ms 1.5" in text
+    assert "ragcosmetic_test_queue_healthy 1" in text
+    assert "test_queue_name" not in text
+    assert 'ragcosmetic_test_provider_requests{provider="deepseek"} 7' in text
+
+
+def test_tokens_are_counted():
+    before = {kind: metrics.LLM_TOKENS.value(kind=kind) for kind in ("prompt", "cached", "completion")}
+    record_prompt_usage(RunUsage(input_tokens=1000, cache_read_tokens=800, output_tokens=50))
+    assert metrics.LLM_TOKENS.value(kind="prompt") == before["prompt"] + 1000
+    assert metrics.LLM_TOKENS.value(kind="cached") == before["cached"] + 800
+    assert metrics.LLM_TOKENS.value(kind="completion") == before["completion"] + 50
+
+
+class FakeCalendar:
+    """Every slot is taken, so a booking looks for alternatives."""
+
+    def list_events(self, start, end):
+        metrics.record_calendar_call("list_events")
+        return [{"id": "busy"}]
+
+
+def test_tool_calls_and_calendar_calls_per_booking(monkeypatch):
+    monkeypatch.setattr(appointments, "calendar_manager", FakeCalendar())
+    bookings_before = metrics.CALENDAR_CALLS_PER_BOOKING.count()
+    tool_calls_before = metrics.TOOL_CALL_SECONDS.count(tool="book_consultation")
+
+    ctx = SimpleNamespace(deps=agent.BeautyAdvisorDependencies())
+    reply = agent.book_consultation(ctx, "מחר בשעה 10:00", "דנה", "dana@example.com")
+    assert "תפוסה" in reply
+
+    assert metrics.TOOL_CALL_SECONDS.count(tool="book_consultation") == tool_calls_before + 1
+    assert metrics.CALENDAR_CALLS_PER_BOOKING.count() == bookings_before + 1
+    # The re-check plus every slot probed while looking for alternatives
+    assert 'ragcosmetic_calendar_calls_per_booking_bucket{le="1"}' in render_metrics()
+
+
+def test_history_memory_is_cached_until_it_changes():
+    history = ConversationHistory()
+    empty = history.memory_bytes()
+    history.add_turn(local_turn_messages("היי", "שלום! " * 50))
+    grown = history.memory_bytes()
+    assert grown > empty
+    assert history.memory_bytes() == grown
+
+
+def test_endpoint_serves_metrics():
+    async def scrape(path):
+        server = await start_metrics_server("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response.decode()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    response = asyncio.run(scrape("/metrics"))
+    assert response.startswith("HTTP/1.1 200 OK")
+    assert "# TYPE ragcosmetic_agent_run_seconds histogram" in response
+    assert asyncio.run(scrape("/other")).startswith("HTTP/1.1 404")
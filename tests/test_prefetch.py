@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import asyncio
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import FunctionModel
+
+from src.core import agent, appointments
+from src.core.agent import beauty_advisor_agent, BeautyAdvisorDependencies, check_appointment_availability
+
+CALENDAR_DELAY = 0.2
+LLM_DELAY = 0.2
+
+
+def slow_calendar(monkeypatch):
+    calls = []
+
+    def fake_check_availability(date_str):
+        calls.append(date_str)
+        time.sleep(CALENDAR_DELAY)
+        return ["10:00", "14:00"]
+
+    monkeypatch.setattr(appointments, "check_availability", fake_check_availability)
+    monkeypatch.setattr(agent, "check_availability", fake_check_availability)
+    return calls
+
+
+def test_tool_uses_prefetched_lookup(monkeypatch):
+    calls = slow_calendar(monkeypatch)
+    deps = BeautyAdvisorDependencies()
+    date_str = deps.prefetch_availability("יש משהו פנוי מחר בבוקר?")
+    assert date_str in deps.prefetched_availability
+
+    used_before = appointments.get_prefetch_stats()["used"]
+    ctx = SimpleNamespace(deps=deps)
+    assert check_appointment_availability(ctx, "מחר") == ["10:00", "14:00"]
+    assert calls == [date_str]
+    assert appointments.get_prefetch_stats()["used"] == used_before + 1
+
+
+def test_no_prefetch_without_a_date():
+    deps = BeautyAdvisorDependencies()
+    assert deps.prefetch_availability("כמה עולה לק ג'ל?") is None
+    assert deps.prefetched_availability == {}
+
+
+def test_failed_prefetch_falls_back(monkeypatch):
+    calls = slow_calendar(monkeypatch)
+    deps = BeautyAdvisorDependencies()
+    broken = appointments.Future()
+    broken.set_exception(RuntimeError("calendar down"))
+    deps.prefetched_availability[agent.parse_date_only("מחר")] = broken
+
+    assert check_appointment_availability(SimpleNamespace(deps=deps), "מחר") == ["10:00", "14:00"]
+    assert len(calls) == 1
+
+
+def test_calendar_latency_overlaps_llm(monkeypatch):
+    slow_calendar(monkeypatch)
+
+    async def thinking_model(messages, info):
+        if not any(isinstance(p, ToolReturnPart) for m in messages for p in m.parts):
+            await asyncio.sleep(LLM_DELAY)
+            return ModelResponse(parts=[ToolCallPart("check_appointment_availability", {"date_text": "מחר"})])
+        return ModelResponse(parts=[TextPart(content="מחר פנוי ב-10:00 וב-14:00")])
+
+    async def run(prefetch):
+        deps = BeautyAdvisorDependencies()
+        if prefetch:
+            deps.prefetch_availability("מה פנוי מחר?")
+        start = time.perf_counter()
+        with beauty_advisor_agent.override(model=FunctionModel(thinking_model)):
+            await beauty_advisor_agent.run("מה פנוי מחר?", deps=deps)
+        return time.perf_counter() - start
+
+    sequential = asyncio.run(run(prefetch=False))
+    overlapped = asyncio.run(run(prefetch=True))
+    assert sequential >= LLM_DELAY + CALENDAR_DELAY
+    assert overlapped < sequential - CALENDAR_DELAY / 2
@@ -0,0 +1,57 @@
+import os
+import sys
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.products import PRODUCTS, ProductCatalog, search_products, get_all_products
+
+
+def legacy_search(query):
+    query = query.lower()
+    return [
+        p for p in PRODUCTS
+        if (query in p.name.lower() or
+            query in p.category.lower() or
+            query in p.benefits.lower() or
+            query in p.description.lower() or
+            any(query in c.lower() for c in p.target_concern))
+    ]
+
+
+def test_catalog_round_trips_products():
+    assert get_all_products() == PRODUCTS
+
+
+def test_search_matches_list_scan():
+    for query in ["אקנה", "טיפולי פנים", "ויטמין", "קמטים", "לחות", "Vitamin", "nothing-here"]:
+        assert search_products(query) == legacy_search(query), query
+
+
+def test_from_records_interns_and_materializes():
+    records = [
+        {"id": "a", "name": "Serum A", "category": "Skincare", "description": "d", "benefits": "b",
+         "price": 10, "target_skin_type": ["הכל"], "target_concern": ["Acne"]},
+        {"id": "b", "name": "Serum B", "category": "Skincare", "description": "d", "benefits": "b",
+         "price": 20.5, "target_skin_type": ["הכל"], "target_concern": ["Acne"],
+         "image_path": "x.png", "duration_hours": 1.5},
+    ]
+    catalog = ProductCatalog.from_records(records)
+
+    assert len(catalog) == 2
+    assert catalog.index_by_id("b") == 1
+    assert catalog.first_index_by_name("serum b") == 1
+    assert catalog.indices_by_category("skin") == [0, 1]
+    assert catalog.search_indices("acne") == [0, 1]
+
+    first, second = catalog.all()
+    assert first.duration_hours is None and first.image_path is None
+    assert second.price == 20.5 and second.duration_hours == 1.5
+    assert second.target_concern == ["Acne"]
+
+
+def test_duplicate_ids_resolve_to_the_first_product():
+    record = {"id": "a", "name": "Serum A", "category": "Skincare", "description": "d", "benefits": "b",
+              "price": 10, "target_skin_type": [], "target_concern": []}
+    catalog = ProductCatalog.from_records([record, dict(record, name="Serum A2")])
+    assert catalog.index_by_id("a") == 0
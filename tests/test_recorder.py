@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import asyncio
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart
+from pydantic_ai.models.function import FunctionModel
+
+from src.core import agent
+from src.core.config import Config
+from src.core.router import RoutedModel
+from src.telegram import bot
+from src.utils.metrics import timing_scope
+from src.utils.recorder import (
+    ConversationRecorder, Redactor, ReplayScript, configure_recorder, close_recorder, load_sessions,
+    REPLAY_FALLBACK,
+)
+
+
+class FakeBot:
+    async def send_message(self, chat_id, text, **kwargs):
+        return SimpleNamespace(message_id=1)
+
+
+def test_redactor_keeps_placeholders_stable():
+    redactor = Redactor()
+    redactor.learn("שמי דנה, dana.levi@gmail.com", [])
+    text = redactor.redact_text("שמי דנה, dana.levi@gmail.com, טלפון 052-1234567. תודה לדנה!")
+    assert "דנה" not in text and "dana.levi" not in text and "1234567" not in text
+    assert "Client1" in text and "לClient1" in text
+    assert "client1@example.com" in text
+    assert redactor.redact({"email": "dana.levi@gmail.com"}) == {"email": "client1@example.com"}
+
+
+def test_redactor_learns_names_from_tool_arguments():
+    redactor = Redactor()
+    call = ToolCallPart("book_consultation", {"user_name": "מיכל כהן", "email": "m@x.co.il"})
+    redactor.learn("כן, תקבעי", [ModelResponse(parts=[call])])
+    assert redactor.redact_text("נקבע למיכל כהן") == "נקבע לClient1 Client2"
+
+
+def text_turn(user_text, reply, *parts):
+    return [
+        ModelRequest(parts=[UserPromptPart(content=user_text)]),
+        ModelResponse(parts=[*parts, TextPart(content=reply)]),
+    ]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_name_learned_on_a_later_turn_is_redacted_everywhere(tmp_path):
+    path = tmp_path / "conversations.jsonl"
+    clock = FakeClock()
+    recorder = ConversationRecorder(str(path), idle_seconds=600, clock=clock)
+    # The client answers with a bare name; it's only known to be one when the booking runs
+    recorder.record_turn(7, "דנה כהן", text_turn("דנה כהן", "תודה דנה! מה האימייל שלך?"), "run", 0.1)
+    booking = ToolCallPart("book_consultation", {"user_name": "דנה כהן", "email": "dana@gmail.com"})
+    recorder.record_turn(7, "dana@gmail.com", text_turn("dana@gmail.com", "נקבע!", booking), "run", 0.1)
+    clock.now += 300
+    recorder.record_turn(8, "שלום", text_turn("שלום", "היי"), "run", 0.1)
+    assert path.read_text(encoding="utf-8") == "" and recorder.pending_turns() == 3
+
+    # Chat 7 went quiet: its turns are written on the next turn anywhere
+    clock.now += 301
+    recorder.record_turn(8, "תודה", text_turn("תודה", "בכיף"), "run", 0.1)
+    raw = path.read_text(encoding="utf-8")
+    assert "דנה" not in raw and "כהן" not in raw and "dana@" not in raw
+    assert recorder.turns_recorded == 2 and recorder.pending_turns() == 2
+
+    recorder.close()
+    sessions = list(load_sessions(str(path)).values())
+    assert [turn.user_text for turn in sessions[0]] == ["Client1 Client2", "client1@example.com"]
+    assert sessions[0][0].responses()[0].parts[0].content == "תודה Client1! מה האימייל שלך?"
+    assert [len(turns) for turns in sessions] == [2, 2]
+
+
+def test_timing_scope_collects_timed_calls(monkeypatch):
+    monkeypatch.setattr(agent, "check_availability", lambda date_str: ["10:00"])
+    deps = agent.BeautyAdvisorDependencies()
+    with timing_scope() as timings:
+        agent.check_appointment_availability(SimpleNamespace(deps=deps), "מחר")
+    assert [name for name, _ in timings] == ["check_appointment_availability"]
+
+
+def test_record_and_replay(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "get_stream_replies", staticmethod(lambda: False))
+    monkeypatch.setattr(Config, "get_local_intents", staticmethod(lambda: False))
+    monkeypatch.setattr(agent, "book_appointment", lambda *args: "נקבע! ✅")
+    path = tmp_path / "conversations.jsonl"
+    assert configure_recorder(str(path))
+
+    def model(messages, info):
+        if not any(isinstance(p, ToolReturnPart) for m in messages for p in m.parts):
+            return ModelResponse(parts=[ToolCallPart(
+                "book_consultation",
+                {"datetime_text": "מחר ב-10:00", "user_name": "רוני", "email": "roni@gmail.com"},
+            )])
+        return ModelResponse(parts=[TextPart(content="נקבע לרוני, הזימון נשלח ל-roni@gmail.com")])
+
+    context = SimpleNamespace(bot=FakeBot())
+    try:
+        with agent.beauty_advisor_agent.override(model=RoutedModel({"fake": FunctionModel(model)})):
+            asyncio.run(bot.start_conversation(context, 881))
+            asyncio.run(bot.reply_to_message(context, 881, "שמי רוני, roni@gmail.com, מחר ב-10?"))
+    finally:
+        close_recorder()
+
+    raw = path.read_text(encoding="utf-8")
+    assert "רוני" not in raw and "roni@" not in raw
+    record = json.loads(raw.splitlines()[0])
+    assert record["path"] == "run"
+    assert [name for name, _ in record["timings"]] == ["book_consultation"]
+
+    # Replaying feeds the recorded responses back, so the same tool runs with the same arguments
+    sessions = load_sessions(str(path))
+    turn = next(iter(sessions.values()))[0]
+    assert turn.user_text.startswith("שמי Client1, client1@example.com")
+    script = ReplayScript()
+    script.load(turn)
+    with agent.beauty_advisor_agent.override(model=script.model()):
+        asyncio.run(bot.start_conversation(context, 882))
+        asyncio.run(bot.reply_to_message(context, 882, turn.user_text))
+    assert script.requests == 2 and script.divergences == 0 and script.unused() == 0
+    assert bot.get_history(882).messages[-1].parts[0].content == "נקבע לClient1, הזימון נשלח ל-client1@example.com"
+
+    # A turn that now needs an extra LLM call is reported, not failed
+    script.load(turn)
+    script._queue = script._queue[:1]
+    with agent.beauty_advisor_agent.override(model=script.model()):
+        asyncio.run(bot.reply_to_message(context, 882, turn.user_text))
+    assert script.divergences == 1
+    assert bot.get_history(882).messages[-1].parts[0].content == REPLAY_FALLBACK
@@ -0,0 +1,114 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from src.core import router
+from src.core.router import RoutedModel, build_router
+
+
+def replying(text):
+    def reply(messages, info):
+        return ModelResponse(parts=[TextPart(content=text)])
+
+    async def stream(messages, info):
+        yield text
+    return FunctionModel(reply, stream_function=stream)
+
+
+def failing(status=503):
+    def reply(messages, info):
+        raise ModelHTTPError(status_code=status, model_name="down")
+
+    async def stream(messages, info):
+        raise ModelHTTPError(status_code=status, model_name="down")
+        yield ""
+    return FunctionModel(reply, stream_function=stream)
+
+
+@pytest.fixture(autouse=True)
+def no_exploration(monkeypatch):
+    monkeypatch.setattr(router, "EXPLORE_RATE", 0)
+
+
+def test_prefers_clearly_faster_provider():
+    model = RoutedModel({"deepseek": replying("a"), "gemini": replying("b")})
+    assert model.route(streamed=False) == ["deepseek", "gemini"]
+
+    model.health["deepseek"].record_success(2.0, streamed=False)
+    model.health["gemini"].record_success(1.8, streamed=False)
+    # Not enough of a difference to give up the current provider's prompt cache
+    assert model.route(streamed=False)[0] == "deepseek"
+
+    model.health["gemini"].latency[False] = 0.5
+    assert model.route(streamed=False)[0] == "gemini"
+    # Streaming latency is tracked separately
+    assert model.route(streamed=True)[0] == "deepseek"
+
+
+def test_fails_over_and_cools_down():
+    model = RoutedModel({"deepseek": failing(), "gemini": replying("מגמיני")})
+    agent = Agent(model)
+
+    result = asyncio.run(agent.run("היי"))
+    assert result.output == "מגמיני"
+    assert model.current == "gemini"
+    assert model.health["deepseek"].errors == 1
+    assert model.route(streamed=False) == ["gemini", "deepseek"]
+
+    stats = model.stats()
+    assert stats["deepseek"]["healthy"] is False
+    assert stats["gemini"]["requests"] == 1
+
+
+def test_streaming_fails_over():
+    model = RoutedModel({"deepseek": failing(), "openrouter": replying("שלום")})
+    agent = Agent(model)
+
+    async def run():
+        async with agent.run_stream("היי") as result:
+            return await result.get_output()
+
+    assert asyncio.run(run()) == "שלום"
+    assert model.health["openrouter"].latency[True] is not None
+
+
+def test_broken_request_does_not_cool_down_providers():
+    model = RoutedModel({"deepseek": failing(400), "gemini": replying("מגמיני")})
+    agent = Agent(model)
+
+    with pytest.raises(ModelHTTPError):
+        asyncio.run(agent.run("היי"))
+    assert model.health["deepseek"].errors == 0
+    assert model.health["gemini"].requests == 0
+    assert model.route(streamed=False) == ["deepseek", "gemini"]
+
+    # Rate limits are the provider's problem
+    assert router.is_provider_failure(ModelHTTPError(status_code=429, model_name="x"))
+    assert not router.is_provider_failure(ModelHTTPError(status_code=413, model_name="x"))
+
+
+def test_all_providers_failing_raises():
+    agent = Agent(RoutedModel({"deepseek": failing(), "gemini": failing(500)}))
+    with pytest.raises(Exception):
+        asyncio.run(agent.run("היי"))
+
+
+def test_starts_with_any_single_key(monkeypatch):
+    monkeypatch.delenv("DEEPSEEK_API_KEY", raising=False)
+    monkeypatch.delenv("OPENROUTER_API_KEY", raising=False)
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    assert list(build_router().models) == ["gemini"]
+
+    monkeypatch.delenv("GEMINI_API_KEY")
+    with pytest.raises(ValueError):
+        build_router()
@@ -0,0 +1,126 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import FunctionModel
+
+from src.core import agent
+from src.core.agent import beauty_advisor_agent, BeautyAdvisorDependencies, book_consultation
+from src.core.tool_cache import ToolResultCache, get_tool_cache_stats, MAX_ENTRIES
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_results_expire_after_tool_ttl():
+    clock = FakeClock()
+    cache = ToolResultCache(ttls={"slow_tool": 10.0}, clock=clock)
+    calls = []
+
+    def compute():
+        calls.append(clock.now)
+        return len(calls)
+
+    assert cache.get_or_call("slow_tool", "a", compute) == 1
+    clock.now = 9.0
+    assert cache.get_or_call("slow_tool", "a", compute) == 1
+    assert cache.get_or_call("slow_tool", "b", compute) == 2
+    clock.now = 10.5
+    assert cache.get_or_call("slow_tool", "a", compute) == 3
+    assert len(calls) == 3
+
+
+def test_tools_without_ttl_are_not_cached():
+    cache = ToolResultCache(ttls={})
+    calls = []
+    for _ in range(3):
+        cache.get_or_call("book_consultation", "x", lambda: calls.append(1))
+    assert len(calls) == 3
+    assert len(cache) == 0
+
+
+def test_invalidate_one_tool():
+    cache = ToolResultCache(ttls={"a": 60.0, "b": 60.0})
+    cache.get_or_call("a", 1, lambda: "a1")
+    cache.get_or_call("a", 2, lambda: "a2")
+    cache.get_or_call("b", 1, lambda: "b1")
+    assert cache.invalidate("a") == 2
+    assert not cache.has("a", 1)
+    assert cache.has("b", 1)
+
+
+def test_size_is_bounded():
+    clock = FakeClock()
+    cache = ToolResultCache(ttls={"a": 60.0}, clock=clock)
+    for i in range(MAX_ENTRIES + 10):
+        clock.now = i * 0.01
+        cache.get_or_call("a", i, lambda: i)
+    assert len(cache) == MAX_ENTRIES
+    assert not cache.has("a", 0)
+    assert cache.has("a", MAX_ENTRIES + 9)
+
+
+def fake_calendar(monkeypatch):
+    calls = []
+
+    def fake_check_availability(date_str):
+        calls.append(date_str)
+        return ["10:00", "14:00"]
+
+    monkeypatch.setattr(agent, "check_availability", fake_check_availability)
+    return calls
+
+
+def test_repeated_availability_in_one_run_hits_calendar_once(monkeypatch):
+    calls = fake_calendar(monkeypatch)
+
+    def model(messages, info):
+        returns = sum(isinstance(p, ToolReturnPart) for m in messages for p in m.parts)
+        if returns < 2:
+            # "מחר" and "tomorrow" parse to the same date
+            date_text = "מחר" if returns == 0 else "tomorrow"
+            return ModelResponse(parts=[ToolCallPart("check_appointment_availability", {"date_text": date_text})])
+        return ModelResponse(parts=[TextPart(content="מחר פנוי ב-10:00")])
+
+    hits_before = get_tool_cache_stats()["hits"]
+    deps = BeautyAdvisorDependencies()
+    with beauty_advisor_agent.override(model=FunctionModel(model)):
+        asyncio.run(beauty_advisor_agent.run("מה פנוי מחר?", deps=deps))
+    assert len(calls) == 1
+    assert get_tool_cache_stats()["hits"] == hits_before + 1
+
+
+def test_booking_invalidates_availability(monkeypatch):
+    calls = fake_calendar(monkeypatch)
+    monkeypatch.setattr(agent, "book_appointment", lambda *args: "נקבע!")
+    deps = BeautyAdvisorDependencies()
+    ctx = SimpleNamespace(deps=deps)
+
+    agent.check_appointment_availability(ctx, "מחר")
+    agent.check_appointment_availability(ctx, "מחר")
+    assert len(calls) == 1
+
+    assert book_consultation(ctx, "מחר בשעה 10:00", "דנה", "dana@example.com") == "נקבע!"
+    agent.check_appointment_availability(ctx, "מחר")
+    assert len(calls) == 2
+
+
+def test_cached_date_is_not_prefetched(monkeypatch):
+    fake_calendar(monkeypatch)
+    deps = BeautyAdvisorDependencies()
+    agent.check_appointment_availability(SimpleNamespace(deps=deps), "מחר")
+    assert deps.prefetch_availability("ומה פנוי מחר?") is None
+    assert deps.prefetched_availability == {}
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import asyncio
+import inspect
+from types import SimpleNamespace
+
+import pytest
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agent module requires a key at import time; no request is sent in these tests
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import FunctionModel
+
+from src.core import agent
+from src.core.config import Config
+from src.core.router import RoutedModel
+from src.telegram import bot
+from src.utils.tracing import configure_tracing, flush_tracing, shutdown_tracing, span, traced
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    assert configure_tracing("file", str(path)) == "file"
+    yield path
+    shutdown_tracing()
+
+
+def read_spans(path):
+    flush_tracing()
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_spans_nest_and_record_errors(trace_file):
+    with span("outer", chat_id=1):
+        with span("inner") as inner:
+            inner.set_attribute("items", 3)
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError("boom")
+    with span("separate", root=True):
+        pass
+
+    spans = {s["name"]: s for s in read_spans(trace_file)}
+    outer, inner, failing = spans["outer"], spans["inner"], spans["failing"]
+    assert outer["parent_span_id"] is None
+    assert inner["parent_span_id"] == outer["span_id"] == failing["parent_span_id"]
+    assert inner["trace_id"] == outer["trace_id"]
+    assert inner["attributes"] == {"items": 3}
+    assert failing["status"] == "ERROR"
+    assert failing["attributes"]["exception.type"] == "ValueError"
+    assert spans["separate"]["trace_id"] != outer["trace_id"]
+
+
+def test_file_export_is_batched_off_the_caller(tmp_path, monkeypatch):
+    from src.utils import tracing
+    monkeypatch.setattr(tracing, "EXPORT_INTERVAL", 60)
+    path = tmp_path / "traces.jsonl"
+    configure_tracing("file", str(path))
+    try:
+        for i in range(3):
+            with span("queued", root=True, i=i):
+                pass
+        # Finishing a span doesn't touch the disk
+        assert path.read_text(encoding="utf-8") == ""
+    finally:
+        shutdown_tracing()
+    # Shutdown writes what was still queued
+    assert [s["attributes"]["i"] for s in read_spans(path)] == [0, 1, 2]
+
+
+def test_off_is_a_noop(tmp_path):
+    assert configure_tracing("off") == "off"
+    with span("ignored") as s:
+        s.set_attribute("x", 1)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_traced_keeps_the_signature():
+    @traced("work")
+    async def work(ctx, date_text: str) -> str:
+        """Docs."""
+        return date_text
+
+    assert inspect.iscoroutinefunction(work)
+    assert list(inspect.signature(work).parameters) == ["ctx", "date_text"]
+    assert work.__doc__ == "Docs."
+
+
+class FakeBot:
+    async def send_message(self, chat_id, text, **kwargs):
+        return SimpleNamespace(message_id=1)
+
+
+def test_turn_breakdown(trace_file, monkeypatch):
+    monkeypatch.setattr(agent, "check_availability", lambda date_str: ["10:00"])
+    monkeypatch.setattr(Config, "get_stream_replies", staticmethod(lambda: False))
+    monkeypatch.setattr(Config, "get_local_intents", staticmethod(lambda: False))
+
+    def model(messages, info):
+        if not any(isinstance(p, ToolReturnPart) for m in messages for p in m.parts):
+            return ModelResponse(parts=[ToolCallPart("check_appointment_availability", {"date_text": "מחר"})])
+        return ModelResponse(parts=[TextPart(content="מחר פנוי ב-10:00")])
+
+    routed = RoutedModel({"fake": FunctionModel(model)})
+    with agent.beauty_advisor_agent.override(model=routed):
+        asyncio.run(bot.reply_to_message(SimpleNamespace(bot=FakeBot()), 777, "יש משהו פנוי?"))
+
+    spans = read_spans(trace_file)
+    turn = next(s for s in spans if s["name"] == "turn")
+    assert turn["attributes"]["turn.path"] == "run"
+    in_turn = [s["name"] for s in spans if s["trace_id"] == turn["trace_id"]]
+    assert in_turn.count("llm.request") == 2
+    assert "tool.check_appointment_availability" in in_turn
+    assert "dispatcher.llm_slot_wait" in in_turn
+    assert "telegram.send_message" in in_turn
+    llm = next(s for s in spans if s["name"] == "llm.request")
+    assert llm["attributes"]["provider"] == "fake"